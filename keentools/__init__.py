@@ -44,6 +44,7 @@ from bpy.utils import register_class, unregister_class
 
 # Only minimal imports are performed to check the start
 from .addon_config import Config, output_import_statistics
+from .utils.kt_logging import set_release_mode
 from .facebuilder_config import FBConfig
 from .geotracker_config import GTConfig
 from .facetracker_config import FTConfig
@@ -57,6 +58,7 @@ logging.config.fileConfig(os.path.join(base_dir,
     'logging_debug_console.conf' if 'KEENTOOLS_ENABLE_DEBUG_LOGGING'
     in os.environ else 'logging.conf'),
     disable_existing_loggers=False)
+set_release_mode('KEENTOOLS_ENABLE_DEBUG_LOGGING' not in os.environ)
 _log = logging.getLogger(__name__)
 txt = get_system_info()
 txt.append('Addon: {}'.format(bl_info_copy['name']))
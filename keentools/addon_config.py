@@ -149,6 +149,15 @@ class Config:
     default_tex_face_angles_affection: float = 10.0
     default_tex_uv_expand_percents: float = 0.1
 
+    image_writer_threads: int = 2
+    image_writer_queue_size: int = 4
+
+    frame_cache_memory_limit: int = 1024 * 1024 * 1024  # bytes
+    frame_cache_look_ahead: int = 8
+    comp_mask_cache_memory_limit: int = 256 * 1024 * 1024  # bytes
+    topology_cache_size: int = 16
+    geo_cache_size: int = 8
+
     default_window_width: int = 1920
     default_window_height: int = 1080
     use_ui_scale: bool = True
@@ -217,6 +226,7 @@ class Config:
         'fb_wireframe_special_color': {'value': fb_color_schemes['default'][1], 'type': 'color'},
         'fb_wireframe_midline_color': {'value': fb_midline_color, 'type': 'color'},
         'fb_wireframe_opacity': {'value': fb_wireframe_opacity, 'type': 'float'},
+        'fb_proxy_size': {'value': 2048, 'type': 'int'},
         'prevent_gt_view_rotation': {'value': True, 'type': 'bool'},
         'gt_wireframe_color': {'value': gt_wireframe_color, 'type': 'color'},
         'gt_wireframe_opacity': {'value': gt_wireframe_opacity, 'type': 'float'},
@@ -1,3 +1,4 @@
+import time
 import numpy as np
 from typing import Any, List, Optional, Tuple
 
@@ -11,10 +12,8 @@ from ..utils.bpy_common import (bpy_context,
                                 bpy_set_current_frame,
                                 bpy_render_frame,
                                 bpy_timer_register)
-from ..utils.mesh_builder import build_geo
-from ..utils.images import (create_compatible_bpy_image,
-                            assign_pixels_data,
-                            remove_bpy_image)
+from ..utils.mesh_builder import GeoCache
+from ..utils.image_writer import ImageWriterPool
 from ..utils.ui_redraw import total_redraw_ui
 from ..utils.localview import exit_area_localview
 from ..geotracker.interface.screen_mesages import (revert_default_screen_message,
@@ -134,15 +133,129 @@ def get_background_shader() -> Any:
     return _background_shader
 
 
+class WireframeBakeContext:
+    ''' GPU state kept between frames of wireframe sequence baking.
+        The offscreen is allocated once per resolution, batches are rebuilt
+        only when the Geo changes, rigid objects just get new matrices.
+        Readback goes into a ring of preallocated uint8 buffers,
+        buffer_count has to be bigger than the image writer queue size.
+    '''
+    def __init__(self, product: int, *, buffer_count: int = 2):
+        self.product: int = product
+        self.wireframer: Any = get_wireframer(product)
+        self.batch_rebuilds: int = 0
+        self._size: Tuple[int, int] = (0, 0)
+        self._offscreen: Optional[Any] = None
+        self._gpu_buffer: Optional[Any] = None
+        self._buffers: List[Any] = []
+        self._buffer_count: int = max(2, buffer_count)
+        self._buffer_index: int = 0
+        self._geo: Optional[Any] = None
+        self._edge_indices_ready: bool = False
+
+    def set_size(self, rx: int, ry: int) -> None:
+        if self._size == (rx, ry) and self._offscreen is not None:
+            return
+        _log.output(f'WireframeBakeContext new offscreen: {rx}x{ry}')
+        self.free()
+        self._size = (rx, ry)
+        self._offscreen = gpu.types.GPUOffScreen(rx, ry)
+        self._buffers = [np.empty((ry, rx, 4), dtype=np.uint8)
+                         for _ in range(self._buffer_count)]
+        try:
+            self._gpu_buffer = gpu.types.Buffer('UBYTE', (ry, rx, 4))
+        except Exception as err:
+            _log.error(f'WireframeBakeContext gpu buffer:\n{str(err)}')
+            self._gpu_buffer = None
+        self.wireframer.viewport_size = (rx, ry)
+        self._geo = None
+
+    def update_geometry(self, geomobj: Object, camobj: Object) -> None:
+        wireframer = self.wireframer
+        if self.product == ProductType.FACETRACKER:
+            geo = get_settings(self.product).loader().get_geo()
+        else:
+            geo = GeoCache.get_geo(geomobj, get_uv=False)
+
+        if geo is not self._geo:
+            wireframer.init_geom_data_from_mesh(geomobj)
+            if self.product == ProductType.FACETRACKER \
+                    and not self._edge_indices_ready:
+                wireframer.init_edge_indices()
+                self._edge_indices_ready = True
+            loader = get_settings(self.product).loader()
+            wireframer.init_geom_data_from_core(
+                *loader.get_geo_shader_data(geo, geomobj.matrix_world))
+            wireframer.create_batches()
+            self._geo = geo
+            self.batch_rebuilds += 1
+
+        wireframer.set_object_world_matrix(geomobj.matrix_world)
+        wireframer.set_camera_pos(geomobj.matrix_world, camobj.matrix_world)
+
+    def _read_pixels(self, framebuffer: Any) -> Any:
+        rx, ry = self._size
+        np_img = self._buffers[self._buffer_index]
+        self._buffer_index = (self._buffer_index + 1) % len(self._buffers)
+        buffer = None
+        if self._gpu_buffer is not None:
+            try:
+                framebuffer.read_color(0, 0, rx, ry, 4, 0, 'UBYTE',
+                                       data=self._gpu_buffer)
+                buffer = self._gpu_buffer
+            except TypeError:  # No data argument in old Blender versions
+                self._gpu_buffer = None
+        if buffer is None:
+            buffer = framebuffer.read_color(0, 0, rx, ry, 4, 0, 'UBYTE')
+        # The numpy view of gpu Buffer has transposed strides
+        np_img.reshape(-1)[:] = np.asarray(buffer, dtype=np.uint8).T.reshape(-1)
+        return np_img
+
+    def render(self, camobj: Object) -> Any:
+        ''' :return: uint8 RGBA array (h, w, 4), valid until
+                     the buffer ring comes round to it again
+        '''
+        rx, ry = self._size
+        view_matrix = camobj.matrix_world.inverted()
+        projection_matrix = camobj.calc_matrix_camera(
+            bpy_context().evaluated_depsgraph_get(), x=rx, y=ry)
+        with self._offscreen.bind():
+            set_depth_mask(True)
+            set_depth_test('LESS')
+            framebuffer = gpu.state.active_framebuffer_get()
+            framebuffer.clear(color=(0.0, 0.0, 0.0, 0.0), depth=1.0)
+            with gpu.matrix.push_pop():
+                gpu.matrix.load_identity()
+                gpu.matrix.load_matrix(view_matrix)
+                gpu.matrix.load_projection_matrix(projection_matrix)
+
+                self.wireframer.draw_main()
+                np_img = self._read_pixels(framebuffer)
+            set_depth_mask(False)
+            set_depth_test('NONE')
+        return np_img
+
+    def free(self) -> None:
+        if self._offscreen is not None:
+            self._offscreen.free()
+            self._offscreen = None
+        self._gpu_buffer = None
+        self._buffers = []
+        self._buffer_index = 0
+
+
 def bake_generator(area: Area, geotracker: Any, filepath_pattern: str,
                    *, file_format: str = 'PNG', frames: List[int],
-                   digits: int = 4, product: int, use_background: bool) -> Any:
+                   digits: int = 4, product: int, use_background: bool,
+                   compression: str = 'DEFAULT',
+                   use_half_precision: bool = True) -> Any:
     def _finish():
+        writer.cancel()
+        bake_context.free()
+        GeoCache.invalidate()
         settings.stop_calculating()
         revert_default_screen_message(unregister=not settings.pinmode,
                                       product=product)
-        if tex is not None:
-            remove_bpy_image(tex)
         if not settings.pinmode:
             settings.viewport_state.show_ui_elements(area)
             exit_area_localview(area)
@@ -156,7 +269,12 @@ def bake_generator(area: Area, geotracker: Any, filepath_pattern: str,
     single_line_screen_message('Wireframe baking… Please wait',
                                product=product)
 
-    tex = None
+    writer = ImageWriterPool(max_workers=Config.image_writer_threads,
+                             queue_size=Config.image_writer_queue_size,
+                             compression=compression,
+                             use_half_precision=use_half_precision)
+    bake_context = WireframeBakeContext(
+        product, buffer_count=Config.image_writer_queue_size + 1)
     total_frames = len(frames)
     for num, frame in enumerate(frames):
         if settings.user_interrupts:
@@ -170,62 +288,40 @@ def bake_generator(area: Area, geotracker: Any, filepath_pattern: str,
 
         yield delta
 
+        start_time = time.time()
         rx, ry = bpy_render_frame()
-        offscreen = gpu.types.GPUOffScreen(rx, ry)
-        context = bpy_context()
         camobj = geotracker.camobj
         geomobj = geotracker.geomobj
-        view_matrix = camobj.matrix_world.inverted()
-        projection_matrix = camobj.calc_matrix_camera(
-            context.evaluated_depsgraph_get(), x=rx, y=ry)
-
-        settings = get_settings(product)
-        loader = settings.loader()
-
-        wireframer = get_wireframer(product)
-        wireframer.viewport_size = (rx, ry)
-        wireframer.init_geom_data_from_mesh(geomobj)
-        wireframer.set_object_world_matrix(geomobj.matrix_world)
-        wireframer.set_camera_pos(geomobj.matrix_world, camobj.matrix_world)
-
-        geo = loader.get_geo()
-        if product == ProductType.FACETRACKER:
-            wireframer.init_edge_indices()
-        wireframer.init_geom_data_from_core(
-            *loader.get_geo_shader_data(geo, geomobj.matrix_world))
-
-        wireframer.create_batches()
-        wireframer.background.image = (None if not use_background else
-                                       get_background_image_strict(camobj,
-                                                                   index=0))
-        with offscreen.bind():
-            set_depth_mask(True)
-            set_depth_test('LESS')
-            framebuffer = gpu.state.active_framebuffer_get()
-            framebuffer.clear(color=(0.0, 0.0, 0.0, 0.0), depth=1.0)
-            with gpu.matrix.push_pop():
-                gpu.matrix.load_identity()
-                gpu.matrix.load_matrix(view_matrix)
-                gpu.matrix.load_projection_matrix(projection_matrix)
-
-                wireframer.draw_main()
-                buffer = framebuffer.read_color(0, 0, rx, ry, 4, 0, 'UBYTE')
-                built_texture = np.array(buffer, dtype=np.float32)
-            set_depth_mask(False)
-            set_depth_test('NONE')
-
-        offscreen.free()
-
-        if tex is None:
-            tex = create_compatible_bpy_image(built_texture)
-        tex.filepath_raw = filepath_pattern.format(str(frame).zfill(digits))
-        tex.file_format = file_format
-        assign_pixels_data(tex.pixels, built_texture.T.ravel() / 255)
-        tex.save()
-        _log.info(f'TEXTURE SAVED: {tex.filepath}')
+        bake_context.set_size(rx, ry)
+        bake_context.update_geometry(geomobj, camobj)
+        bake_context.wireframer.background.image = (
+            None if not use_background else
+            get_background_image_strict(camobj, index=0))
+        np_img = bake_context.render(camobj)
+        _log.info(f'Wireframe frame {frame} is rendered in '
+                  f'{time.time() - start_time:.3f} sec. '
+                  f'[batch rebuilds: {bake_context.batch_rebuilds}]')
+
+        try:
+            while writer.is_full():
+                yield delta
+            writer.put(filepath_pattern.format(str(frame).zfill(digits)),
+                       np_img, file_format)
+        except Exception as err:
+            _log.error(f'Wireframe sequence writing error:\n{str(err)}')
+            _finish()
+            return None
 
         yield delta
 
+    try:
+        while writer.pending() > 0:
+            if settings.user_interrupts:
+                break
+            yield delta
+    except Exception as err:
+        _log.error(f'Wireframe sequence writing error:\n{str(err)}')
+
     _finish()
     return None
 
@@ -252,7 +348,9 @@ def bake_wireframe_sequence(area: Area, geotracker: Any, filepath_pattern: str,
                             show_specials: bool = True,
                             lit_wireframe: bool = True,
                             backface_culling: bool = True,
-                            use_background: bool = False) -> None:
+                            use_background: bool = False,
+                            compression: str = 'DEFAULT',
+                            use_half_precision: bool = True) -> None:
     _log.yellow('bake_wireframe_sequence start')
     op = get_operator(Config.kt_interrupt_modal_idname)
     op('INVOKE_DEFAULT', product=product)
@@ -263,7 +361,9 @@ def bake_wireframe_sequence(area: Area, geotracker: Any, filepath_pattern: str,
                                          file_format=file_format,
                                          frames=frames, digits=digits,
                                          product=product,
-                                         use_background=use_background)
+                                         use_background=use_background,
+                                         compression=compression,
+                                         use_half_precision=use_half_precision)
     prepare_camera(area, product=product)
     settings = get_settings(product)
     vp = settings.loader().viewport()
@@ -19,7 +19,6 @@
 from typing import Any, Optional, Tuple, List
 import numpy as np
 
-import bmesh
 from bpy.types import Object, Area, Mesh
 
 from ..utils.kt_logging import KTLogger
@@ -49,6 +48,7 @@ from ..utils.bpy_common import (bpy_create_object,
                                 bpy_load_image,
                                 bpy_new_mesh)
 from ..utils.fb_wireframe_image import create_wireframe_image
+from ..utils.version import BVersion
 from .prechecks import common_fb_checks
 from ..utils.manipulate import switch_to_camera, center_viewports_on_object
 
@@ -56,18 +56,55 @@ from ..utils.manipulate import switch_to_camera, center_viewports_on_object
 _log = KTLogger(__name__)
 
 
-def _create_mesh_from_pydata(mesh_name: str,
-                             vertices: List, faces: List) -> Mesh:
+def _geo_mesh_arrays(me: Any) -> Tuple[Any, Any, Any, Any]:
+    ''' Core mesh data as arrays in face order
+        :return: points, face sizes, face vertex indices and face UVs
+    '''
+    points = np.array([me.point(i) for i in range(me.points_count())],
+                      dtype=np.float32).reshape((-1, 3))
+    face_sizes = [me.face_size(i) for i in range(me.faces_count())]
+    face_point = me.face_point
+    face_verts = np.fromiter((face_point(i, j)
+                              for i, size in enumerate(face_sizes)
+                              for j in range(size)),
+                             dtype=np.int32, count=sum(face_sizes))
+    uv = me.uv
+    uvs = np.array([uv(i) for i in range(me.uvs_count())],
+                   dtype=np.float32).reshape((-1, 2))
+    return points, np.array(face_sizes, dtype=np.int32), face_verts, uvs
+
+
+def _create_mesh_from_arrays(mesh_name: str, vertices: Any, face_sizes: Any,
+                             face_verts: Any, uvs: Any) -> Mesh:
     mesh = bpy_new_mesh(mesh_name)
-
-    bm = bmesh.new()
-    verts = [bm.verts.new(v) for v in vertices]
-    bm.verts.index_update()
-    for face in faces:
-        bm.faces.new(verts[i] for i in face)
-
-    bm.to_mesh(mesh)
-    bm.free()
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set('co', np.ascontiguousarray(
+        vertices, dtype=np.float32).ravel())
+
+    mesh.loops.add(len(face_verts))
+    mesh.loops.foreach_set('vertex_index', face_verts)
+
+    mesh.polygons.add(len(face_sizes))
+    loop_starts = np.cumsum(face_sizes, dtype=np.int32) - face_sizes
+    mesh.polygons.foreach_set('loop_start', loop_starts)
+    if not BVersion.polygon_loop_total_is_read_only:
+        mesh.polygons.foreach_set('loop_total', face_sizes)
+
+    # Simple Shade Smooth analog
+    mesh.polygons.foreach_set('use_smooth',
+                              np.ones((len(face_sizes),), dtype=np.bool_))
+
+    uvtex = mesh.uv_layers.new()
+    if len(uvs) != len(face_verts):
+        _log.error(f'_create_mesh_from_arrays uv count: '
+                   f'{len(uvs)} != {len(face_verts)}')
+        loop_uvs = np.zeros((len(face_verts), 2), dtype=np.float32)
+        count = min(len(uvs), len(face_verts))
+        loop_uvs[:count] = uvs[:count]
+        uvs = loop_uvs
+    uvtex.data.foreach_set('uv', uvs.ravel())
+
+    mesh.update(calc_edges=True)
     return mesh
 
 
@@ -334,17 +371,10 @@ class FBLoader:
         else:
             geo = builder.applied_args_model()
         me = geo.mesh(0)
-
-        v_count = me.points_count()
-        vertices = np.empty((v_count, 3), dtype=np.float32)
-        for i in range(v_count):
-            vertices[i] = me.point(i)
-
-        vertices2 = vertices @ xy_to_xz_rotation_matrix_3x3()
-        faces = [[me.face_point(i, j) for j in range(me.face_size(i))]
-                 for i in range(me.faces_count())]
-
-        mesh = _create_mesh_from_pydata(mesh_name, vertices2, faces)
+        vertices, face_sizes, face_verts, uvs = _geo_mesh_arrays(me)
+        mesh = _create_mesh_from_arrays(
+            mesh_name, vertices @ xy_to_xz_rotation_matrix_3x3(),
+            face_sizes, face_verts, uvs)
 
         # Normals are not in use yet
         # Init Custom Normals (work on Shading Flat only!)
@@ -352,19 +382,6 @@ class FBLoader:
         # mesh.calc_normals_split()
         # mesh.normals_split_custom_set(normals)
 
-        # Simple Shade Smooth analog
-        values = [True] * len(mesh.polygons)
-        mesh.polygons.foreach_set('use_smooth', values)
-
-        uvtex = mesh.uv_layers.new()
-        uvmap = uvtex.data
-        # Fill uvs in uvmap
-        uvs_count = me.uvs_count()
-        for i in range(uvs_count):
-            uvmap[i].uv = me.uv(i)
-
-        mesh.update()
-
         # Warning! our autosmooth settings work on Shading Flat!
         # mesh.use_auto_smooth = True
         # mesh.auto_smooth_angle = math.pi
@@ -29,6 +29,8 @@ from ...addon_config import fb_settings, get_operator
 from ...facebuilder_config import FBConfig
 from ..fbloader import FBLoader
 from ..utils.exif_reader import (read_exif_to_camera,
+                                 submit_exif_reading,
+                                 apply_exif_to_camera,
                                  auto_setup_camera_from_exif)
 from ...utils.materials import find_bpy_image_by_name
 from ...utils.blendshapes import load_csv_animation_to_blendshapes
@@ -312,20 +314,21 @@ class FB_OT_MultipleFilebrowser(Operator, ImportHelper):
         last_camnum = head.get_last_camnum()
         _log.output(f'last_camnum: {last_camnum}')
 
-        for f in self.files:
+        filepaths = [os.path.join(self.directory, f.name) for f in self.files]
+        exif_results = submit_exif_reading(filepaths)
+        for filepath, exif_result in zip(filepaths, exif_results):
             try:
-                filepath = os.path.join(self.directory, f.name)
                 _log.output(f'{self.__class__.__name__} IMAGE:\n{filepath}')
 
                 camera = FBLoader.add_new_camera_with_image(self.headnum,
                                                             filepath)
-                _log.output(f'read_exif_to_camera')
-                read_exif_to_camera(
-                    self.headnum, head.get_last_camnum(), filepath)
+                _log.output(f'apply_exif_to_camera')
+                apply_exif_to_camera(
+                    self.headnum, head.get_last_camnum(), exif_result.result())
                 camera.orientation = camera.exif.orientation
 
             except RuntimeError as ex:
-                _log.error(f'FILE READ ERROR: {f.name}')
+                _log.error(f'FILE READ ERROR: {os.path.basename(filepath)}')
 
         fb = FBLoader.get_builder()
         for i, camera in enumerate(head.cameras):
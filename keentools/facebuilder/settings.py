@@ -64,6 +64,7 @@ from .callbacks import (update_mesh_with_dialog,
                         update_camera_focal,
                         update_background_tone_mapping)
 from .utils.manipulate import get_current_head
+from .utils.image_proxy import viewport_image
 from ..utils.images import tone_mapping, reset_tone_mapping
 from ..utils.viewport_state import ViewportStateItem
 from ..utils.bpy_common import (bpy_render_frame,
@@ -197,12 +198,17 @@ class FBCameraItem(PropertyGroup):
             return c.background_images[0]
 
     def get_background_size(self) -> Tuple[int, int]:
-        img = self.get_camera_background()
-        if img is not None:
-            if img.image:
-                return img.image.size
+        ''' Original image size, the background can show a proxy '''
+        if self.cam_image:
+            return self.cam_image.size
         return -1, -1
 
+    def get_background_image(self) -> Optional[Image]:
+        bim = self.get_camera_background()
+        if bim is not None and bim.image:
+            return bim.image
+        return None
+
     def reset_background_image_rotation(self) -> None:
         background_image = self.get_camera_background()
         if background_image is None:
@@ -229,7 +235,7 @@ class FBCameraItem(PropertyGroup):
             bim = data.background_images.new()
         else:
             bim = data.background_images[0]
-        bim.image = self.cam_image
+        bim.image = viewport_image(self)
         bim.rotation = self.orientation * math.pi / 2
 
         if self.cam_image_frame >= 0:
@@ -400,11 +406,14 @@ class FBCameraItem(PropertyGroup):
 
     def reset_tone_mapping(self) -> None:
         reset_tone_mapping(self.cam_image)
+        img = self.get_background_image()
+        if img is not None and img != self.cam_image:
+            reset_tone_mapping(img)
 
     def apply_tone_mapping(self) -> None:
         if not self.cam_image:
             return
-        tone_mapping(self.cam_image,
+        tone_mapping(viewport_image(self),
                      exposure=self.tone_exposure, gamma=self.tone_gamma)
 
 
@@ -0,0 +1,175 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' Fast EXIF reading for JPEG files.
+    The APP1 Exif segment is read into memory with a few file reads and
+    only IFD0 and the Exif sub-IFD are parsed, the thumbnail IFD and
+    maker notes are skipped. Tag names and printable values are the same
+    as exifread gives for these tags.
+'''
+
+import struct
+from typing import Any, Dict, Optional, Set
+
+from ...blender_independent_packages.exifread.tags import EXIF_TAGS, FIELD_TYPES
+
+
+_jpeg_soi: bytes = b'\xFF\xD8'
+_app1_marker: int = 0xE1
+_stop_markers: Set[int] = {0xD9, 0xDA}  # EOI, SOS: no metadata after them
+_standalone_markers: Set[int] = {0x01, *range(0xD0, 0xD8)}
+_exif_ifd_pointer: int = 0x8769
+_max_segments: int = 256
+
+_ratio_types: Set[int] = {5, 10}
+_signed_types: Set[int] = {6, 8, 9, 10}
+_int_formats: Dict[int, str] = {1: 'B', 2: 'H', 4: 'I'}
+
+
+def read_jpeg_exif_block(file: Any) -> Optional[bytes]:
+    ''' TIFF structure of the Exif segment, the file position
+        must be at the file start
+        :return: None when the file is not a JPEG,
+                 b'' when it has no Exif segment
+    '''
+    if file.read(2) != _jpeg_soi:
+        return None
+    for _ in range(_max_segments):
+        header = file.read(4)
+        if len(header) < 4 or header[0] != 0xFF:
+            return b''
+        marker = header[1]
+        if marker == 0xFF:  # fill byte
+            file.seek(-3, 1)
+            continue
+        if marker in _stop_markers:
+            return b''
+        if marker in _standalone_markers:
+            file.seek(-2, 1)
+            continue
+        length = (header[2] << 8) | header[3]
+        if length < 2:
+            return b''
+        if marker == _app1_marker:
+            segment = file.read(length - 2)
+            if segment[:4] == b'Exif':
+                return segment[6:]
+            continue
+        file.seek(length - 2, 1)
+    return b''
+
+
+def _unpack_int(block: bytes, endian: str, offset: int,
+                size: int, signed: bool) -> int:
+    fmt = _int_formats[size]
+    return struct.unpack_from(endian + (fmt.lower() if signed else fmt),
+                              block, offset)[0]
+
+
+def _ratio_printable(num: int, den: int) -> Optional[str]:
+    ''' Reduced fraction like exifread.utils.Ratio prints it '''
+    if den == 0:
+        return None
+    div = _gcd(num, den)
+    if div > 1:
+        num, den = num // div, den // div
+    return str(num) if den == 1 else f'{num}/{den}'
+
+
+def _gcd(a: int, b: int) -> int:
+    while b != 0:
+        a, b = b, a % b
+    return a
+
+
+def _field_printable(block: bytes, endian: str, tag: int, field_type: int,
+                     count: int, offset: int) -> Optional[str]:
+    if field_type == 2:
+        values = block[offset:offset + count].split(b'\x00', 1)[0]
+        try:
+            return values.decode('utf-8')
+        except UnicodeDecodeError:
+            return str(values)
+
+    if count != 1:  # only single values are in use
+        return None
+    signed = field_type in _signed_types
+    if field_type in _ratio_types:
+        value = _ratio_printable(
+            _unpack_int(block, endian, offset, 4, signed),
+            _unpack_int(block, endian, offset + 4, 4, signed))
+        if value is None:
+            return None
+    else:
+        size = FIELD_TYPES[field_type][0]
+        if size not in _int_formats:
+            return None
+        value = _unpack_int(block, endian, offset, size, signed)
+
+    tag_entry = EXIF_TAGS.get(tag)
+    if tag_entry is not None and len(tag_entry) > 1 and \
+            isinstance(tag_entry[1], dict):
+        return tag_entry[1].get(value, repr(value))
+    return str(value)
+
+
+def _read_ifd(block: bytes, endian: str, ifd: int, ifd_name: str,
+              tags: Dict[str, str]) -> Optional[int]:
+    ''' :return: Exif sub-IFD offset found in this IFD '''
+    exif_ifd = None
+    entries = _unpack_int(block, endian, ifd, 2, False)
+    for i in range(entries):
+        entry = ifd + 2 + 12 * i
+        tag, field_type, count = struct.unpack_from(endian + 'HHI',
+                                                    block, entry)
+        if not 0 < field_type < len(FIELD_TYPES):
+            continue
+        if tag == _exif_ifd_pointer:
+            exif_ifd = _unpack_int(block, endian, entry + 8, 4, False)
+            continue
+        tag_entry = EXIF_TAGS.get(tag)
+        if tag_entry is None:
+            continue
+        offset = entry + 8
+        if count * FIELD_TYPES[field_type][0] > 4:
+            offset = _unpack_int(block, endian, offset, 4, False)
+        printable = _field_printable(block, endian, tag, field_type,
+                                     count, offset)
+        if printable is not None:
+            tags[f'{ifd_name} {tag_entry[0]}'] = printable
+    return exif_ifd
+
+
+def parse_exif_block(block: bytes) -> Dict[str, str]:
+    ''' :return: {'Image Make': 'Canon', 'EXIF FocalLength': '50', ...} '''
+    tags: Dict[str, str] = {}
+    if block[:2] == b'II':
+        endian = '<'
+    elif block[:2] == b'MM':
+        endian = '>'
+    else:
+        return tags
+    try:
+        first_ifd = _unpack_int(block, endian, 4, 4, False)
+        exif_ifd = _read_ifd(block, endian, first_ifd, 'Image', tags)
+        if exif_ifd:
+            _read_ifd(block, endian, exif_ifd, 'EXIF', tags)
+    except struct.error:
+        pass  # Truncated block, the tags read so far are kept
+    return tags
+
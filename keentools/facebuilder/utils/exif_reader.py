@@ -16,16 +16,17 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # ##### END GPL LICENSE BLOCK #####
 
-from typing import Optional, Any, Tuple, Dict
+from typing import Optional, Any, Tuple, Dict, List
+from concurrent.futures import ThreadPoolExecutor, Future
 import os
 
 from ...blender_independent_packages.exifread import process_file
-from ...blender_independent_packages.exifread import \
-    DEFAULT_STOP_TAG, FIELD_TYPES
+from ...blender_independent_packages.exifread import DEFAULT_STOP_TAG
 
 from ...utils.kt_logging import KTLogger
 from ...addon_config import fb_settings
 from ...facebuilder_config import FBConfig
+from .exif_header import read_jpeg_exif_block, parse_exif_block
 
 
 _log = KTLogger(__name__)
@@ -48,7 +49,7 @@ def _frac_to_float(s: str) -> Optional[float]:
 
 def _get_safe_exif_param_num(p: str, data: Dict) -> Optional[float]:
     if data is not None and p in data.keys():
-        val = _frac_to_float(data[p].printable)
+        val = _frac_to_float(data[p])
         _log.output(f'exif_param: {p}={val}')
         return val
     return None
@@ -95,15 +96,9 @@ def _get_sensor_size(exif_size: float, exif_focal_res: float,
         return wrong_result
 
 
-def _print_out_exif_data(data: Dict) -> None:
-    tag_keys = list(data.keys())
-    tag_keys.sort()
-    for i in tag_keys:
-        try:
-            _log.info(f'{i} ({FIELD_TYPES[data[i].field_type][2]}): '
-                      f'{data[i].printable}')
-        except Exception:
-            _log.error(f'exif_data_error: {i} : {str(data[i])}')
+def _print_out_exif_data(data: Dict[str, str]) -> None:
+    for key in sorted(data.keys()):
+        _log.info(f'{key}: {data[key]}')
 
 
 def get_sensor_size_35mm_equivalent(head: Any) -> Tuple[float, float]:
@@ -117,18 +112,30 @@ def get_sensor_size_35mm_equivalent(head: Any) -> Tuple[float, float]:
     return w, h
 
 
+def _read_exif_tags(img_file: Any) -> Dict[str, str]:
+    ''' :return: printable values of EXIF tags '''
+    block = read_jpeg_exif_block(img_file)
+    if block is not None:
+        tags = parse_exif_block(block)
+    else:
+        img_file.seek(0)
+        data = process_file(img_file, stop_tag=DEFAULT_STOP_TAG,
+                            details=False, strict=False, debug=False)
+        tags = {k: v.printable for k, v in data.items()
+                if hasattr(v, 'printable')}
+
+    # This call is needed only for full EXIF review
+    # _print_out_exif_data(tags)
+
+    return tags
+
+
 def _read_exif(filepath: str) -> Dict:
     status = False
     try:
         with open(str(filepath), 'rb') as img_file:
-            data = process_file(img_file, stop_tag=DEFAULT_STOP_TAG,
-                                details=True, strict=False,
-                                debug=False)
+            data = _read_exif_tags(img_file)
             status = True
-
-        # This call is needed only for full EXIF review
-        # _print_out_exif_data(data)
-
     except IOError:
         _log.error(f'{filepath} is unreadable for EXIF')
         data = None
@@ -315,31 +322,54 @@ def _exif_sizes_message(headnum: int, image: Any) -> str:
     return message
 
 
+_exif_executor: Optional[ThreadPoolExecutor] = None
+
+
+def submit_exif_reading(filepaths: List[str]) -> List[Future]:
+    ''' Files are read in the shared thread pool, the results are
+        to be applied in the main thread by apply_exif_to_camera '''
+    global _exif_executor
+    if _exif_executor is None:
+        _exif_executor = ThreadPoolExecutor(
+            max_workers=FBConfig.exif_reader_threads,
+            thread_name_prefix='kt_exif')
+    return [_exif_executor.submit(_read_exif, x) for x in filepaths]
+
+
 def reload_all_camera_exif(headnum: int) -> None:
     _log.yellow('reload_all_camera_exif start')
     settings = fb_settings()
     head = settings.get_head(headnum)
+    camnums = []
+    filepaths = []
     for i, camera in enumerate(head.cameras):
         filepath = camera.get_abspath()
         if filepath:
-            read_exif_to_camera(headnum, i, filepath)
+            camnums.append(i)
+            filepaths.append(filepath)
+    for camnum, future in zip(camnums, submit_exif_reading(filepaths)):
+        apply_exif_to_camera(headnum, camnum, future.result())
     _log.output('reload_all_camera_exif end >>>')
 
 
-def read_exif_to_camera(headnum: int, camnum: int, filepath: str) -> bool:
-    _log.yellow('read_exif_to_camera start')
+def apply_exif_to_camera(headnum: int, camnum: int, exif_data: Dict) -> bool:
     settings = fb_settings()
     camera = settings.get_camera(headnum, camnum)
     if camera is None:
-        _log.red('read_exif_to_camera no camera end >>>')
+        _log.red('apply_exif_to_camera no camera')
         return False
-    exif_data = _read_exif(filepath)
     _init_exif_settings(camera.exif, exif_data)
     camera.exif.info_message = _exif_info_message(camera.exif, exif_data)
-    _log.output('read_exif_to_camera end >>>')
     return exif_data['status']
 
 
+def read_exif_to_camera(headnum: int, camnum: int, filepath: str) -> bool:
+    _log.yellow('read_exif_to_camera start')
+    status = apply_exif_to_camera(headnum, camnum, _read_exif(filepath))
+    _log.output('read_exif_to_camera end >>>')
+    return status
+
+
 def update_exif_sizes_message(headnum: int, image: Any) -> bool:
     _log.yellow('update_exif_sizes_message')
     settings = fb_settings()
@@ -0,0 +1,249 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' Downscaled copies of FaceBuilder camera images.
+    Level 0 is the original image, every next level is twice smaller
+    down to FBConfig.proxy_min_size. Levels are saved as lossless PNG
+    files in a folder next to the .blend file (in the temp folder for
+    unsaved files) once per image. PNG keeps the channels of the source,
+    so proxies of images with alpha are RGBA and baking reads them through
+    Blender instead of the direct 8-bit decoding. Float images (16-bit
+    and HDR files) get no proxies. File names contain a key made of
+    the image path, size and modification time, so a changed photo gets
+    new files. The viewport shows the level closest to the proxy size
+    preference, texture baking reads the smallest level where the head
+    is still bigger than the texture.
+'''
+
+import os
+import hashlib
+import tempfile
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from bpy.types import Image
+
+from ...utils.kt_logging import KTLogger
+from ...addon_config import get_addon_preferences
+from ...facebuilder_config import FBConfig
+from ...utils.bpy_common import (bpy_data,
+                                 bpy_images,
+                                 bpy_abspath,
+                                 bpy_remove_image)
+from ...utils.images import np_array_from_bpy_image
+
+
+_log = KTLogger(__name__)
+
+
+def proxy_folder() -> str:
+    blend_path = bpy_data().filepath
+    if blend_path == '':
+        return os.path.join(tempfile.gettempdir(), FBConfig.proxy_folder_name)
+    return os.path.join(os.path.dirname(blend_path), FBConfig.proxy_folder_name)
+
+
+def proxy_level_sizes(width: int, height: int,
+                      min_size: int = FBConfig.proxy_min_size) -> List[Tuple[int, int]]:
+    ''' :return: image size of every level, level 0 is the original '''
+    sizes = [(width, height)]
+    while True:
+        w, h = sizes[-1]
+        if max(w, h) // 2 < min_size:
+            break
+        sizes.append((max(1, round(w / 2)), max(1, round(h / 2))))
+    return sizes
+
+
+def _source_path(camera: Any) -> Optional[str]:
+    ''' :return: image file path when proxies can be made for the camera '''
+    img = camera.cam_image
+    if not img or camera.cam_image_frame >= 0 or img.packed_file is not None \
+            or img.source != 'FILE':
+        return None
+    filepath = bpy_abspath(img.filepath)
+    if not os.path.isfile(filepath):
+        return None
+    return filepath
+
+
+def _source_key(filepath: str) -> str:
+    stat = os.stat(filepath)
+    text = f'{os.path.normcase(filepath)}|{stat.st_mtime_ns}|{stat.st_size}'
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def _proxy_filepath(filepath: str, key: str, level: int) -> str:
+    stem = os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.join(proxy_folder(), f'{stem}_{key}_L{level}.png')
+
+
+def _generate_proxies(img: Image, sizes: List[Tuple[int, int]],
+                      filepaths: List[str]) -> bool:
+    ''' All missing levels from one image copy scaled step by step '''
+    missing = [i for i in range(1, len(sizes))
+               if not os.path.exists(filepaths[i])]
+    if len(missing) == 0:
+        return True
+    _log.output(f'_generate_proxies: {img.name} levels {missing}')
+    try:
+        os.makedirs(proxy_folder(), exist_ok=True)
+    except OSError as err:
+        _log.error(f'_generate_proxies cannot create folder:\n{str(err)}')
+        return False
+    proxy = img.copy()
+    try:
+        for level in range(1, missing[-1] + 1):
+            proxy.scale(*sizes[level])
+            if level not in missing:
+                continue
+            proxy.filepath_raw = filepaths[level]
+            proxy.file_format = 'PNG'
+            proxy.save()
+    except Exception as err:
+        _log.error(f'_generate_proxies Exception:\n{str(err)}')
+        return False
+    finally:
+        bpy_remove_image(proxy)
+    return True
+
+
+def _camera_levels(camera: Any) -> Tuple[List[Tuple[int, int]], List[str]]:
+    ''' :return: level sizes and proxy file paths, level 0 has no file '''
+    w, h = camera.cam_image.size[:2]
+    filepath = _source_path(camera)
+    if filepath is None or camera.cam_image.is_float or w <= 0 or h <= 0:
+        return [(w, h)], ['']
+    sizes = proxy_level_sizes(w, h)
+    key = _source_key(filepath)
+    return sizes, [''] + [_proxy_filepath(filepath, key, i)
+                          for i in range(1, len(sizes))]
+
+
+def _level_image(camera: Any, level: int, sizes: List[Tuple[int, int]],
+                 filepaths: List[str]) -> Optional[Image]:
+    if level == 0:
+        return camera.cam_image
+    if not os.path.exists(filepaths[level]) and \
+            not _generate_proxies(camera.cam_image, sizes, filepaths):
+        return None
+    try:
+        return bpy_images().load(filepaths[level], check_existing=True)
+    except RuntimeError as err:
+        _log.error(f'_level_image Exception:\n{str(err)}')
+        return None
+
+
+def viewport_proxy_level(sizes: List[Tuple[int, int]], proxy_size: int) -> int:
+    ''' Smallest level not less than proxy_size, 0 turns proxies off '''
+    if proxy_size <= 0:
+        return 0
+    level = 0
+    for i, (w, h) in enumerate(sizes):
+        if max(w, h) < proxy_size:
+            break
+        level = i
+    return level
+
+
+def viewport_image(camera: Any) -> Optional[Image]:
+    ''' Image for the camera background '''
+    if not camera.cam_image:
+        return None
+    sizes, filepaths = _camera_levels(camera)
+    level = viewport_proxy_level(sizes, get_addon_preferences().fb_proxy_size)
+    img = _level_image(camera, level, sizes, filepaths)
+    return img if img is not None else camera.cam_image
+
+
+def _projected_head_size(geo: Any, model: Any, projection: Any,
+                         width: int, height: int) -> float:
+    ''' Bigger side of the head bounding box on the image in pixels '''
+    geo_mesh = geo.mesh(0)
+    points = np.array([geo_mesh.point(i) for i in range(geo_mesh.points_count())],
+                      dtype=np.float64).reshape((-1, 3))
+    if len(points) == 0:
+        return 0.0
+    points = np.hstack((points, np.ones((len(points), 1))))
+    clip = points @ (projection @ model).transpose()
+    clip = clip[clip[:, 3] > 0]
+    if len(clip) == 0:
+        return 0.0
+    x = np.clip(clip[:, 0] / clip[:, 3], 0, width)
+    y = np.clip(clip[:, 1] / clip[:, 3], 0, height)
+    return max(np.ptp(x), np.ptp(y))
+
+
+def bake_proxy_level(sizes: List[Tuple[int, int]], head_size: float,
+                     tex_size: int) -> int:
+    ''' Smallest level where the head is not smaller than the texture '''
+    target = tex_size * FBConfig.proxy_bake_texel_ratio
+    full_size = max(sizes[0])
+    level = 0
+    for i, size in enumerate(sizes):
+        if head_size * max(size) / full_size < target:
+            break
+        level = i
+    return level
+
+
+def bake_image_level(camera: Any, geo: Any, model: Any, projection: Any,
+                     tex_width: int, tex_height: int) -> Tuple[int, str, Tuple[int, int], Any]:
+    ''' Image level for texture baking, proxy files are made here
+        :return: level, its file path ('' when the image has no file),
+                 its size and the projection matrix for this size
+    '''
+    sizes, filepaths = _camera_levels(camera)
+    w, h = sizes[0]
+    if len(sizes) == 1:
+        return 0, _source_path(camera) or '', (w, h), projection
+
+    ow, oh = (w, h) if camera.orientation % 2 == 0 else (h, w)
+    head_size = _projected_head_size(geo, model, projection, ow, oh)
+    level = bake_proxy_level(sizes, head_size, max(tex_width, tex_height))
+    if level > 0 and not os.path.exists(filepaths[level]) and \
+            not _generate_proxies(camera.cam_image, sizes, filepaths):
+        level = 0
+    if level == 0:
+        return 0, _source_path(camera) or '', (w, h), projection
+
+    lw, lh = sizes[level]
+    scale = (lw / w, lh / h) if camera.orientation % 2 == 0 \
+        else (lh / h, lw / w)
+    return level, filepaths[level], sizes[level], \
+        np.diag((*scale, 1.0, 1.0)) @ projection
+
+
+def load_bake_rgba(camera: Any, level: int) -> Optional[Any]:
+    ''' Oriented RGBA pixels of the image level through Blender '''
+    img = None
+    loaded = set()
+    if level > 0:
+        loaded = {x.name for x in bpy_images()}
+        sizes, filepaths = _camera_levels(camera)
+        if level < len(sizes):
+            img = _level_image(camera, level, sizes, filepaths)
+    if img is None:
+        img = camera.cam_image
+
+    np_img = np_array_from_bpy_image(img)
+    if img != camera.cam_image and img.name not in loaded:
+        bpy_remove_image(img)
+    if np_img is None:
+        return None
+    return np.rot90(np_img, camera.orientation)
@@ -0,0 +1,177 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' Camera frames for FaceBuilder texture baking.
+    Camera matrices and image levels are collected in the main thread
+    before baking. Image files are decoded and rotated by a FramePrefetcher
+    worker while the texture builder processes the previous camera,
+    images it cannot read are loaded through Blender on request.
+    Applied-args Geo of keyframes is kept between bakes while the model
+    serialization, masks and UV set stay the same.
+'''
+
+import hashlib
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from ...utils.kt_logging import KTLogger
+from ...utils.lru_cache import LRUCache
+from ...facebuilder_config import FBConfig
+from ...utils.frame_source import FramePrefetcher, decode_byte_image
+from ...blender_independent_packages.pykeentools_loader import module as pkt_module
+from .image_proxy import bake_image_level, load_bake_rgba
+
+
+_log = KTLogger(__name__)
+
+
+class BakeGeoCache:
+    def __init__(self, max_items: int):
+        self._items: LRUCache = LRUCache(max_items)
+
+    @staticmethod
+    def model_key(head: Any) -> Tuple:
+        serial_hash = hashlib.sha1(
+            head.get_serial_str().encode('utf-8')).hexdigest()
+        return serial_hash, tuple(head.get_masks()), head.tex_uv_shape
+
+    def get(self, fb: Any, model_key: Tuple, keyframe: int) -> Any:
+        key = (model_key, keyframe)
+        geo = self._items.get(key)
+        if geo is not None:
+            return geo
+        geo = fb.applied_args_model_at(keyframe)
+        self._items.put(key, geo)
+        return geo
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> Tuple[int, int, int]:
+        ''' :return: items, hits, misses '''
+        return self._items.stats()
+
+
+_geo_cache: BakeGeoCache = BakeGeoCache(FBConfig.bake_geo_cache_size)
+
+
+def get_bake_geo_cache() -> BakeGeoCache:
+    return _geo_cache
+
+
+def _decodable_colorspace(img: Any) -> bool:
+    ''' File pixels are used as is by the decoder,
+        other color spaces need Blender color management '''
+    return img is not None and \
+        img.colorspace_settings.name == FBConfig.bake_prefetch_colorspace
+
+
+class BakeFrame:
+    def __init__(self, camera: Any, geo: Any, model: Any,
+                 tex_width: int, tex_height: int):
+        self.camera: Any = camera
+        self.geo: Any = geo
+        self.model: Any = model
+        self.orientation: int = camera.orientation
+        self.level, self.filepath, self.size, self.projection = \
+            bake_image_level(camera, geo, model,
+                             camera.get_projection_matrix(),
+                             tex_width, tex_height)
+        if not _decodable_colorspace(camera.cam_image):
+            self.filepath = ''
+
+
+class _BakeFrameSource:
+    ''' Image files of the frames for FramePrefetcher, thread-safe '''
+    def __init__(self, frames: List[BakeFrame]):
+        self._frames: List[BakeFrame] = frames
+
+    def frame_bytes(self, channels: int = 4) -> int:
+        return max(w * h * channels * 4 for w, h in
+                   (x.size for x in self._frames))  # float32
+
+    def decode(self, index: int) -> Optional[Any]:
+        frame = self._frames[index]
+        np_img = decode_byte_image(frame.filepath, *frame.size)
+        if np_img is None:
+            return None
+        return np.ascontiguousarray(np.rot90(np_img, frame.orientation))
+
+    def close_thread_input(self) -> None:
+        pass  # Image files are not kept open
+
+    def close_inputs(self) -> None:
+        pass
+
+
+class BakeFrameLoader:
+    ''' Callable frame_data_loader for texture_builder.build_texture.
+        No more than FBConfig.bake_prefetch_frames decoded images
+        are waiting in memory.
+    '''
+    def __init__(self, head: Any, camnums: List[int], fb: Any,
+                 tex_width: int, tex_height: int):
+        model_key = _geo_cache.model_key(head)
+        self._frames: List[BakeFrame] = []
+        for camnum in camnums:
+            camera = head.cameras[camnum]
+            keyframe = camera.get_keyframe()
+            self._frames.append(BakeFrame(
+                camera, _geo_cache.get(fb, model_key, keyframe),
+                fb.model_mat(keyframe), tex_width, tex_height))
+
+        self._prefetcher: Optional[FramePrefetcher] = None
+        files = [i for i, x in enumerate(self._frames) if x.filepath != '']
+        if len(files) > 0:
+            self._prefetcher = FramePrefetcher(
+                _BakeFrameSource(self._frames), files,
+                depth=FBConfig.bake_prefetch_frames,
+                memory_limit=FBConfig.bake_prefetch_memory_limit)
+            if not self._prefetcher.start():
+                self._prefetcher = None
+        items, hits, misses = _geo_cache.stats()
+        _log.output(f'BakeFrameLoader: {len(self._frames)} frames, '
+                    f'prefetch: {len(files) if self._prefetcher else 0}, '
+                    f'geo cache: {items} items {hits} hits {misses} misses')
+
+    def _image(self, kf_idx: int) -> Optional[Any]:
+        frame = self._frames[kf_idx]
+        if self._prefetcher is not None:
+            _, np_img = self._prefetcher.take(
+                kf_idx, timeout=FBConfig.bake_prefetch_timeout)
+            if np_img is not None:
+                return np_img
+        frame.camera.reset_tone_mapping()
+        return load_bake_rgba(frame.camera, frame.level)
+
+    def __call__(self, kf_idx: int) -> Any:
+        frame = self._frames[kf_idx]
+        frame_data = pkt_module().texture_builder.FrameData()
+        frame_data.geo = frame.geo
+        frame_data.image = self._image(kf_idx)
+        frame_data.model = frame.model
+        frame_data.view = np.eye(4)
+        frame_data.projection = frame.projection
+        return frame_data
+
+    def stop(self) -> None:
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
+
@@ -197,6 +197,21 @@ class FBConfig:
     default_frame_height = 1080
     default_camera_display_size = 0.75
 
+    exif_reader_threads = 8
+
+    proxy_folder_name = 'keentools_proxies'
+    proxy_min_size = 512
+    proxy_bake_texel_ratio = 1.0
+
+    bake_prefetch_frames = 2
+    bake_prefetch_memory_limit = 1024 * 1024 * 1024
+    bake_prefetch_timeout = 60.0
+    bake_prefetch_colorspace = 'sRGB'
+    bake_geo_cache_size = 64
+
+    edge_cache_size = 8
+    edge_cache_folder_name = 'keentools_cache'
+
     default_camera_rotation = (math.pi * 0.5, 0, 0)
     camera_x_step = 2.0
     camera_y_step = 5
@@ -16,6 +16,8 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # ##### END GPL LICENSE BLOCK #####
 
+from bpy.app.handlers import (frame_change_pre, save_pre,
+                               undo_post, redo_post, load_post)
 from bpy.utils import register_class, unregister_class
 
 from ..utils.kt_logging import KTLogger
@@ -29,6 +31,11 @@ from .pick_operator import FT_OT_PickMode, FT_OT_PickModeStarter
 from .interface import CLASSES_TO_REGISTER as INTERFACE_CLASSES
 from .operators import BUTTON_CLASSES
 from ..preferences.hotkeys import all_keymaps_unregister
+from ..tracker.loader import register_app_handler, unregister_app_handler
+from ..tracker.tracking_blendshapes import (deformation_cache_frame_handler,
+                                            deformation_cache_save_handler,
+                                            frame_shape_index_reset_handler)
+from ..tracker.deformation_cache import close_deformation_caches
 
 
 _log = KTLogger(__name__)
@@ -53,12 +60,30 @@ def facetracker_register() -> None:
     _log.output('MAIN FACETRACKER VARIABLE REGISTER')
     add_addon_settings_var(Config.ft_global_var_name, FTSceneSettings)
 
+    _log.output('FACETRACKER DEFORMATION CACHE HANDLER REGISTER')
+    register_app_handler(frame_change_pre, deformation_cache_frame_handler)
+    register_app_handler(save_pre, deformation_cache_save_handler)
+
+    _log.output('FACETRACKER FRAME SHAPE INDEX HANDLER REGISTER')
+    for app_handlers in (undo_post, redo_post, load_post):
+        register_app_handler(app_handlers, frame_shape_index_reset_handler)
+
     _log.green('=== FACETRACKER REGISTERED ===')
 
 
 def facetracker_unregister() -> None:
     _log.green('--- START FACETRACKER UNREGISTER ---')
 
+    _log.output('FACETRACKER FRAME SHAPE INDEX HANDLER UNREGISTER')
+    for app_handlers in (undo_post, redo_post, load_post):
+        unregister_app_handler(app_handlers, frame_shape_index_reset_handler)
+    frame_shape_index_reset_handler()
+
+    _log.output('FACETRACKER DEFORMATION CACHE HANDLER UNREGISTER')
+    unregister_app_handler(frame_change_pre, deformation_cache_frame_handler)
+    unregister_app_handler(save_pre, deformation_cache_save_handler)
+    close_deformation_caches()
+
     _log.output('FACETRACKER KEYMAPS UNREGISTER')
     all_keymaps_unregister()
 
@@ -771,6 +771,20 @@ class FT_PT_OptionsPanel(View3DPanel):
             row = col.row(align=True)
             row.prop(geotracker, 'neck_movement_rigidity')
 
+        col = layout.column(align=True)
+        col.label(text='Deformation storage')
+        row = col.row(align=True)
+        for storage, text in (('SHAPE_KEYS', 'Shape keys'),
+                              ('CACHE_FILE', 'Cache file')):
+            op = row.operator(
+                FTConfig.ft_convert_deformation_storage_idname, text=text,
+                depress=geotracker.deformation_storage == storage)
+            op.storage = storage
+        if geotracker.deformation_storage == 'CACHE_FILE':
+            row = col.row(align=True)
+            row.enabled = False
+            row.prop(geotracker, 'deformation_cache_path', text='')
+
 
 class FT_PT_MasksPanel(AllVisible):
     bl_idname = FTConfig.ft_masks_panel_idname
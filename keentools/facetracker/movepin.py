@@ -61,9 +61,9 @@ class FT_OT_MovePin(MovePin):
 
     def update_wireframe(self):
         settings = self.get_settings()
-        settings.loader().update_viewport_shaders(wireframe_data=True,
-                                                  geomobj_matrix=True,
-                                                  wireframe=True)
+        settings.loader().schedule_viewport_update(wireframe_data=True,
+                                                   geomobj_matrix=True,
+                                                   wireframe=True)
 
     def update_on_left_mouse_release(self) -> None:
         _log.yellow(f'ft update_on_left_mouse_release start')
@@ -92,6 +92,8 @@ from ..preferences.hotkeys import (pan_keymaps_register,
 from ..utils.localview import exit_area_localview
 from ..utils.viewport_state import force_show_ui_overlays
 from ..facetracker.rig import transfer_animation_to_rig
+from ..tracker.tracking_blendshapes import (shape_keys_to_deformation_cache,
+                                            deformation_cache_to_shape_keys)
 
 
 _log = KTLogger(__name__)
@@ -1427,6 +1429,48 @@ class FT_OT_TransferAnimationToRigOptions(Operator):
         return context.window_manager.invoke_props_dialog(self, width=350)
 
 
+class FT_OT_ConvertDeformationStorage(ButtonOperator, Operator):
+    bl_idname = FTConfig.ft_convert_deformation_storage_idname
+    bl_label = buttons[bl_idname].label
+    bl_description = buttons[bl_idname].description
+
+    storage: EnumProperty(
+        name='Deformation storage',
+        items=[
+            ('SHAPE_KEYS', 'Shape keys',
+             'One shape key per tracked frame', 0),
+            ('CACHE_FILE', 'Cache file',
+             'Tracked frames are kept in a cache file and applied '
+             'to a single shape key on frame change', 1),
+        ],
+        default='SHAPE_KEYS')
+
+    def invoke(self, context, event):
+        geotracker = ft_settings().get_current_geotracker_item()
+        if not geotracker or geotracker.deformation_storage == self.storage:
+            return {'CANCELLED'}
+        return context.window_manager.invoke_confirm(self, event)
+
+    def execute(self, context):
+        _log.green(f'{self.__class__.__name__} execute: {self.storage}')
+        settings = ft_settings()
+        geotracker = settings.get_current_geotracker_item()
+        if not geotracker or not geotracker.geomobj:
+            self.report({'ERROR'}, 'No FaceTracker head')
+            return {'CANCELLED'}
+        if geotracker.deformation_storage == self.storage:
+            return {'CANCELLED'}
+
+        if self.storage == 'CACHE_FILE':
+            count = shape_keys_to_deformation_cache(geotracker)
+        else:
+            count = deformation_cache_to_shape_keys(geotracker)
+        geotracker.deformation_storage = self.storage
+        self.report({'INFO'}, f'Converted frames: {count}')
+        _log.output(f'{self.__class__.__name__} execute end >>>')
+        return {'FINISHED'}
+
+
 BUTTON_CLASSES = (FT_OT_CreateFaceTracker,
                   FT_OT_DeleteFaceTracker,
                   FT_OT_SelectGeotrackerObjects,
@@ -1471,4 +1515,5 @@ BUTTON_CLASSES = (FT_OT_CreateFaceTracker,
                   FT_OT_AddChosenFrame,
                   FT_OT_TransferFACSAnimation,
                   FT_OT_TransferAnimationToRig,
-                  FT_OT_TransferAnimationToRigOptions)
+                  FT_OT_TransferAnimationToRigOptions,
+                  FT_OT_ConvertDeformationStorage)
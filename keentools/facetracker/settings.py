@@ -61,7 +61,10 @@ from .callbacks import (update_camobj,
                         update_rigidity,
                         update_blinking_rigidity,
                         update_neck_movement_rigidity)
-from ..tracker.settings import FrameListItem, TrackerItem, TRSceneSetting
+from ..tracker.settings import (FrameListItem,
+                                SerialChunkItem,
+                                TrackerItem,
+                                TRSceneSetting)
 
 
 _log = KTLogger(__name__)
@@ -83,6 +86,11 @@ def poll_mesh_has_blendshapes_and_not_ft(self: Any, obj: Optional[Object]) -> bo
 
 class FaceTrackerItem(TrackerItem):
     serial_str: StringProperty(name='GeoTracker Serialization string')
+    serial_chunks: CollectionProperty(type=SerialChunkItem,
+                                      name='Serialization chunks')
+    serial_chunk_order: StringProperty(name='Serialization chunk order')
+    serial_str_digest: StringProperty(
+        name='Digest of serial_str written with the chunks')
     geomobj: PointerProperty(
         name='Head',
         description='Select head with FaceBuilder topology '
@@ -112,6 +120,22 @@ class FaceTrackerItem(TrackerItem):
     precalc_end: IntProperty(name='to', default=250, min=0)
     precalc_message: StringProperty(name='Precalc info')
 
+    deformation_storage: EnumProperty(
+        name='Deformation storage',
+        items=[
+            ('SHAPE_KEYS', 'Shape keys',
+             'One shape key per tracked frame', 0),
+            ('CACHE_FILE', 'Cache file',
+             'Tracked frames are kept in a cache file and applied '
+             'to a single shape key on frame change. '
+             'The file is written directly and is not reverted by Undo', 1),
+        ],
+        default='SHAPE_KEYS')
+    deformation_cache_path: StringProperty(
+        name='Deformation cache file path',
+        description='The path for the tracked deformation cache file',
+        subtype='FILE_PATH')
+
     solve_for_camera: BoolProperty(
         name='Track for Camera or Geometry',
         description='Which object will be tracked Geometry or Camera',
@@ -358,6 +358,11 @@ buttons = {
         'Options',
         'Setup transfer settings'
     ),
+    FTConfig.ft_convert_deformation_storage_idname: Button(
+        'Convert deformation storage',
+        'Move tracked frame deformations between per-frame shape keys '
+        'and a cache file'
+    ),
     # Menu buttons
     FTConfig.ft_clear_tracking_menu_exec_idname: Button(
         'Clear menu',
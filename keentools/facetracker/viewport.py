@@ -33,7 +33,7 @@ from ..utils.edges import (KTEdgeShader2D,
                            KTScreenDashedRectangleShader2D)
 from ..utils.polygons import KTRasterMask
 from .edges import FTRasterEdgeShader3D
-from ..utils.coords import (pin_to_xyz_from_geo_mesh,
+from ..utils.coords import (barycentric_points,
                             xy_to_xz_rotation_matrix_3x3,
                             InvScaleFromMatrix)
 
@@ -70,12 +70,15 @@ class FTViewport(GTViewport):
                                  keyframe: int) -> Any:
         geo = gt.applied_args_model_at(keyframe)
         geo_mesh = geo.mesh(0)
-        pins_count = gt.pins_count()
-        verts = np.empty((pins_count, 3), dtype=np.float32)
-        for i in range(pins_count):
-            pin = gt.pin(keyframe, i)
-            p = pin_to_xyz_from_geo_mesh(pin, geo_mesh)
-            verts[i] = p
+        indices, weights = self.pins_barycentric_arrays(gt, keyframe)
+        # Only the points referenced by pins are taken from the model
+        used, local_indices = np.unique(indices[indices >= 0],
+                                        return_inverse=True)
+        points = np.array([geo_mesh.point(i) for i in used],
+                          dtype=np.float32).reshape((-1, 3))
+        remapped = np.full(indices.shape, -1, dtype=np.int32)
+        remapped[indices >= 0] = local_indices
+        verts = barycentric_points(points, remapped, weights)
 
         scale_inv = np.array(InvScaleFromMatrix(obj.matrix_world),
                              dtype=np.float32)
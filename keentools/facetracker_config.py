@@ -134,6 +134,7 @@ class FTConfig:
     ft_transfer_facs_animation_idname = operators + '.transfer_facs_animation'
     ft_transfer_animation_to_rig_idname = operators + '.transfer_animation_to_rig'
     ft_transfer_animation_to_rig_options_idname = operators + '.transfer_animation_to_rig_options'
+    ft_convert_deformation_storage_idname = operators + '.convert_deformation_storage'
 
     ft_appearance_preset_add_idname = operators + '.appearance_preset_add'
 
@@ -191,4 +192,8 @@ class FTConfig:
     ft_updates_installation_panel_idname = _PT + 'updates_installation_panel'
 
     ft_action_name = 'ftAction'
+    ft_deformation_shape_name = 'ft_deformation'
+    ft_deformation_cache_ext = '.ktdc'
+    ft_deformation_cache_dtype = 'float16'
+    ft_deformation_cache_min_garbage = 64  # rows before compaction
     ft_wireframe_offset_constant: float = 0.001
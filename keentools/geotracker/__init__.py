@@ -16,13 +16,17 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # ##### END GPL LICENSE BLOCK #####
 
+from bpy.app.handlers import (depsgraph_update_post, undo_post, redo_post,
+                               load_post, save_pre)
 from bpy.utils import register_class, unregister_class
 
 from ..utils.kt_logging import KTLogger
 from ..addon_config import (Config,
                             add_addon_settings_var,
                             remove_addon_settings_var)
-from ..tracker.settings import FrameListItem
+from ..tracker.settings import (FrameListItem,
+                                SerialChunkItem,
+                                serial_str_save_handler)
 from .settings import GeoTrackerItem, GTSceneSettings
 from .pinmode import GT_OT_PinMode
 from .movepin import GT_OT_MovePin
@@ -30,12 +34,22 @@ from .interface import CLASSES_TO_REGISTER as INTERFACE_CLASSES
 from .operators import BUTTON_CLASSES
 from ..preferences.hotkeys import all_keymaps_unregister
 from .actor import GT_OT_Actor
+from ..tracker.loader import register_app_handler, unregister_app_handler
+from ..utils.keyframe_index import (keyframe_index_depsgraph_handler,
+                                    keyframe_index_reset_handler,
+                                    clear_keyframe_indices)
+from ..tracker.mask_cache import (compositing_mask_depsgraph_handler,
+                                  compositing_mask_reset_handler)
+from ..tracker.cam_input import frame_cache_reset_handler
+from ..utils.mesh_builder import mesh_cache_reset_handler
+from .utils.precalc_batch import cancel_precalc_batch
 
 
 _log = KTLogger(__name__)
 
 
 CLASSES_TO_REGISTER = (FrameListItem,
+                       SerialChunkItem,
                        GeoTrackerItem,
                        GT_OT_Actor,
                        GT_OT_PinMode,
@@ -54,12 +68,61 @@ def geotracker_register() -> None:
     _log.output('MAIN GEOTRACKER VARIABLE REGISTER')
     add_addon_settings_var(Config.gt_global_var_name, GTSceneSettings)
 
+    _log.output('KEYFRAME INDEX HANDLERS REGISTER')
+    register_app_handler(depsgraph_update_post,
+                         keyframe_index_depsgraph_handler)
+    for app_handlers in (undo_post, redo_post, load_post):
+        register_app_handler(app_handlers, keyframe_index_reset_handler)
+
+    _log.output('COMPOSITING MASK CACHE HANDLERS REGISTER')
+    register_app_handler(depsgraph_update_post,
+                         compositing_mask_depsgraph_handler)
+    for app_handlers in (undo_post, redo_post, load_post):
+        register_app_handler(app_handlers, compositing_mask_reset_handler)
+
+    _log.output('FRAME CACHE HANDLER REGISTER')
+    register_app_handler(load_post, frame_cache_reset_handler)
+
+    _log.output('MESH CACHE HANDLER REGISTER')
+    register_app_handler(load_post, mesh_cache_reset_handler)
+
+    _log.output('SERIAL SAVE HANDLER REGISTER')
+    register_app_handler(save_pre, serial_str_save_handler)
+
     _log.green('=== GEOTRACKER REGISTERED ===')
 
 
 def geotracker_unregister() -> None:
     _log.green('--- START GEOTRACKER UNREGISTER ---')
 
+    _log.output('PRECALC BATCH CANCEL')
+    cancel_precalc_batch()
+
+    _log.output('SERIAL SAVE HANDLER UNREGISTER')
+    unregister_app_handler(save_pre, serial_str_save_handler)
+
+    _log.output('MESH CACHE HANDLER UNREGISTER')
+    unregister_app_handler(load_post, mesh_cache_reset_handler)
+    mesh_cache_reset_handler()
+
+    _log.output('FRAME CACHE HANDLER UNREGISTER')
+    unregister_app_handler(load_post, frame_cache_reset_handler)
+    frame_cache_reset_handler()
+
+    _log.output('COMPOSITING MASK CACHE HANDLERS UNREGISTER')
+    for app_handlers in (undo_post, redo_post, load_post):
+        unregister_app_handler(app_handlers, compositing_mask_reset_handler)
+    unregister_app_handler(depsgraph_update_post,
+                           compositing_mask_depsgraph_handler)
+    compositing_mask_reset_handler()
+
+    _log.output('KEYFRAME INDEX HANDLERS UNREGISTER')
+    for app_handlers in (undo_post, redo_post, load_post):
+        unregister_app_handler(app_handlers, keyframe_index_reset_handler)
+    unregister_app_handler(depsgraph_update_post,
+                           keyframe_index_depsgraph_handler)
+    clear_keyframe_indices()
+
     _log.output('GEOTRACKER KEYMAPS UNREGISTER')
     all_keymaps_unregister()
 
@@ -620,7 +620,8 @@ class GT_OT_ReprojectTextureSequence(Operator, ExportHelper):
                               filepath_pattern=filepath_pattern,
                               frames=frames,
                               file_format=self.file_format,
-                              product=self.product)
+                              product=self.product,
+                              use_half_precision=self.use_half_precision)
 
         return {'FINISHED'}
 
@@ -1065,5 +1066,6 @@ class KT_OT_BakeWireframeSequence(Operator, ExportHelper):
                                 lit_wireframe=self.lit_wireframe,
                                 backface_culling=self.wireframe_backface_culling,
                                 use_background=self.use_background,
-                                product=self.product)
+                                product=self.product,
+                                use_half_precision=self.use_half_precision)
         return {'FINISHED'}
@@ -52,7 +52,10 @@ from .callbacks import (update_camobj,
                         update_smoothing,
                         update_stabilize_viewport_enabled,
                         update_locks)
-from ..tracker.settings import FrameListItem, TrackerItem, TRSceneSetting
+from ..tracker.settings import (FrameListItem,
+                                SerialChunkItem,
+                                TrackerItem,
+                                TRSceneSetting)
 
 
 _log = KTLogger(__name__)
@@ -60,6 +63,11 @@ _log = KTLogger(__name__)
 
 class GeoTrackerItem(TrackerItem):
     serial_str: StringProperty(name='GeoTracker Serialization string')
+    serial_chunks: CollectionProperty(type=SerialChunkItem,
+                                      name='Serialization chunks')
+    serial_chunk_order: StringProperty(name='Serialization chunk order')
+    serial_str_digest: StringProperty(
+        name='Digest of serial_str written with the chunks')
     geomobj: PointerProperty(
         name='Geometry',
         description='Select target geometry from the list '
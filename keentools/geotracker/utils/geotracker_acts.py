@@ -93,6 +93,7 @@ from ...utils.coords import (LocRotScale,
 from .textures import bake_texture, preview_material_with_texture, get_bad_frame
 from ..interface.screen_mesages import clipping_changed_screen_message
 from ...utils.ui_redraw import total_redraw_ui
+from ...tracker.mask_cache import prerender_compositing_masks
 from ...tracker.calc_timer import (TrackTimer,
                                    RefineTimer,
                                    RefineTimerFast,
@@ -107,11 +108,11 @@ from ...utils.unbreak import (mark_object_keyframes,
                               unbreak_object_rotation_act,
                               unbreak_rotation_act,
                               unbreak_rotation_with_status)
-from ...tracker.tracking_blendshapes import create_relative_shape_keyframe
+from ...tracker.tracking_blendshapes import (create_relative_shape_keyframe,
+                                             create_relative_shape_keyframes)
 from ...utils.blendshapes import create_basis_blendshape
 from ...utils.fcurve_operations import (get_safe_action_fcurve,
-                                        put_anim_data_in_fcurve,
-                                        cleanup_keys_in_interval,
+                                        replace_keys_in_interval,
                                         snap_keys_in_interval)
 
 
@@ -478,14 +479,17 @@ def refine_async_action(*, product: int) -> ActionStatus:
     geotracker = settings.get_current_geotracker_item()
     gt = settings.loader().kt_geotracker()
     current_frame = bpy_current_frame()
+    next_frame = get_next_tracking_keyframe(gt, current_frame)
+    prev_frame = get_previous_tracking_keyframe(gt, current_frame)
 
     if not geotracker.precalcless:
-        next_frame = get_next_tracking_keyframe(gt, current_frame)
-        prev_frame = get_previous_tracking_keyframe(gt, current_frame)
         if not (geotracker.precalc_start <= prev_frame <= geotracker.precalc_end and
                 geotracker.precalc_start <= next_frame <= geotracker.precalc_end):
             return ActionStatus(False, 'Selected frame range is outside '
                                        'of the precalc range')
+    if geotracker.get_2d_mask_source() == 'COMP_MASK':
+        prerender_compositing_masks(geotracker,
+                                    range(prev_frame, next_frame + 1))
     try:
         precalc_path = None if geotracker.precalcless else geotracker.precalc_path
         refine_computation = gt.refine_async(current_frame, precalc_path)
@@ -1515,22 +1519,20 @@ def save_facs_as_animation_action(*, from_frame: int = 1, to_frame: int = 1,
 
     blendshape_action = bpy_new_action(action_name)
 
+    keyframes = [x for x in facs_animation.keyframes()]
+    if len(keyframes) > 0:
+        start_keyframe = keyframes[0]
+        end_keyframe = keyframes[-1]
+    else:
+        start_keyframe = 0
+        end_keyframe = -1
+
     for name in facs_names:
         blendshape_fcurve = get_safe_action_fcurve(
             blendshape_action, 'key_blocks["{}"].value'.format(name), index=0)
-
-        keyframes = [x for x in facs_animation.keyframes()]
-        if len(keyframes) > 0:
-            start_keyframe = keyframes[0]
-            end_keyframe = keyframes[-1]
-        else:
-            start_keyframe = 0
-            end_keyframe = -1
-        cleanup_keys_in_interval(blendshape_fcurve,
-                                 start_keyframe, end_keyframe)
-
-        anim_data_list = [x for x in zip(keyframes, facs_animation.at_name(name))]
-        put_anim_data_in_fcurve(blendshape_fcurve, anim_data_list)
+        replace_keys_in_interval(
+            blendshape_fcurve, start_keyframe, end_keyframe,
+            np.column_stack((keyframes, facs_animation.at_name(name))))
         snap_keys_in_interval(blendshape_fcurve, start_keyframe, end_keyframe)
 
     if not obj.data.shape_keys:
@@ -1975,6 +1977,5 @@ def bake_locrot_action(obj: Object, *, product: int) -> ActionStatus:
 def after_ft_refine(frame_list: List) -> None:
     _log.yellow('after_ft_refine start')
     unbreak_after(frame_list, product=ProductType.FACETRACKER)
-    for frame in frame_list:
-        create_relative_shape_keyframe(frame)
+    create_relative_shape_keyframes(frame_list)
     _log.output('after_ft_refine end >>>')
@@ -33,12 +33,15 @@ from ...utils.images import (np_image_to_grayscale,
                              np_array_from_background_image,
                              get_background_image_object,
                              check_bpy_image_size,
-                             np_array_from_bpy_image)
+                             np_array_from_bpy_image,
+                             ImageBufferPool)
 from ...utils.bpy_common import (bpy_render_frame,
                                  bpy_current_frame,
                                  update_depsgraph,
                                  bpy_background_mode,
                                  bpy_timer_register)
+from ...utils.frame_source import FrameSource, FramePrefetcher
+from ...geotracker_config import GTConfig
 from ...tracker.class_loader import KTClassLoader
 from ...utils.timer import RepeatTimer
 from .prechecks import common_checks, prepare_camera
@@ -53,6 +56,54 @@ _log = KTLogger(__name__)
 
 
 class PrecalcTimer(CalcTimer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._frame_source: Optional[FrameSource] = None
+        self._prefetcher: Optional[FramePrefetcher] = None
+        self._image_pool: ImageBufferPool = ImageBufferPool()
+
+    def start_prefetching(self, frame_from: int, frame_to: int) -> None:
+        settings = get_settings(self.product)
+        geotracker = settings.get_current_geotracker_item()
+        movie_clip = geotracker.movie_clip if geotracker else None
+        if not movie_clip or tuple(movie_clip.size[:]) != bpy_render_frame():
+            _log.output('start_prefetching: frame size mismatch')
+            return
+
+        self._frame_source = FrameSource(movie_clip)
+        if self._frame_source.decodable():
+            self._prefetcher = FramePrefetcher(
+                self._frame_source, list(range(frame_from, frame_to + 1)),
+                depth=GTConfig.precalc_prefetch_depth,
+                memory_limit=GTConfig.precalc_prefetch_memory_limit)
+            if not self._prefetcher.start():
+                self._prefetcher = None
+        _log.output(f'start_prefetching: {self._prefetcher is not None}')
+
+    def _stop_prefetching(self) -> None:
+        if self._prefetcher is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
+        self._frame_source = None
+
+    def _load_frame_directly(self, frame: int) -> Tuple[bool, Optional[Any]]:
+        ''' :return: (pending, np_img) '''
+        if self._prefetcher is not None:
+            pending, np_img = self._prefetcher.take(frame)
+            if pending or np_img is not None:
+                return pending, np_img
+        if self._frame_source is not None:
+            np_img = self._frame_source.load_in_main_thread(frame)
+            if np_img is not None:
+                return False, np_img
+            _log.output(f'direct frame loading is disabled at: {frame}')
+            self._stop_prefetching()
+        return False, None
+
+    def finish_calc_mode(self) -> None:
+        self._stop_prefetching()
+        super().finish_calc_mode()
+
     def finish_error_state(self) -> None:
         self.finish_calc_mode()
         settings = get_settings(self.product)
@@ -97,8 +148,15 @@ class PrecalcTimer(CalcTimer):
             return self._interval
         _log.output(f'loading_frame: {next_frame}')
         settings.user_percent = progress * 100
-        current_frame = bpy_current_frame()
 
+        pending, np_img = self._load_frame_directly(next_frame)
+        if pending:
+            return self._interval
+        if np_img is not None:
+            self._runner.fulfill_loading_request(np_img)
+            return self._interval
+
+        current_frame = bpy_current_frame()
         if current_frame != next_frame:
             _log.output(f'NEXT FRAME IS NOT REACHED: {next_frame} current={current_frame}')
             self._target_frame = next_frame
@@ -107,7 +165,8 @@ class PrecalcTimer(CalcTimer):
 
         geotracker = settings.get_current_geotracker_item()
 
-        np_img = np_array_from_background_image(geotracker.camobj, index=0)
+        np_img = np_array_from_background_image(
+            geotracker.camobj, index=0, pool=self._image_pool, channels=3)
         if np_img is None:
             if not bpy_background_mode():
                 msg = f'Cannot load image at frame: {current_frame}' \
@@ -144,10 +203,11 @@ class PrecalcTimer(CalcTimer):
                 self.set_current_state(self.finish_error_state)
                 return self.current_state()
 
-            np_img = np_array_from_bpy_image(img)
+            np_img = np_array_from_bpy_image(img, pool=self._image_pool,
+                                             channels=3)
             bpy.data.images.remove(img)
 
-        self._runner.fulfill_loading_request(np_img[:, :, :3])
+        self._runner.fulfill_loading_request(np_img)
         return self._interval
 
     def start(self) -> bool:
@@ -228,6 +288,7 @@ def precalc_with_runner_act(context: Any, *, product: int) -> ActionStatus:
         license_manager, True)
 
     pt = PrecalcTimer(area, runner, product=product, viewport=text_viewport)
+    pt.start_prefetching(geotracker.precalc_start, geotracker.precalc_end)
     if pt.start():
         _log.output('Precalc started')
     else:
@@ -0,0 +1,368 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' Precalc of many clips in parallel background Blender processes.
+    Usage from a script (blender -b -P script.py) for a night batch:
+        queue = PrecalcBatchQueue([PrecalcBatchJob(clip, 1, 250, output)])
+        queue.run_blocking()
+    or start_precalc_batch(jobs) to run it by a timer in the UI session.
+    Jobs with an existing output file are skipped, so a restarted queue
+    continues after the last completed job.
+'''
+
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import bpy
+
+from ...utils.kt_logging import KTLogger
+from ...geotracker_config import GTConfig
+from ...utils.bpy_common import bpy_timer_register, bpy_timer_unregister
+from .precalc_worker import progress_prefix, partial_output_path
+
+
+_log = KTLogger(__name__)
+
+
+class PrecalcBatchJob:
+    ''' state: QUEUED, SKIPPED, RUNNING, DONE, FAILED or CANCELED '''
+    def __init__(self, clip_path: str, frame_from: int, frame_to: int,
+                 output_path: str):
+        self.clip_path: str = os.path.abspath(bpy.path.abspath(clip_path))
+        self.frame_from: int = frame_from
+        self.frame_to: int = frame_to
+        self.output_path: str = os.path.abspath(bpy.path.abspath(output_path))
+        self.state: str = 'QUEUED'
+        self.progress: float = 0.0
+        self.message: str = ''
+
+    def is_active(self) -> bool:
+        return self.state in {'QUEUED', 'RUNNING'}
+
+    def description(self) -> str:
+        return json.dumps({'clip_path': self.clip_path,
+                           'frame_from': self.frame_from,
+                           'frame_to': self.frame_to,
+                           'output_path': self.output_path})
+
+    def __repr__(self) -> str:
+        return f'{os.path.basename(self.output_path)}: {self.state} ' \
+               f'{self.progress * 100:.1f}% {self.message}'
+
+
+def _linux_available_memory() -> Optional[int]:
+    ''' MemAvailable counts the reclaimable page cache too '''
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024  # kB
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _macos_available_memory() -> Optional[int]:
+    ''' Free, inactive, speculative and purgeable pages of vm_stat '''
+    try:
+        output = subprocess.run(['vm_stat'], capture_output=True, text=True,
+                                timeout=5, check=True).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    lines = output.splitlines()
+    if len(lines) == 0:
+        return None
+    match = re.search(r'page size of (\d+) bytes', lines[0])
+    page_size = int(match.group(1)) if match else 4096
+    pages = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.strip() in {'Pages free', 'Pages inactive',
+                            'Pages speculative', 'Pages purgeable'}:
+            try:
+                pages += int(value.strip().rstrip('.'))
+            except ValueError:
+                return None
+    return pages * page_size
+
+
+def _windows_available_memory() -> Optional[int]:
+    import ctypes
+
+    class MEMORYSTATUSEX(ctypes.Structure):
+        _fields_ = [('dwLength', ctypes.c_ulong),
+                    ('dwMemoryLoad', ctypes.c_ulong),
+                    ('ullTotalPhys', ctypes.c_ulonglong),
+                    ('ullAvailPhys', ctypes.c_ulonglong),
+                    ('ullTotalPageFile', ctypes.c_ulonglong),
+                    ('ullAvailPageFile', ctypes.c_ulonglong),
+                    ('ullTotalVirtual', ctypes.c_ulonglong),
+                    ('ullAvailVirtual', ctypes.c_ulonglong),
+                    ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+    status = MEMORYSTATUSEX()
+    status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+    try:
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(
+                ctypes.byref(status)):
+            return None
+    except (AttributeError, OSError):
+        return None
+    return status.ullAvailPhys
+
+
+def _available_memory() -> Optional[int]:
+    ''' Memory that can be given to new processes without swapping.
+        :return: None when it cannot be found
+    '''
+    if sys.platform.startswith('linux'):
+        memory = _linux_available_memory()
+    elif sys.platform == 'darwin':
+        memory = _macos_available_memory()
+    elif sys.platform == 'win32':
+        memory = _windows_available_memory()
+    else:
+        memory = None
+    if memory is not None:
+        return memory
+    try:  # free pages only, without the cache, so it is an underestimate
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def precalc_batch_worker_limit() -> int:
+    ''' Workers that fit into CPU cores and currently available memory,
+        only one worker when the memory size is unknown '''
+    memory = _available_memory()
+    if memory is None:
+        _log.warning('precalc_batch_worker_limit: unknown available memory')
+        return 1
+    limit = max(1, (os.cpu_count() or 1) // GTConfig.precalc_batch_cores_per_worker)
+    limit = min(limit, memory // GTConfig.precalc_batch_worker_memory)
+    return max(1, limit)
+
+
+def _addon_directory() -> str:
+    return os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+
+
+def _worker_command(job: PrecalcBatchJob) -> List[str]:
+    addon_dir = _addon_directory()
+    module_name = os.path.basename(addon_dir) + \
+        '.geotracker.utils.precalc_worker'
+    expression = f'import sys, importlib; ' \
+                 f'sys.path.insert(0, {os.path.dirname(addon_dir)!r}); ' \
+                 f'importlib.import_module({module_name!r}).main()'
+    return [bpy.app.binary_path, '--background', '--factory-startup',
+            '-noaudio', '--python-exit-code', '1',
+            '--python-expr', expression, '--', job.description()]
+
+
+class PrecalcBatchQueue:
+    ''' Runs jobs in no more than max_workers processes at the same time.
+        update() must be called periodically from the main thread,
+        it starts queued jobs and calls on_update for changed jobs.
+    '''
+    def __init__(self, jobs: List[PrecalcBatchJob], *, max_workers: int = 0,
+                 on_update: Optional[Callable[[PrecalcBatchJob], None]] = None):
+        self._jobs: List[PrecalcBatchJob] = list(jobs)
+        self._max_workers: int = max_workers if max_workers > 0 \
+            else precalc_batch_worker_limit()
+        self._on_update: Optional[Callable] = on_update
+        self._lock = threading.Lock()
+        self._processes: Dict[int, Any] = {}
+        self._readers: Dict[int, threading.Thread] = {}
+        self._reported: Dict[int, Any] = {}
+        self._started: bool = False
+
+    def jobs(self) -> List[PrecalcBatchJob]:
+        return self._jobs
+
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def is_finished(self) -> bool:
+        with self._lock:
+            return self._started and \
+                all(not job.is_active() for job in self._jobs)
+
+    def start(self) -> None:
+        for job in self._jobs:
+            if os.path.exists(job.output_path):
+                job.state = 'SKIPPED'
+                job.progress = 1.0
+                job.message = 'Output file exists'
+                _log.output(f'precalc batch skip: {job.output_path}')
+        self._started = True
+        _log.info(f'precalc batch start: {len(self._jobs)} jobs, '
+                  f'{self._max_workers} workers')
+        self.update()
+
+    def _read_output(self, index: int, process: Any) -> None:
+        job = self._jobs[index]
+        for line in process.stdout:
+            if not line.startswith(progress_prefix):
+                continue
+            try:
+                data = json.loads(line[len(progress_prefix):])
+            except ValueError:
+                continue
+            with self._lock:
+                if job.state == 'RUNNING':
+                    job.progress = data['progress']
+                    job.message = data['message']
+                    if data['state'] != 'RUNNING':
+                        self._reported[index] = data['state']
+
+    def _launch(self, index: int) -> None:
+        job = self._jobs[index]
+        try:
+            process = subprocess.Popen(
+                _worker_command(job), stdout=subprocess.PIPE,
+                stderr=None, stdin=subprocess.DEVNULL,
+                text=True, errors='replace')
+        except Exception as err:
+            _log.error(f'precalc batch launch Exception:\n{str(err)}')
+            job.state = 'FAILED'
+            job.message = str(err)
+            return
+        job.state = 'RUNNING'
+        job.message = 'Starting'
+        self._processes[index] = process
+        reader = threading.Thread(target=self._read_output,
+                                  args=(index, process), daemon=True)
+        self._readers[index] = reader
+        reader.start()
+        _log.output(f'precalc batch job started: {job.output_path}')
+
+    def _finish(self, index: int, returncode: int) -> None:
+        self._readers.pop(index).join(timeout=1.0)
+        del self._processes[index]
+        job = self._jobs[index]
+        with self._lock:
+            state = self._reported.pop(index, None)
+            if returncode == 0 and state == 'DONE':
+                job.state = 'DONE'
+                job.progress = 1.0
+            else:
+                job.state = 'FAILED'
+                if state != 'FAILED':
+                    job.message = f'Worker exit code: {returncode}'
+        _log.output(f'precalc batch job finished: {job}')
+
+    def update(self) -> bool:
+        ''' :return: True while there are active jobs '''
+        progress = {i: (job.state, job.progress)
+                    for i, job in enumerate(self._jobs)}
+        for index, process in list(self._processes.items()):
+            returncode = process.poll()
+            if returncode is not None:
+                self._finish(index, returncode)
+
+        for index, job in enumerate(self._jobs):
+            if len(self._processes) >= self._max_workers:
+                break
+            if job.state == 'QUEUED':
+                self._launch(index)
+
+        if self._on_update is not None:
+            for i, job in enumerate(self._jobs):
+                if progress[i] != (job.state, job.progress):
+                    self._on_update(job)
+        return not self.is_finished()
+
+    def cancel(self) -> None:
+        for process in self._processes.values():
+            process.terminate()
+        for index, process in list(self._processes.items()):
+            try:
+                process.wait(timeout=5.0)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            self._readers.pop(index).join(timeout=1.0)
+            del self._processes[index]
+        with self._lock:
+            for job in self._jobs:
+                if job.is_active():
+                    if job.state == 'RUNNING' and \
+                            os.path.exists(partial_output_path(job.output_path)):
+                        os.remove(partial_output_path(job.output_path))
+                    job.state = 'CANCELED'
+        _log.info('precalc batch canceled')
+
+    def run_blocking(self, interval: float = 1.0) -> bool:
+        ''' :return: True when all jobs are done or skipped '''
+        self.start()
+        try:
+            while self.update():
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.cancel()
+        return all(job.state in {'DONE', 'SKIPPED'} for job in self._jobs)
+
+
+_batch_queue: Optional[PrecalcBatchQueue] = None
+
+
+def get_precalc_batch() -> Optional[PrecalcBatchQueue]:
+    return _batch_queue
+
+
+def _log_job_update(job: PrecalcBatchJob) -> None:
+    _log.info(f'precalc batch: {job}')
+
+
+def _precalc_batch_timer() -> Optional[float]:
+    if _batch_queue is None or not _batch_queue.update():
+        _log.output('precalc batch timer is over')
+        return None
+    return GTConfig.precalc_batch_update_interval
+
+
+def start_precalc_batch(jobs: List[PrecalcBatchJob], *,
+                        max_workers: int = 0) -> Optional[PrecalcBatchQueue]:
+    ''' Runs the queue by a Blender timer.
+        :return: None when another batch is still running
+    '''
+    global _batch_queue
+    if _batch_queue is not None and not _batch_queue.is_finished():
+        _log.error('start_precalc_batch: previous batch is still running')
+        return None
+    _batch_queue = PrecalcBatchQueue(jobs, max_workers=max_workers,
+                                     on_update=_log_job_update)
+    _batch_queue.start()
+    bpy_timer_register(_precalc_batch_timer,
+                       first_interval=GTConfig.precalc_batch_update_interval,
+                       persistent=True)
+    return _batch_queue
+
+
+def cancel_precalc_batch() -> None:
+    ''' Worker processes are stopped and the timer is removed '''
+    bpy_timer_unregister(_precalc_batch_timer)
+    if _batch_queue is not None and not _batch_queue.is_finished():
+        _batch_queue.cancel()
@@ -0,0 +1,148 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' Precalc of one clip in a background Blender process started
+    by PrecalcBatchQueue. Frames are decoded from the clip file,
+    no scene or UI is used. The result is written to a partial file
+    which is renamed to the output path when precalc is finished,
+    so an existing output file is always complete.
+    The state is printed to stdout as lines starting with progress_prefix.
+'''
+
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+from ...utils.kt_logging import KTLogger
+from ...utils.frame_source import FrameSource, FramePrefetcher
+from ...geotracker_config import GTConfig
+from ...blender_independent_packages.pykeentools_loader import module as pkt_module
+
+
+_log = KTLogger(__name__)
+
+
+progress_prefix: str = 'KT_PRECALC_BATCH '
+_poll_interval: float = 0.01
+_report_interval: float = 0.5
+
+
+def partial_output_path(output_path: str) -> str:
+    root, ext = os.path.splitext(output_path)
+    return f'{root}.partial{ext}'
+
+
+def _report(state: str, progress: float = 0.0, message: str = '') -> None:
+    print(progress_prefix + json.dumps({'state': state,
+                                        'progress': progress,
+                                        'message': message}), flush=True)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+    except OSError as err:
+        _log.error(f'_remove_file Exception:\n{str(err)}')
+
+
+def _wait_for_runner(runner: Any) -> None:
+    while not runner.is_finished():
+        time.sleep(_poll_interval)
+
+
+def run_precalc_job(clip_path: str, frame_from: int, frame_to: int,
+                    output_path: str) -> bool:
+    from .precalc_runner import PrecalcRunner
+
+    frame_source = FrameSource.from_file(clip_path)
+    if frame_source is None:
+        _report('FAILED', message=f'Cannot read clip: {clip_path}')
+        return False
+    if frame_from >= frame_to or not frame_source.has_frame(frame_from) \
+            or not frame_source.has_frame(frame_to):
+        _report('FAILED', message=f'Wrong frame range: {frame_from}-{frame_to}'
+                                  f' clip has {frame_source.frame_duration}'
+                                  f' frames')
+        return False
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    partial_path = partial_output_path(output_path)
+    _remove_file(partial_path)
+
+    frames: List[int] = list(range(frame_from, frame_to + 1))
+    prefetcher = FramePrefetcher(
+        frame_source, frames, depth=GTConfig.precalc_prefetch_depth,
+        memory_limit=GTConfig.precalc_prefetch_memory_limit)
+    prefetcher.start()
+    runner = PrecalcRunner(partial_path, frame_source.width,
+                           frame_source.height, frame_from, frame_to,
+                           pkt_module().GeoTracker.license_manager(), True)
+    _report('RUNNING', 0.0, 'Initialization')
+    last_report_time = time.time()
+    try:
+        while not runner.is_finished():
+            frame = runner.is_loading_frame_requested()
+            if frame is not None:
+                pending, np_img = prefetcher.take(frame)
+                if not pending and np_img is None:
+                    np_img = frame_source.decode(frame)
+                    if np_img is None:
+                        runner.cancel()
+                        _wait_for_runner(runner)
+                        _remove_file(partial_path)
+                        _report('FAILED',
+                                message=f'Cannot decode frame: {frame}')
+                        return False
+                if np_img is not None:
+                    runner.fulfill_loading_request(np_img)
+                    continue
+
+            if time.time() - last_report_time >= _report_interval:
+                progress, message = runner.current_progress()
+                _report('RUNNING', progress, message)
+                last_report_time = time.time()
+            time.sleep(_poll_interval)
+    finally:
+        prefetcher.stop()
+
+    err = runner.exception()
+    if err is not None:
+        _remove_file(partial_path)
+        _report('FAILED', message=str(err))
+        return False
+
+    os.replace(partial_path, output_path)
+    _report('DONE', 1.0, 'Done')
+    return True
+
+
+def main() -> None:
+    ''' Job description is a JSON object in the argument after -- '''
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    try:
+        job: Dict = json.loads(argv[0])
+        success = run_precalc_job(job['clip_path'], job['frame_from'],
+                                  job['frame_to'], job['output_path'])
+    except Exception as err:
+        _log.error(f'precalc worker Exception:\n{str(err)}')
+        _report('FAILED', message=str(err))
+        success = False
+    sys.exit(0 if success else 1)
@@ -17,12 +17,12 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import numpy as np
-from typing import Any, List, Optional, Tuple
+from typing import Any, Callable, List, Optional, Tuple
 
 from bpy.types import Object, Area
 
 from ...utils.kt_logging import KTLogger
-from ...addon_config import gt_settings, get_settings, ProductType
+from ...addon_config import Config, gt_settings, get_settings, ProductType
 from ...utils.version import BVersion
 from ...utils.bpy_common import (bpy_current_frame,
                                  bpy_set_current_frame,
@@ -32,13 +32,14 @@ from ...utils.bpy_common import (bpy_current_frame,
                                  bpy_progress_end,
                                  bpy_progress_update)
 from ...blender_independent_packages.pykeentools_loader import module as pkt_module
-from ...utils.mesh_builder import build_geo
+from ...utils.mesh_builder import GeoCache
 from ...utils.images import (np_array_from_background_image,
-                             create_bpy_image_from_np_array,
-                             create_compatible_bpy_image,
-                             assign_pixels_data,
-                             remove_bpy_image)
-from ...utils.coords import camera_projection
+                             create_bpy_image_from_np_array)
+from ...utils.coords import camera_projection, calc_model_mat_from_matrices
+from ...utils.animated_matrices import WorldMatrixEvaluator
+from ...utils.frame_source import FrameSource, get_frame_cache
+from ...utils.image_writer import ImageWriterPool
+from ...utils.image_kernels import release_scratch_buffers
 from ...utils.ui_redraw import (total_redraw_ui,
                                 total_redraw_ui_overriding_window)
 from ...utils.materials import (remove_bpy_texture_if_exists,
@@ -68,39 +69,118 @@ def get_bad_frame():
     return _bad_frame
 
 
+def _background_image_loader(geotracker: Any) -> Callable:
+    def _load_image(frame: int) -> Optional[Any]:
+        if not BVersion.open_dialog_overrides_area:
+            total_redraw_ui()
+        else:
+            total_redraw_ui_overriding_window()
+        return np_array_from_background_image(geotracker.camobj, index=0)
+    return _load_image
+
+
+def _movie_clip_image_loader(movie_clip: Any, frames: List[int],
+                             fallback: Callable) -> Callable:
+    ''' Frames are decoded from the clip files ahead of the baking
+        through the shared frame cache, fallback is used for the frames
+        that cannot be decoded that way '''
+    frame_cache = get_frame_cache(movie_clip) \
+        if movie_clip and tuple(movie_clip.size[:]) == bpy_render_frame() \
+        else None
+    if frame_cache is not None:
+        frame_cache.prefetch(frames)
+
+    def _load_image(frame: int) -> Optional[Any]:
+        np_img = frame_cache.get(frame) if frame_cache is not None else None
+        if np_img is None:
+            return fallback(frame)
+        h, w, _ = np_img.shape
+        rgba = np.ones((h, w, 4), dtype=np.float32)
+        rgba[:, :, :3] = np_img
+        return rgba
+    return _load_image
+
+
+def _main_thread_image_loader(frame_source: FrameSource) -> Callable:
+    def _load_image(frame: int) -> Optional[Any]:
+        np_img = frame_source.load_in_main_thread(frame)
+        if np_img is None:
+            return None
+        h, w, _ = np_img.shape
+        rgba = np.ones((h, w, 4), dtype=np.float32)
+        rgba[:, :, :3] = np_img
+        return rgba
+    return _load_image
+
+
+def _static_geo(obj: Object) -> bool:
+    ''' Geo of the object does not depend on the scene frame:
+        no modifiers, shape keys, mesh animation or animated scale
+        of the object and its parents (the world matrix scale is used) '''
+    if len(obj.modifiers) > 0 or obj.data.shape_keys is not None \
+            or obj.data.animation_data is not None:
+        return False
+    while obj is not None:
+        action = obj.animation_data.action if obj.animation_data else None
+        if action and any(fc.data_path in ('scale', 'delta_scale')
+                          for fc in action.fcurves):
+            return False
+        obj = obj.parent
+    return True
+
+
 def bake_texture(geotracker: Any, selected_frames: List[int],
-                 *, product: int) -> Any:
+                 *, product: int,
+                 image_loader: Optional[Callable] = None,
+                 loader_needs_scene_frame: bool = True) -> Any:
+    ''' :param image_loader: function returning the frame RGBA image,
+                             background image of the camera
+                             (that requires UI redraw) by default
+        :param loader_needs_scene_frame: False when image_loader reads
+                             frames without the scene frame. The scene
+                             frame is not changed then if the object and
+                             camera matrices can be found from fcurves
+    '''
     def _empty_np_image() -> Any:
         w, h = bpy_render_frame()
         np_img = np.zeros((h, w, 4), dtype=np.float32)
         return np_img
 
     def _create_frame_data_loader(geotracker, frame_numbers):
+        evaluator = WorldMatrixEvaluator()
+        keep_scene_frame = not loader_needs_scene_frame and \
+            _static_geo(geotracker.geomobj) and \
+            evaluator.is_evaluable(geotracker.camobj) and \
+            evaluator.is_evaluable(geotracker.geomobj)
+        _log.output(f'bake_texture keep_scene_frame: {keep_scene_frame}')
+
         def frame_data_loader(index):
             frame = frame_numbers[index]
             _log.output(f'frame_data_loader: {frame}')
             current_frame = bpy_current_frame()
 
-            if frame != current_frame:
+            if frame != current_frame and not keep_scene_frame:
                 bpy_set_current_frame(frame)
 
-            if not BVersion.open_dialog_overrides_area:
-                total_redraw_ui()
-            else:
-                total_redraw_ui_overriding_window()
-
-            np_img = np_array_from_background_image(geotracker.camobj, index=0)
+            np_img = load_image(frame)
             if np_img is None:
                 _set_bad_frame(frame)
                 return None
 
-            geo = build_geo(geotracker.geomobj, get_uv=True)
+            geo = GeoCache.get_geo(geotracker.geomobj, get_uv=True)
             frame_data = pkt_module().texture_builder.FrameData()
             frame_data.geo = geo
             frame_data.image = np_img
-            frame_data.model = geotracker.calc_model_matrix()
+            if keep_scene_frame:
+                frame_data.model = calc_model_mat_from_matrices(
+                    evaluator.world_matrix(geotracker.camobj, frame),
+                    evaluator.world_matrix(geotracker.geomobj, frame))
+                frame_data.projection = camera_projection(geotracker.camobj,
+                                                          frame=frame)
+            else:
+                frame_data.model = geotracker.calc_model_matrix()
+                frame_data.projection = camera_projection(geotracker.camobj)
             frame_data.view = np.eye(4)
-            frame_data.projection = camera_projection(geotracker.camobj)
             return frame_data
         return frame_data_loader
 
@@ -110,6 +190,8 @@ def bake_texture(geotracker: Any, selected_frames: List[int],
             return False
 
     progress_callBack = ProgressCallBack()
+    load_image = image_loader if image_loader is not None \
+        else _background_image_loader(geotracker)
 
     settings = get_settings(product)
     current_frame = bpy_current_frame()
@@ -129,8 +211,11 @@ def bake_texture(geotracker: Any, selected_frames: List[int],
     )
 
     bpy_progress_end()
+    release_scratch_buffers()
+    GeoCache.invalidate()
 
-    bpy_set_current_frame(current_frame)
+    if bpy_current_frame() != current_frame:
+        bpy_set_current_frame(current_frame)
     return built_texture
 
 
@@ -155,13 +240,14 @@ _bake_generator_var: Optional[Any] = None
 
 def bake_generator(area: Area, geotracker: Any, filepath_pattern: str,
                    *, file_format: str = 'PNG', frames: List[int],
-                   digits: int = 4, product: int) -> Any:
+                   digits: int = 4, product: int,
+                   compression: str = 'DEFAULT',
+                   use_half_precision: bool = True) -> Any:
     def _finish():
+        writer.cancel()
         settings.stop_calculating()
         revert_default_screen_message(unregister=not settings.pinmode,
                                       product=product)
-        if tex is not None:
-            remove_bpy_image(tex)
         if not settings.pinmode:
             settings.viewport_state.show_ui_elements(area)
             exit_area_localview(area)
@@ -174,30 +260,39 @@ def bake_generator(area: Area, geotracker: Any, filepath_pattern: str,
     single_line_screen_message('Projecting and baking… Please wait',
                                product=product)
 
-    tex = None
+    writer = ImageWriterPool(max_workers=Config.image_writer_threads,
+                             queue_size=Config.image_writer_queue_size,
+                             compression=compression,
+                             use_half_precision=use_half_precision)
     total_frames = len(frames)
-    for num, frame in enumerate(frames):
-        if settings.user_interrupts:
-            _finish()
-            return None
+    try:
+        for num, frame in enumerate(frames):
+            if settings.user_interrupts:
+                _finish()
+                return None
+
+            texture_projection_screen_message(num + 1, total_frames,
+                                              product=product)
 
-        texture_projection_screen_message(num + 1, total_frames, product=product)
+            settings.user_percent = 100 * num / total_frames
+            bpy_set_current_frame(frame)
 
-        settings.user_percent = 100 * num / total_frames
-        bpy_set_current_frame(frame)
+            yield delta
 
-        yield delta
+            built_texture = bake_texture(geotracker, [frame], product=product)
+            while writer.is_full():
+                yield delta
+            writer.put(filepath_pattern.format(str(frame).zfill(digits)),
+                       built_texture, file_format)
 
-        built_texture = bake_texture(geotracker, [frame], product=product)
-        if tex is None:
-            tex = create_compatible_bpy_image(built_texture)
-        tex.filepath_raw = filepath_pattern.format(str(frame).zfill(digits))
-        tex.file_format = file_format
-        assign_pixels_data(tex.pixels, built_texture.ravel())
-        tex.save()
-        _log.info(f'TEXTURE SAVED: {tex.filepath}')
+            yield delta
 
-        yield delta
+        while writer.pending() > 0:
+            if settings.user_interrupts:
+                break
+            yield delta
+    except Exception as err:
+        _log.error(f'Texture sequence writing error:\n{str(err)}')
 
     _finish()
     return None
@@ -217,14 +312,18 @@ def _bake_caller() -> Optional[float]:
 
 def bake_texture_sequence(area: Area, geotracker: Any, filepath_pattern: str,
                           *, file_format: str = 'PNG', frames: List[int],
-                          digits: int = 4, product: int) -> None:
+                          digits: int = 4, product: int,
+                          compression: str = 'DEFAULT',
+                          use_half_precision: bool = True) -> None:
     _log.yellow('bake_texture_sequence start')
     global _bake_generator_var
     _bake_generator_var = bake_generator(area, geotracker,
                                          filepath_pattern,
                                          file_format=file_format,
                                          frames=frames, digits=digits,
-                                         product=product)
+                                         product=product,
+                                         compression=compression,
+                                         use_half_precision=use_half_precision)
     prepare_camera(area, product=product)
     settings = get_settings(product)
     if not settings.pinmode:
@@ -232,3 +331,53 @@ def bake_texture_sequence(area: Area, geotracker: Any, filepath_pattern: str,
         vp.texter().register_handler(area=area)
     bpy_timer_register(_bake_caller, first_interval=0.0)
     _log.output('bake_texture_sequence end >>>')
+
+
+def bake_texture_sequence_headless(geotracker: Any, filepath_pattern: str,
+                                   *, frame_from: int, frame_to: int,
+                                   file_format: str = 'PNG', digits: int = 4,
+                                   product: int = ProductType.GEOTRACKER,
+                                   compression: str = 'DEFAULT',
+                                   use_half_precision: bool = True
+                                   ) -> List[int]:
+    ''' Texture sequence baking without viewport and UI redraw,
+        suitable for background mode (blender -b).
+        Frame pixels are read from the movie clip files directly,
+        the previous texture file is written while the next one is built.
+        :return: list of frames that could not be baked
+    '''
+    _log.yellow('bake_texture_sequence_headless start')
+    movie_clip = geotracker.movie_clip
+    if not movie_clip or not geotracker.geomobj or not geotracker.camobj:
+        _log.error('bake_texture_sequence_headless: wrong geotracker setup')
+        return list(range(frame_from, frame_to + 1))
+
+    image_loader = _movie_clip_image_loader(
+        movie_clip, list(range(frame_from, frame_to + 1)),
+        _main_thread_image_loader(FrameSource(movie_clip)))
+    writer = ImageWriterPool(max_workers=Config.image_writer_threads,
+                             queue_size=Config.image_writer_queue_size,
+                             compression=compression,
+                             use_half_precision=use_half_precision)
+    current_frame = bpy_current_frame()
+    bad_frames = []
+    try:
+        for frame in range(frame_from, frame_to + 1):
+            built_texture = bake_texture(geotracker, [frame], product=product,
+                                         image_loader=image_loader,
+                                         loader_needs_scene_frame=False)
+            if built_texture is None or get_bad_frame() == frame:
+                _log.error(f'bake_texture_sequence_headless: '
+                           f'bad frame {frame}')
+                bad_frames.append(frame)
+                continue
+            writer.put(filepath_pattern.format(str(frame).zfill(digits)),
+                       built_texture, file_format)
+        writer.finish()
+    finally:
+        writer.cancel()
+        if bpy_current_frame() != current_frame:
+            bpy_set_current_frame(current_frame)
+    _log.output(f'bake_texture_sequence_headless end >>> '
+                f'bad frames: {bad_frames}')
+    return bad_frames
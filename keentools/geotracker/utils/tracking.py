@@ -20,6 +20,8 @@ import os
 from typing import Tuple, Optional, Any, List
 from math import pi
 
+import numpy as np
+
 from bpy.types import Object
 
 from ...utils.kt_logging import KTLogger
@@ -195,13 +197,10 @@ def check_unbreak_rotaion_is_needed(obj: Object) -> bool:
         if len(points) < 2:
             continue
 
-        points.sort(key = lambda x: x[0])
-        prev = points[0][1]
-        for point in points[1:]:
-            if abs(prev - point[1]) > pi:
-                _log.magenta('check_unbreak_rotaion_is_needed True end >>>')
-                return True
-            prev = point[1]
+        values = points[np.argsort(points[:, 0], kind='stable'), 1]
+        if np.any(np.abs(np.diff(values)) > pi):
+            _log.magenta('check_unbreak_rotaion_is_needed True end >>>')
+            return True
 
     _log.output('check_unbreak_rotaion_is_needed False end >>>')
     return False
@@ -30,10 +30,14 @@ from ..addon_config import (Config,
 from ..geotracker_config import GTConfig
 from ..utils.coords import (get_camera_border,
                             image_space_to_region,
+                            image_space_to_region_arr,
                             frame_to_image_space,
+                            frame_to_image_space_arr,
                             multiply_verts_on_matrix_4x4,
                             to_homogeneous,
-                            pin_to_xyz_from_mesh,
+                            get_mesh_verts,
+                            pins_barycentric_arrays,
+                            barycentric_points,
                             get_area_region,
                             get_area_region_3d,
                             calc_camera_zoom_and_offset,
@@ -78,8 +82,14 @@ class GTViewport(KTViewport):
                                     mask_color=(*Config.gt_mask_2d_color,
                                                 Config.gt_mask_2d_opacity))
         self._draw_update_timer_handler: Optional[Callable] = None
+        # Applies scheduled shader updates right before the view is drawn
+        self._pending_updates_handler: Optional[Any] = None
 
         self.stabilization_region_point: Optional[Tuple[float, float]] = None
+        self._surface_pins_key: Optional[Tuple] = None
+        self._surface_pins_data: Tuple[Any, Any] = (
+            np.empty((0, 3), dtype=np.int32),
+            np.empty((0, 3), dtype=np.float32))
 
     def product_type(self) -> int:
         return ProductType.GEOTRACKER
@@ -176,6 +186,7 @@ class GTViewport(KTViewport):
         status = super().register_handlers(area=area)
         if status:
             self.register_draw_update_timer(time_step=GTConfig.viewport_redraw_interval)
+            self.register_pending_updates_handler()
         else:
             _log.error(f'{self.__class__.__name__}: '
                        f'Could not register viewport handlers')
@@ -185,10 +196,29 @@ class GTViewport(KTViewport):
     def unregister_handlers(self) -> Area:
         _log.cyan(f'{self.__class__.__name__}.unregister_handlers start')
         self.unregister_draw_update_timer()
+        self.unregister_pending_updates_handler()
         area = super().unregister_handlers()
         _log.cyan(f'{self.__class__.__name__}.unregister_handlers end >>>')
         return area
 
+    def _flush_pending_updates(self) -> None:
+        self.get_settings().loader().flush_viewport_updates()
+
+    def register_pending_updates_handler(self) -> None:
+        self.unregister_pending_updates_handler()
+        self._pending_updates_handler = SpaceView3D.draw_handler_add(
+            self._flush_pending_updates, (), 'WINDOW', 'PRE_VIEW')
+
+    def unregister_pending_updates_handler(self) -> None:
+        if self._pending_updates_handler is not None:
+            SpaceView3D.draw_handler_remove(self._pending_updates_handler,
+                                            'WINDOW')
+            self.get_settings().loader().discard_viewport_updates()
+        self._pending_updates_handler = None
+
+    def pending_updates_handler_is_working(self) -> bool:
+        return self._pending_updates_handler is not None
+
     def mask2d(self) -> KTRasterMask:
         return self._mask2d
 
@@ -205,9 +235,8 @@ class GTViewport(KTViewport):
 
         pins = self.pins()
         if pins.move_pin_mode():
-            hidden_color = (*color[:3], 0.0)
-            for i in [x for x in pins.get_disabled_pins() if x < verts_count]:
-                colors[i] = hidden_color
+            disabled = pins.get_disabled_pins()
+            colors[disabled[disabled < verts_count]] = (*color[:3], 0.0)
 
         if len(verts) > 0:
             m = np.array(obj.matrix_world, dtype=np.float32).transpose()
@@ -235,22 +264,31 @@ class GTViewport(KTViewport):
         self.points3d().set_point_ui_scale(scale)
         self.wireframer().set_line_ui_scale(scale)
 
+    def pins_barycentric_arrays(self, gt: Any,
+                                keyframe: int) -> Tuple[Any, Any]:
+        ''' Surface points of pins don't change during pin dragging,
+            so they are requested from the core once per drag '''
+        pins = self.pins()
+        if not pins.move_pin_mode():
+            self._surface_pins_key = None
+            return pins_barycentric_arrays(gt, keyframe)
+
+        key = (keyframe, gt.pins_count())
+        if key != self._surface_pins_key:
+            self._surface_pins_data = pins_barycentric_arrays(gt, keyframe)
+            self._surface_pins_key = key
+        return self._surface_pins_data
+
     def surface_points_from_mesh(self, gt: Any, geomobj: Object,
                                  keyframe: int) -> Any:
         _log.yellow('surface_points_from_mesh start')
-        pins_count = gt.pins_count()
-        verts = np.zeros((pins_count, 3), dtype=np.float32)
         obj = evaluated_object(geomobj)
-        if pins_count ==0 or len(obj.data.vertices) == 0:
+        if gt.pins_count() == 0 or len(obj.data.vertices) == 0:
             _log.output('surface_points_from_mesh empty end >>>')
-            return verts
-
-        for i in range(pins_count):
-            pin = gt.pin(keyframe, i)
-            if pin is not None:
-                p = pin_to_xyz_from_mesh(pin, obj)
-                if p is not None:
-                    verts[i] = p
+            return np.zeros((gt.pins_count(), 3), dtype=np.float32)
+
+        indices, weights = self.pins_barycentric_arrays(gt, keyframe)
+        verts = barycentric_points(get_mesh_verts(obj.data), indices, weights)
         _log.output('surface_points_from_mesh end >>>')
         return verts
 
@@ -262,19 +300,21 @@ class GTViewport(KTViewport):
         pins = self.pins()
 
         shift_x, shift_y = get_scene_camera_shift()
-        points = [image_space_to_region(p[0], p[1], x1, y1, x2, y2,
-                                        shift_x, shift_y) for p in pins.arr()]
+        points = image_space_to_region_arr(pins.arr(), x1, y1, x2, y2,
+                                           shift_x, shift_y)
         points_count = len(points)
 
-        vertex_colors = [GTConfig.pin_color] * points_count
+        vertex_colors = np.full((points_count, 4), GTConfig.pin_color,
+                                dtype=np.float32)
 
         color = (*GTConfig.disabled_pin_color[:3], 0.0) \
             if pins.move_pin_mode() else GTConfig.disabled_pin_color
-        for i in [x for x in pins.get_disabled_pins() if x < points_count]:
-            vertex_colors[i] = color
+        disabled = pins.get_disabled_pins()
+        vertex_colors[disabled[disabled < points_count]] = color
 
-        for i in [x for x in pins.get_selected_pins() if x < points_count]:
-            vertex_colors[i] = GTConfig.selected_pin_color
+        selected = pins.get_selected_pins()
+        vertex_colors[selected[selected < points_count]] = \
+            GTConfig.selected_pin_color
 
         pin_num = pins.current_pin_num()
         if pins.current_pin() and pin_num < points_count:
@@ -333,12 +373,10 @@ class GTViewport(KTViewport):
         verts = np.empty((residual_count * 2, 2), dtype=np.float32)
 
         shift_x, shift_y = camobj.data.shift_x, camobj.data.shift_y
-        for i, v in enumerate(vv):
-            x, y = frame_to_image_space(v[0], v[1], rx, ry, shift_x, shift_y)
-            verts[i * 2] = image_space_to_region(x, y, x1, y1, x2, y2,
-                                                 shift_x, shift_y)
-            verts[i * 2 + 1] = p2d[i][:2]
-            # length = np.linalg.norm((v[0]-p2d[i][0], v[1]-p2d[i][1]))
+        verts[0::2] = image_space_to_region_arr(
+            frame_to_image_space_arr(vv, rx, ry, shift_x, shift_y),
+            x1, y1, x2, y2, shift_x, shift_y)
+        verts[1::2] = np.asarray(p2d, dtype=np.float32)[:, :2]
 
         wire.edge_lengths = np.full((residual_count, 2),
                                     (0.0, Config.residual_dashed_line_length),
@@ -350,11 +388,11 @@ class GTViewport(KTViewport):
                                      dtype=np.float32)
         pins = self.pins()
         if pins.move_pin_mode():
-            points_count = len(wire.vertex_colors)
+            disabled = pins.get_disabled_pins()
+            disabled = disabled[disabled < residual_count]
             hidden_color = (*GTConfig.residual_color[:3], 0.0)
-            for i in [x for x in pins.get_disabled_pins() if 2 * x < points_count]:
-                wire.vertex_colors[i * 2] = hidden_color
-                wire.vertex_colors[i * 2 + 1] = hidden_color
+            wire.vertex_colors[disabled * 2] = hidden_color
+            wire.vertex_colors[disabled * 2 + 1] = hidden_color
         wire.create_batch()
 
     def hide_pins_and_residuals(self):
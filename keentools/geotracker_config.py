@@ -171,6 +171,12 @@ class GTConfig:
     text_scale_y = 0.75
     default_precalc_filename = 'geotracker.precalc'
     viewport_redraw_interval = 0.15
+    precalc_prefetch_depth = 8
+    precalc_prefetch_memory_limit = 1024 * 1024 * 1024  # bytes
+    precalc_batch_cores_per_worker = 2
+    precalc_batch_worker_memory = 2 * 1024 * 1024 * 1024  # bytes
+    precalc_batch_update_interval = 0.5
+    serial_chunk_min_size = 1024 * 1024  # characters
 
     pin_size = 7.0
     pin_sensitivity = 16.0
@@ -274,6 +274,7 @@ class KTPREF_OT_UserPreferencesResetAllWarning(Operator):
             _reset_user_preferences_parameter_to_default('fb_wireframe_special_color')
             _reset_user_preferences_parameter_to_default('fb_wireframe_midline_color')
             _reset_user_preferences_parameter_to_default('fb_wireframe_opacity')
+            _reset_user_preferences_parameter_to_default('fb_proxy_size')
         elif self.product == ProductType.GEOTRACKER:
             _reset_user_preferences_parameter_to_default('pin_size')
             _reset_user_preferences_parameter_to_default('pin_sensitivity')
@@ -318,6 +319,20 @@ def _update_user_preferences_pin_sensitivity(addon_prefs: Any, context: Any) ->
         prefs.pin_size = addon_prefs.pin_sensitivity
 
 
+def _update_user_preferences_fb_proxy_size(addon_prefs: Any,
+                                           context: Any) -> None:
+    settings = fb_settings()
+    if settings is None or not settings.pinmode:
+        return
+    head = settings.get_head(settings.current_headnum)
+    camera = head.get_camera(settings.current_camnum) if head else None
+    if camera is None:
+        return
+    camera.reset_tone_mapping()
+    camera.show_background_image()
+    camera.apply_tone_mapping()
+
+
 def _update_mask_3d(addon_prefs: Any, context: Any) -> None:
     settings = gt_settings()
     settings.mask_3d_color = addon_prefs.gt_mask_3d_color
@@ -641,6 +656,16 @@ class KTAddonPreferences(AddonPreferences):
         get=universal_direct_getter('fb_wireframe_midline_color', 'color'),
         set=universal_direct_setter('fb_wireframe_midline_color')
     )
+    fb_proxy_size: IntProperty(
+        description='Background images bigger than this size are shown '
+                    'in the viewport by their downscaled copies. '
+                    '0 shows original images',
+        name='Viewport image size', min=0, max=16384,
+        default=2048, subtype='PIXEL',
+        get=universal_direct_getter('fb_proxy_size', 'int'),
+        set=universal_direct_setter('fb_proxy_size'),
+        update=_update_user_preferences_fb_proxy_size
+    )
 
     # GeoTracker User Preferences
     show_gt_user_preferences: BoolProperty(
@@ -1016,6 +1041,13 @@ class KTAddonPreferences(AddonPreferences):
         main_col.prop(self, 'prevent_fb_view_rotation')
         main_col.separator()
 
+        row = main_col.row()
+        row.prop(self, 'fb_proxy_size')
+        op = row.operator(Config.kt_user_preferences_changer, text='Reset')
+        op.action = 'revert_default'
+        op.param_string = 'fb_proxy_size'
+        main_col.separator()
+
         self._draw_pin_user_preferences(main_col)
         main_col.separator()
 
@@ -39,6 +39,8 @@ from ..utils.bpy_common import (bpy_current_frame,
                                  bpy_background_mode,
                                  bpy_timer_register)
 from ..utils.timer import RepeatTimer
+from ..utils.frame_source import clear_frame_caches
+from ..utils.image_kernels import release_scratch_buffers
 from ..blender_independent_packages.pykeentools_loader import module as pkt_module
 from ..geotracker.utils.prechecks import show_warning_dialog
 from ..geotracker.interface.screen_mesages import (revert_default_screen_message,
@@ -149,6 +151,7 @@ class CalcTimer(TimerMixin):
             old_vp.unhide_all_shaders()
 
         settings.user_interrupts = True
+        release_scratch_buffers()
         bpy_set_current_frame(self._start_frame)
         force_ui_redraw('VIEW_3D')
         _log.info('Calculation is over: {:.2f} sec.'.format(
@@ -359,6 +362,8 @@ class _CommonTimer(TimerMixin):
         loader = settings.loader()
         loader.save_geotracker()
         settings.stop_calculating()
+        clear_frame_caches()
+        release_scratch_buffers()
         self.remove_timer(self)
         if self._revert_current_frame:
             bpy_set_current_frame(self._start_frame)
@@ -374,12 +379,20 @@ class _CommonTimer(TimerMixin):
         settings = get_settings(self.product)
         settings.user_interrupts = True
 
+    def _resume_computation(self) -> None:
+        storage = get_settings(self.product).loader().results_storage()
+        if storage is None:
+            self.tracking_computation.resume()
+            return
+        with storage.batched_writes():
+            self.tracking_computation.resume()
+
     def _safe_resume(self) -> _ComputationState:
         try:
             state = self.tracking_computation.state()
             _log.output(f'_safe_resume: {state}')
             if state == pkt_module().ComputationState.RUNNING:
-                self.tracking_computation.resume()
+                self._resume_computation()
                 _log.output(f'_safe_resume _overall_func: {self._overall_func}')
                 overall = self._overall_func()
                 _log.output(f'_safe_resume overall: {overall}')
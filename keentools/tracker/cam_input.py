@@ -19,6 +19,11 @@
 import numpy as np
 from typing import Any, Tuple, List, Dict, Optional
 from math import frexp
+from contextlib import contextmanager
+
+from bpy.types import Object
+from bpy.app.handlers import persistent
+from mathutils import Matrix
 
 from ..utils.kt_logging import KTLogger
 from ..addon_config import ProductType
@@ -27,9 +32,11 @@ from ..utils.coords import (focal_mm_to_px,
                             camera_sensor_width,
                             calc_bpy_camera_mat_relative_to_model,
                             calc_bpy_model_mat_relative_to_camera,
+                            calc_model_mat_from_matrices,
                             camera_projection)
 from ..utils.animation import (get_safe_evaluated_fcurve,
                                create_locrot_keyframe,
+                               create_locrot_keyframes,
                                get_object_keyframe_numbers,
                                delete_animation_between_frames,
                                insert_keyframe_in_fcurve,
@@ -43,12 +50,15 @@ from ..utils.bpy_common import (bpy_current_frame,
 from ..blender_independent_packages.pykeentools_loader import module as pkt_module
 from ..geotracker.gtloader import GTLoader
 from ..utils.images import (np_array_from_background_image,
-                            np_threshold_image,
                             np_threshold_image_with_channels,
-                            np_array_from_bpy_image)
+                            ImageBufferPool)
 from ..utils.ui_redraw import total_redraw_ui
+from ..utils.frame_source import get_frame_cache, clear_frame_caches
 from ..utils.mesh_builder import build_geo
-from ..tracker.tracking_blendshapes import remove_relative_shape_keyframe
+from ..utils.animated_matrices import WorldMatrixEvaluator
+from ..utils.keyframe_index import KeyframeIndex, get_keyframe_index
+from ..tracker.mask_cache import render_compositing_mask
+from ..tracker.tracking_blendshapes import remove_relative_shape_keyframes
 
 
 _log = KTLogger(__name__)
@@ -146,6 +156,30 @@ class GeoInput(pkt_module().GeoInputI):
         return build_geo(geotracker.geomobj, get_uv=False)
 
 
+# Pixels are copied by the core, the next frames reuse the arrays
+_image_input_pool: ImageBufferPool = ImageBufferPool()
+_mask_input_pool: ImageBufferPool = ImageBufferPool()
+_mask_output_pool: ImageBufferPool = ImageBufferPool()
+
+
+@persistent
+def frame_cache_reset_handler(*args) -> None:
+    clear_frame_caches()
+
+
+def _load_movie_clip_frame(movie_clip: Any, frame: int,
+                           channels: int = 3) -> Optional[Any]:
+    ''' Direct frame decoding without a scene frame change and UI redraw.
+        :return: None if the clip frame cannot be decoded directly
+    '''
+    if not movie_clip or tuple(movie_clip.size[:]) != bpy_render_frame():
+        return None
+    frame_cache = get_frame_cache(movie_clip, channels)
+    if frame_cache is None:
+        return None
+    return frame_cache.get(frame)
+
+
 class ImageInput(pkt_module().ImageInputI):
     @classmethod
     def get_settings(cls) -> Any:
@@ -166,6 +200,10 @@ class ImageInput(pkt_module().ImageInputI):
             _log.error('load_linear_rgb_image_at NO GEOTRACKER')
             return _empty_image()
 
+        np_img = _load_movie_clip_frame(geotracker.movie_clip, frame)
+        if np_img is not None:
+            return np_img
+
         current_frame = bpy_current_frame()
         if current_frame != frame:
             _log.output('load_linear_rgb_image_at1')
@@ -173,14 +211,15 @@ class ImageInput(pkt_module().ImageInputI):
             _log.output('load_linear_rgb_image_at2')
 
         total_redraw_ui()
-        np_img = np_array_from_background_image(geotracker.camobj, index=0)
+        np_img = np_array_from_background_image(
+            geotracker.camobj, index=0, pool=_image_input_pool, channels=3)
 
         if (current_frame != frame) and not settings.is_calculating():
             _log.output('load_linear_rgb_image_at3')
             bpy_set_current_frame(current_frame)
 
         if np_img is not None:
-            return np_img[:, :, :3]
+            return np_img
         else:
             _log.output(f'load_linear_rgb_image_at EMPTY IMAGE: {frame}')
             return _empty_image()
@@ -203,18 +242,21 @@ class Mask2DInput(pkt_module().Mask2DInputI):
         if not geotracker or not geotracker.mask_2d:
             return None
 
-        current_frame = bpy_current_frame()
-        _log.output(f'load_image_2d_mask_at: {frame} [{current_frame}]')
-        if current_frame != frame:
-            _log.output(f'FORCE CHANGE FRAME TO: {frame}')
-            bpy_set_current_frame(frame)
-
-        total_redraw_ui()
-        np_img = np_array_from_background_image(geotracker.camobj, index=1)
-
-        if (current_frame != frame) and not settings.is_calculating():
-            _log.output(f'REVERT FRAME TO: {frame}')
-            bpy_set_current_frame(current_frame)
+        np_img = _load_movie_clip_frame(geotracker.mask_2d, frame, channels=4)
+        if np_img is None:
+            current_frame = bpy_current_frame()
+            _log.output(f'load_image_2d_mask_at: {frame} [{current_frame}]')
+            if current_frame != frame:
+                _log.output(f'FORCE CHANGE FRAME TO: {frame}')
+                bpy_set_current_frame(frame)
+
+            total_redraw_ui()
+            np_img = np_array_from_background_image(
+                geotracker.camobj, index=1, pool=_mask_input_pool)
+
+            if (current_frame != frame) and not settings.is_calculating():
+                _log.output(f'REVERT FRAME TO: {frame}')
+                bpy_set_current_frame(current_frame)
 
         if np_img is None:
             _log.output('NO MASK IMAGE')
@@ -228,7 +270,8 @@ class Mask2DInput(pkt_module().Mask2DInputI):
 
         result = np_threshold_image_with_channels(
             np_img, geotracker.get_mask_2d_channels(),
-            geotracker.mask_2d_threshold)
+            geotracker.mask_2d_threshold,
+            out=_mask_output_pool.get(np_img.shape[:2], np.uint8))
 
         if result is not None:
             _log.output(f'mask shape: {result.shape}')
@@ -240,13 +283,10 @@ class Mask2DInput(pkt_module().Mask2DInputI):
         geotracker = settings.get_current_geotracker_item()
         if not geotracker or geotracker.compositing_mask == '':
             return None
-        mask_image = geotracker.update_compositing_mask(frame=frame)
-        np_img = np_array_from_bpy_image(mask_image)
-        if np_img is None:
+        grayscale = render_compositing_mask(geotracker, frame)
+        if grayscale is None:
             _log.output('NO COMP MASK IMAGE')
             return None
-        grayscale = np_threshold_image(np_img,
-                                       geotracker.compositing_mask_threshold)
         _log.output(f'COMP MASK INPUT HAS BEEN CALCULATED AT FRAME: {frame}')
         return pkt_module().LoadedMask(grayscale,
                                        geotracker.compositing_mask_inverted)
@@ -272,11 +312,99 @@ class GeoTrackerResultsStorage(pkt_module().GeoTrackerResultsStorageI):
             fl_mode.STATIC_FOCAL_LENGTH,
             fl_mode.ZOOM_FOCAL_LENGTH
         ]}
+        self._batching: bool = False
+        self._evaluator: WorldMatrixEvaluator = WorldMatrixEvaluator()
+        self._model_mats: Dict[int, Any] = {}
+        self._written: Dict[int, Any] = {}
+        self._pending: Dict[int, Tuple[Matrix, List[float], str]] = {}
+        self._pending_obj: Optional[Object] = None
+        self._keyed_frames: Optional[KeyframeIndex] = None
 
     @classmethod
     def get_settings(cls) -> Any:
         assert False, 'GeoTrackerResultsStorage: get_settings'
 
+    @contextmanager
+    def batched_writes(self) -> Any:
+        ''' Model matrices are read from fcurves and written to them
+            without scene frame changes, keyframes are inserted at once
+            on exit. Objects with constraints, drivers or NLA
+            use the frame switching path. '''
+        self._evaluator.clear()
+        self._model_mats = {}
+        self._batching = True
+        try:
+            yield
+        finally:
+            self._batching = False
+            self.flush()
+
+    def _batch_evaluable(self, geotracker: Any) -> bool:
+        if not self._batching or not geotracker.camobj \
+                or not geotracker.geomobj:
+            return False
+        return self._evaluator.is_evaluable(geotracker.camobj) \
+            and self._evaluator.is_evaluable(geotracker.geomobj)
+
+    def flush(self) -> None:
+        if len(self._pending) == 0:
+            return
+        obj = self._pending_obj
+        frames = sorted(self._pending.keys())
+        create_locrot_keyframes(obj, frames,
+                                [self._pending[x][1] for x in frames],
+                                [self._pending[x][2] for x in frames])
+        current_frame = bpy_current_frame()
+        if current_frame in self._pending:
+            obj.matrix_world = self._pending[current_frame][0]
+        self._pending = {}
+        self._pending_obj = None
+        self._written = {}
+        self._model_mats = {}
+        self._keyed_frames = None
+        self._evaluator.clear()
+        _log.output(f'GeoTrackerResultsStorage.flush: {len(frames)} frames')
+
+    def _evaluated_model_mat_at(self, geotracker: Any, frame: int) -> Any:
+        if frame in self._written:
+            return self._written[frame]
+        if frame in self._model_mats:
+            return self._model_mats[frame]
+        if len(self._pending) > 0:
+            if self._keyed_frames is None:
+                self._keyed_frames = get_keyframe_index(self._pending_obj)
+            # Pending keys change interpolated values only
+            if frame not in self._keyed_frames:
+                self.flush()
+        mat = calc_model_mat_from_matrices(
+            self._evaluator.world_matrix(geotracker.camobj, frame),
+            self._evaluator.world_matrix(geotracker.geomobj, frame))
+        self._model_mats[frame] = mat
+        return mat
+
+    def _queue_model_mat_at(self, geotracker: Any, frame: int,
+                            model_mat: Any, keyframe_type: str) -> None:
+        obj = geotracker.animatable_object()
+        if self._pending_obj is not None and self._pending_obj != obj:
+            self.flush()
+        # Pending keys do not change these: only the scale of
+        # the animatable object is taken and it is not keyed here
+        geom_mw = self._evaluator.world_matrix(geotracker.geomobj, frame)
+        cam_mw = self._evaluator.world_matrix(geotracker.camobj, frame)
+        if geotracker.camera_mode():
+            mat = calc_bpy_camera_mat_relative_to_model(geom_mw, cam_mw,
+                                                        model_mat)
+        else:
+            mat = calc_bpy_model_mat_relative_to_camera(geom_mw, cam_mw,
+                                                        model_mat)
+        basis = self._evaluator.parent_matrix(obj, frame).inverted_safe() @ mat
+        locrot = [*basis.to_translation(), *basis.to_euler()]
+        self._pending[frame] = (mat, locrot, keyframe_type)
+        self._pending_obj = obj
+        self._written[frame] = np.array(model_mat, dtype=np.float32)
+        if self._keyed_frames is None or frame not in self._keyed_frames:
+            self._model_mats = {}
+
     def _mode_by_value(self, value: str) -> Any:
         if value in self._modes.keys():
             return self._modes[value]
@@ -321,6 +449,10 @@ class GeoTrackerResultsStorage(pkt_module().GeoTrackerResultsStorageI):
             return np.eye(4)
 
         current_frame = bpy_current_frame()
+        if self._batch_evaluable(geotracker) and \
+                (current_frame != frame or len(self._written) > 0):
+            return self._evaluated_model_mat_at(geotracker, frame)
+        self.flush()
         if current_frame != frame:
             bpy_set_current_frame(frame)
             mat = geotracker.calc_model_matrix()
@@ -339,6 +471,14 @@ class GeoTrackerResultsStorage(pkt_module().GeoTrackerResultsStorageI):
         if not geotracker.geomobj or not geotracker.camobj:
             return
 
+        gt = settings.loader().kt_geotracker()
+        keyframe_type = 'KEYFRAME' if gt.is_key_at(frame) else 'JITTER'
+        if self._batch_evaluable(geotracker):
+            self._queue_model_mat_at(geotracker, frame, model_mat,
+                                     keyframe_type)
+            return
+        self.flush()
+
         current_frame = bpy_current_frame()
         if current_frame != frame:
             bpy_set_current_frame(frame)
@@ -356,8 +496,6 @@ class GeoTrackerResultsStorage(pkt_module().GeoTrackerResultsStorageI):
             _log.output(f'set_model_mat_at3')
             geotracker.geomobj.matrix_world = mat
 
-        gt = settings.loader().kt_geotracker()
-        keyframe_type = 'KEYFRAME' if gt.is_key_at(frame) else 'JITTER'
         create_locrot_keyframe(geotracker.animatable_object(), keyframe_type)
         if (current_frame != frame) and not settings.is_calculating():
             bpy_set_current_frame(current_frame)
@@ -372,6 +510,7 @@ class GeoTrackerResultsStorage(pkt_module().GeoTrackerResultsStorageI):
             return
         if not geotracker.geomobj or not geotracker.camobj:
             return
+        self.flush()
         from_frame = args[0]
         to_frame = from_frame if len(args) == 1 else args[1]
         delete_animation_between_frames(geotracker.animatable_object(),
@@ -380,8 +519,7 @@ class GeoTrackerResultsStorage(pkt_module().GeoTrackerResultsStorageI):
             from_frame = max(1, from_frame)
             to_frame = min(bpy_end_frame(), to_frame)
             _log.output(f'remove_track_data: from: {from_frame} to: {to_frame} ')
-            for frame in range(from_frame, to_frame + 1):
-                remove_relative_shape_keyframe(frame)
+            remove_relative_shape_keyframes(from_frame, to_frame)
 
     def trackframes(self) -> List[int]:
         _log.cyan('trackframes start')
@@ -389,6 +527,7 @@ class GeoTrackerResultsStorage(pkt_module().GeoTrackerResultsStorageI):
         geotracker = settings.get_current_geotracker_item()
         if not geotracker:
             return []
+        self.flush()
         track_frames = get_object_keyframe_numbers(geotracker.animatable_object())
         _log.output(f'trackframes: {track_frames} >>>')
         return track_frames
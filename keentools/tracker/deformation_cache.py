@@ -0,0 +1,327 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' On-disk storage of per-frame tracked mesh deformation.
+
+    File layout: a header with the Basis vertex positions followed by
+    an append-only log of fixed-size rows. A row is either a frame
+    (vertex offsets from the Basis) or the removal of a frame range.
+    The log is memory-mapped, so only the rows being played are read,
+    and a tracked frame costs one appended row. compact() rewrites the
+    file keeping only the actual frames in frame order.
+'''
+
+import os
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.kt_logging import KTLogger
+
+
+_log = KTLogger(__name__)
+
+
+_magic: bytes = b'KTDC'
+_version: int = 1
+_header_alignment: int = 64
+_dtype_codes: Dict[str, int] = {'float16': 0, 'float32': 1}
+
+
+def _header_size(vertex_count: int) -> int:
+    size = 16 + vertex_count * 3 * 4
+    return (size + _header_alignment - 1) // _header_alignment \
+        * _header_alignment
+
+
+def _row_dtype(vertex_count: int, dtype: str) -> np.dtype:
+    ''' count == 0 marks a frame row, count > 0 removes
+        the frame range [frame, frame + count) '''
+    return np.dtype([('frame', '<i4'), ('count', '<i4'),
+                     ('offsets', np.dtype(dtype).newbyteorder('<'),
+                      (vertex_count, 3))])
+
+
+class DeformationCache:
+    def __init__(self, filepath: str):
+        self.filepath: str = filepath
+        self.dtype: str = 'float16'
+        self.basis: Any = np.empty((0, 3), dtype=np.float32)
+        self._row_dtype: Optional[np.dtype] = None
+        self._rows: Optional[Any] = None
+        self._row_count: int = 0
+        self._index: Dict[int, int] = {}
+        self._sorted_frames: Optional[Any] = None
+        self._file_state: Tuple[float, int] = (0.0, 0)
+
+    @classmethod
+    def create(cls, filepath: str, basis: Any,
+               dtype: str = 'float16') -> 'DeformationCache':
+        cache = cls(filepath)
+        cache.basis = np.ascontiguousarray(basis, dtype=np.float32)
+        cache.dtype = dtype
+        cache._row_dtype = _row_dtype(len(cache.basis), dtype)
+        cache._write_file([])
+        return cache
+
+    @classmethod
+    def open(cls, filepath: str) -> Optional['DeformationCache']:
+        cache = cls(filepath)
+        try:
+            cache._read_header()
+            cache._map_rows()
+        except Exception as err:
+            _log.error(f'DeformationCache.open {filepath}:\n{str(err)}')
+            return None
+        return cache
+
+    def vertex_count(self) -> int:
+        return len(self.basis)
+
+    def frame_count(self) -> int:
+        return len(self._index)
+
+    def row_count(self) -> int:
+        return self._row_count
+
+    def file_size(self) -> int:
+        return os.path.getsize(self.filepath) \
+            if os.path.exists(self.filepath) else 0
+
+    def frames(self) -> Any:
+        ''' :return: sorted int32 array of stored frames '''
+        if self._sorted_frames is None:
+            self._sorted_frames = np.array(sorted(self._index.keys()),
+                                           dtype=np.int32)
+        return self._sorted_frames
+
+    def has_frame(self, frame: int) -> bool:
+        return frame in self._index
+
+    def _get_file_state(self) -> Tuple[float, int]:
+        stat = os.stat(self.filepath)
+        return stat.st_mtime, stat.st_size
+
+    def is_outdated(self) -> bool:
+        ''' The file has been changed not through this object '''
+        return not os.path.exists(self.filepath) or \
+            self._get_file_state() != self._file_state
+
+    def _write_file(self, row_blocks: Iterable[Any]) -> None:
+        dirname = os.path.dirname(self.filepath)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        vertex_count = len(self.basis)
+        header = bytearray(_header_size(vertex_count))
+        header[:16] = _magic + np.array(
+            [_version, vertex_count, _dtype_codes[self.dtype]],
+            dtype='<u4').tobytes()
+        header[16:16 + vertex_count * 12] = \
+            self.basis.astype('<f4').tobytes()
+
+        tmp_path = self.filepath + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            for rows in row_blocks:
+                f.write(rows.tobytes())
+        self._rows = None
+        os.replace(tmp_path, self.filepath)
+        self._map_rows()
+
+    def _read_header(self) -> None:
+        with open(self.filepath, 'rb') as f:
+            head = f.read(16)
+            if len(head) != 16 or head[:4] != _magic:
+                raise ValueError('Not a deformation cache file')
+            version, vertex_count, dtype_code = \
+                np.frombuffer(head[4:], dtype='<u4').tolist()
+            if version != _version:
+                raise ValueError(f'Unsupported version: {version}')
+            self.dtype = {v: k for k, v in _dtype_codes.items()}[dtype_code]
+            self.basis = np.frombuffer(f.read(vertex_count * 12),
+                                       dtype='<f4').astype(
+                np.float32).reshape((vertex_count, 3))
+        self._row_dtype = _row_dtype(vertex_count, self.dtype)
+
+    def _map_rows(self) -> None:
+        offset = _header_size(len(self.basis))
+        count = (self.file_size() - offset) // self._row_dtype.itemsize
+        self._row_count = count
+        self._file_state = self._get_file_state()
+        self._rows = np.memmap(self.filepath, dtype=self._row_dtype,
+                               mode='r', offset=offset, shape=(count,)) \
+            if count > 0 else None
+        self._replay_log()
+
+    def _replay_log(self) -> None:
+        self._index = {}
+        self._sorted_frames = None
+        if self._rows is None:
+            return
+        for row, (frame, count) in enumerate(zip(
+                self._rows['frame'].tolist(), self._rows['count'].tolist())):
+            if count == 0:
+                self._index[frame] = row
+            else:
+                self._remove_from_index(frame, frame + count - 1)
+
+    def _remove_from_index(self, frame_from: int, frame_to: int) -> int:
+        frames = [x for x in self._index if frame_from <= x <= frame_to]
+        for frame in frames:
+            del self._index[frame]
+        if len(frames) > 0:
+            self._sorted_frames = None
+        return len(frames)
+
+    def _append_rows(self, rows: Any) -> int:
+        ''' :return: index of the first appended row '''
+        with open(self.filepath, 'ab') as f:
+            f.write(rows.tobytes())
+        self._rows = None
+        first_row = self._row_count
+        self._row_count += len(rows)
+        offset = _header_size(len(self.basis))
+        self._rows = np.memmap(self.filepath, dtype=self._row_dtype, mode='r',
+                               offset=offset, shape=(self._row_count,))
+        self._file_state = self._get_file_state()
+        return first_row
+
+    def set_frame(self, frame: int, verts: Any) -> None:
+        row = np.zeros((1,), dtype=self._row_dtype)
+        row['frame'] = frame
+        row['offsets'][0] = verts - self.basis
+        first_row = self._append_rows(row)
+        if frame not in self._index:
+            self._sorted_frames = None
+        self._index[frame] = first_row
+
+    def set_frames(self, frames: List[int], verts_list: Any) -> None:
+        ''' Bulk version of set_frame '''
+        rows = np.zeros((len(frames),), dtype=self._row_dtype)
+        rows['frame'] = frames
+        rows['offsets'] = np.asarray(verts_list, dtype=np.float32) - self.basis
+        first_row = self._append_rows(rows)
+        for i, frame in enumerate(frames):
+            self._index[frame] = first_row + i
+        self._sorted_frames = None
+
+    def remove_frames(self, frame_from: int, frame_to: int) -> int:
+        ''' :return: number of removed frames '''
+        removed = self._remove_from_index(frame_from, frame_to)
+        if removed == 0:
+            return 0
+        row = np.zeros((1,), dtype=self._row_dtype)
+        row['frame'] = frame_from
+        row['count'] = frame_to - frame_from + 1
+        self._append_rows(row)
+        return removed
+
+    def frame_verts(self, frame: int) -> Optional[Any]:
+        row = self._index.get(frame)
+        if row is None:
+            return None
+        return self.basis + self._rows['offsets'][row]
+
+    def evaluate(self, frame: float, out: Optional[Any] = None) -> Optional[Any]:
+        ''' Linear interpolation between the nearest stored frames,
+            the first and the last stored frames are held outside.
+            It follows the pile shape key animation.
+        '''
+        frames = self.frames()
+        if len(frames) == 0:
+            return None
+        if out is None:
+            out = np.empty((len(self.basis), 3), dtype=np.float32)
+        pos = int(np.searchsorted(frames, frame, side='right'))
+        if pos == 0 or pos == len(frames) or frames[pos - 1] == frame:
+            nearest = frames[max(0, pos - 1)]
+            np.add(self.basis, self._rows['offsets'][self._index[nearest]],
+                   out=out)
+            return out
+        frame1, frame2 = int(frames[pos - 1]), int(frames[pos])
+        t = (frame - frame1) / (frame2 - frame1)
+        offsets = self._rows['offsets']
+        out[:] = offsets[self._index[frame1]]
+        out *= np.float32(1.0 - t)
+        out += offsets[self._index[frame2]] * np.float32(t)
+        out += self.basis
+        return out
+
+    def garbage_rows(self) -> int:
+        return self._row_count - len(self._index)
+
+    def _sorted_row_blocks(self, block_size: int = 256) -> Iterable[Any]:
+        frames = self.frames().tolist()
+        for start in range(0, len(frames), block_size):
+            block_frames = frames[start:start + block_size]
+            rows = np.zeros((len(block_frames),), dtype=self._row_dtype)
+            rows['frame'] = block_frames
+            rows['offsets'] = self._rows['offsets'][
+                [self._index[x] for x in block_frames]]
+            yield rows
+
+    def compact(self) -> None:
+        self._write_file(self._sorted_row_blocks())
+        _log.output(f'DeformationCache compacted: {self.filepath} '
+                    f'{self.frame_count()} frames')
+
+    def close(self) -> None:
+        self._rows = None
+        self._row_count = 0
+        self._index = {}
+        self._sorted_frames = None
+
+
+_open_caches: Dict[str, DeformationCache] = {}
+
+
+def get_deformation_cache(filepath: str, *, basis: Optional[Any] = None,
+                          dtype: str = 'float16'
+                          ) -> Optional[DeformationCache]:
+    ''' Opened caches are shared and reopened when the file is
+        changed not through them.
+        :param basis: a new cache is created with this Basis when there is
+                      no file or the file has another vertex count
+    '''
+    cache = _open_caches.get(filepath)
+    if cache is not None and not cache.is_outdated():
+        pass
+    elif os.path.exists(filepath):
+        cache = DeformationCache.open(filepath)
+    else:
+        cache = None
+
+    if basis is not None and \
+            (cache is None or cache.vertex_count() != len(basis)):
+        cache = DeformationCache.create(filepath, basis, dtype)
+    if cache is None:
+        _open_caches.pop(filepath, None)
+        return None
+    _open_caches[filepath] = cache
+    return cache
+
+
+def close_deformation_cache(filepath: str) -> None:
+    cache = _open_caches.pop(filepath, None)
+    if cache is not None:
+        cache.close()
+
+
+def close_deformation_caches() -> None:
+    for cache in _open_caches.values():
+        cache.close()
+    _open_caches.clear()
@@ -16,7 +16,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # ##### END GPL LICENSE BLOCK #####
 
-from typing import Any, Optional, Tuple, List, Callable
+from typing import Any, Dict, Optional, Tuple, List, Callable
 import numpy as np
 
 import bpy
@@ -53,6 +53,7 @@ from ..blender_independent_packages.pykeentools_loader import module as pkt_modu
 from ..utils.images import get_background_image_strict
 from ..geotracker.utils.prechecks import common_checks
 from ..utils.manipulate import switch_to_camera
+from ..utils.mesh_builder import GeoCache
 
 
 _log = KTLogger(__name__)
@@ -74,6 +75,12 @@ def depsgraph_update_handler_wrapper(settings_func: Callable) -> Callable:
                 return True
             return False
 
+        def _check_geometry_updated(depsgraph, name):
+            for update in depsgraph.updates:
+                if update.id.name == name and update.is_updated_geometry:
+                    return True
+            return False
+
         if bpy_is_animation_playing():
             return
 
@@ -101,13 +108,14 @@ def depsgraph_update_handler_wrapper(settings_func: Callable) -> Callable:
         geomobj = geotracker.geomobj
         camobj = geotracker.camobj
 
+        if geomobj and _check_geometry_updated(depsgraph, geomobj.name):
+            GeoCache.invalidate(geomobj)
         if geomobj and _check_updated(depsgraph, geomobj.name):
-            loader.update_viewport_shaders(geomobj_matrix=True,
-                                           pins_and_residuals=True)
-            return
-        if camobj and _check_updated(depsgraph, camobj.name):
-            loader.update_viewport_shaders(geomobj_matrix=True,
-                                           pins_and_residuals=True)
+            loader.schedule_viewport_update(geomobj_matrix=True,
+                                            pins_and_residuals=True)
+        elif camobj and _check_updated(depsgraph, camobj.name):
+            loader.schedule_viewport_update(geomobj_matrix=True,
+                                            pins_and_residuals=True)
     return depsgraph_update_handler_internal
 
 
@@ -128,10 +136,10 @@ def undo_redo_handler_wrapper(settings_func: Callable) -> Callable:
                 return
 
             loader.load_geotracker()
-            loader.update_viewport_shaders(area, wireframe=True,
-                                           geomobj_matrix=True,
-                                           pins_and_residuals=True,
-                                           timeline=True)
+            loader.schedule_viewport_update(area, wireframe=True,
+                                            geomobj_matrix=True,
+                                            pins_and_residuals=True,
+                                            timeline=True)
         except Exception as err:
             _log.error(f'gt_undo_handler {str(err)}')
             loader.unregister_undo_redo_handlers()
@@ -173,16 +181,16 @@ def frame_change_post_handler_wrapper(settings_func: Callable) -> Callable:
             geotracker.reset_focal_length_estimation()
 
         if loader.product_type() == ProductType.FACETRACKER:
-            loader.update_viewport_shaders(wireframe_data=True,
-                                           wireframe=True)
+            loader.schedule_viewport_update(wireframe_data=True,
+                                            wireframe=True)
 
         if settings.stabilize_viewport_enabled:
             loader.load_pins_into_viewport()
             loader.viewport().stabilize(geotracker.geomobj)
 
-        loader.update_viewport_shaders(geomobj_matrix=True,
-                                       pins_and_residuals=True,
-                                       mask=True)
+        loader.schedule_viewport_update(geomobj_matrix=True,
+                                        pins_and_residuals=True,
+                                        mask=True)
         _log.output('frame_change_post_handler end')
     return frame_change_post_handler_internal
 
@@ -196,6 +204,7 @@ class Loader:
     _camera_input: Any = None
     _kt_geotracker: Any = None
     _mask2d: Any = None
+    _storage: Any = None
 
     _geotracker_item: Optional[Any] = None
 
@@ -204,6 +213,14 @@ class Loader:
     undo_redo_handler: Optional[Callable] = None
     check_shader_timer: Optional[Any] = None
 
+    _pending_updates: Dict[str, bool] = {}
+    _pending_area: Optional[Area] = None
+    _skipped_rebuilds: int = 0
+    # Rendering and ID writes are not allowed while drawing,
+    # timeline is drawn by another editor, so they are never deferred
+    _immediate_updates: Tuple[str, ...] = ('adaptive_opacity', 'mask',
+                                           'timeline')
+
     @classmethod
     def product_type(cls):
         return ProductType.UNDEFINED
@@ -307,6 +324,10 @@ class Loader:
         )
         return cls._kt_geotracker
 
+    @classmethod
+    def results_storage(cls) -> Any:
+        return cls._storage
+
     @classmethod
     def increment_geo_hash(cls):
         cls._geo_input.increment_hash()
@@ -519,7 +540,7 @@ class Loader:
 
         serial = geotracker.get_serial_str()
 
-        _log.output(_log.color('cyan', f'SERIAL:\n{serial}'))
+        _log.cyan(lambda: f'SERIAL:\n{serial}')
         if serial == '':
             _log.warning(f'EMPTY SERIAL ERROR: {settings.current_tracker_num()}')
             return False
@@ -527,7 +548,7 @@ class Loader:
         gt = cls.kt_geotracker()
         try:
             if not gt.deserialize(serial):
-                _log.warning(f'DESERIALIZE ERROR: {serial}')
+                _log.warning(lambda: f'DESERIALIZE ERROR: {serial}')
                 return False
         except Exception as err:
             _log.error(f'load_geotracker Exception:\n{str(err)}')
@@ -623,6 +644,74 @@ class Loader:
         residuals.create_batch()
         _log.output('clear_viewport_pins_and_residuals end >>>')
 
+    @classmethod
+    def schedule_viewport_update(cls, area: Optional[Area] = None,
+                                 **kwargs: bool) -> None:
+        ''' Coalescing variant of update_viewport_shaders.
+            The flags are accumulated and the union of them is applied
+            once per redraw by flush_viewport_updates called
+            from the viewport pre-draw handler.
+        '''
+        flags = {name: True for name, value in kwargs.items() if value}
+        immediate = {name: flags.pop(name) for name in cls._immediate_updates
+                     if name in flags}
+        if len(immediate) > 0:
+            cls.update_viewport_shaders(area, **immediate)
+        if len(flags) == 0:
+            return
+        cls._skipped_rebuilds += len([name for name in flags
+                                      if name in cls._pending_updates])
+        cls._pending_updates = {**cls._pending_updates, **flags}
+        if area is not None:
+            cls._pending_area = area
+
+        vp = cls.viewport()
+        if not vp.pending_updates_handler_is_working():
+            cls.flush_viewport_updates()
+            return
+        vp.tag_redraw()
+
+    @classmethod
+    def flush_viewport_updates(cls) -> None:
+        flags = cls._pending_updates
+        area = cls._pending_area
+        cls._pending_updates = {}
+        cls._pending_area = None
+        if not flags:
+            return
+        _log.output(f'flush_viewport_updates: {list(flags.keys())} '
+                    f'skipped: {cls._skipped_rebuilds}')
+        settings = cls.get_settings()
+        if not settings or not settings.get_current_geotracker_item():
+            return
+        try:
+            cls.update_viewport_shaders(area, **flags)
+        except Exception as err:
+            _log.error(f'flush_viewport_updates Exception:\n{str(err)}')
+
+    @classmethod
+    def discard_viewport_updates(cls) -> None:
+        cls._pending_updates = {}
+        cls._pending_area = None
+
+    @classmethod
+    def skipped_viewport_rebuilds(cls) -> int:
+        return cls._skipped_rebuilds
+
+    @classmethod
+    def _drop_pending_updates(cls, flags: Dict[str, bool]) -> None:
+        ''' Direct update makes the same pending work unnecessary '''
+        pending = cls._pending_updates
+        if not pending:
+            return
+        done = [name for name, value in flags.items()
+                if value and name in pending]
+        if len(done) == 0:
+            return
+        cls._skipped_rebuilds += len(done)
+        cls._pending_updates = {name: value for name, value in pending.items()
+                                if name not in done}
+
     @classmethod
     def update_viewport_shaders(cls, area: Optional[Area] = None, *,
                                 hash: bool = False,
@@ -637,7 +726,7 @@ class Loader:
                                 timeline: bool = False,
                                 mask: bool = False,
                                 tag_redraw: bool = False) -> None:
-        _log.output(_log.color('blue', f'update_viewport_shaders'
+        _log.blue(lambda: f'update_viewport_shaders'
             f'\nhash: {hash}'
             f' -- adaptive_opacity: {adaptive_opacity}'
             f' -- geomobj_matrix: {geomobj_matrix}'
@@ -645,7 +734,20 @@ class Loader:
             f' -- wireframe_data: {wireframe_data}'
             f'\npins_and_residuals: {pins_and_residuals}'
             f' -- timeline: {timeline}'
-            f' -- mask: {mask}'))
+            f' -- mask: {mask}')
+        cls._drop_pending_updates({
+            'adaptive_opacity': adaptive_opacity,
+            'wireframe_colors': wireframe_colors,
+            'geomobj_matrix': geomobj_matrix,
+            'edge_indices': edge_indices,
+            'wireframe': wireframe and
+                         (wireframe_data or
+                          not cls._pending_updates.get('wireframe_data')),
+            'wireframe_data': wireframe and wireframe_data,
+            'ui_scale': ui_scale,
+            'pins_and_residuals': pins_and_residuals,
+            'timeline': timeline,
+            'mask': mask})
         if hash:
             cls.increment_geo_hash()
         if area is None:
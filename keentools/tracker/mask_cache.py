@@ -0,0 +1,166 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' Rendered compositing masks kept between tracking runs.
+    Every mask is rendered once per frame and stored thresholded,
+    packed to 1 bit per pixel. Masks are dropped when their Blender
+    Mask datablock is changed.
+'''
+
+from collections import OrderedDict
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from bpy.types import Mask
+from bpy.app.handlers import persistent
+
+from ..utils.kt_logging import KTLogger
+from ..addon_config import Config
+from ..utils.bpy_common import (bpy_render_frame,
+                                bpy_progress_begin,
+                                bpy_progress_end,
+                                bpy_progress_update)
+from ..utils.images import (np_array_from_bpy_image,
+                            np_threshold_image,
+                            ImageBufferPool)
+
+
+_log = KTLogger(__name__)
+
+
+class CompositingMaskCache:
+    def __init__(self, memory_limit: int):
+        self.memory_limit: int = memory_limit
+        self._masks: OrderedDict = OrderedDict()
+        self._memory: int = 0
+        self._hits: int = 0
+        self._misses: int = 0
+
+    @staticmethod
+    def _key(mask_name: str, frame: int, threshold: float) -> Tuple:
+        return mask_name, frame, round(threshold, 6), bpy_render_frame()
+
+    def get(self, mask_name: str, frame: int,
+            threshold: float) -> Optional[Any]:
+        ''' :return: uint8 image with 0 and 255 values or None '''
+        key = self._key(mask_name, frame, threshold)
+        item = self._masks.get(key)
+        if item is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._masks.move_to_end(key)
+        packed, width = item
+        return np.unpackbits(packed, axis=1, count=width) * np.uint8(255)
+
+    def put(self, mask_name: str, frame: int, threshold: float,
+            grayscale: Any) -> None:
+        key = self._key(mask_name, frame, threshold)
+        packed = np.packbits(grayscale > 0, axis=1)
+        self._drop(key)
+        self._masks[key] = (packed, grayscale.shape[1])
+        self._memory += packed.nbytes
+        while self._memory > self.memory_limit and len(self._masks) > 1:
+            self._drop(next(iter(self._masks)))
+
+    def has(self, mask_name: str, frame: int, threshold: float) -> bool:
+        return self._key(mask_name, frame, threshold) in self._masks
+
+    def _drop(self, key: Tuple) -> None:
+        item = self._masks.pop(key, None)
+        if item is not None:
+            self._memory -= item[0].nbytes
+
+    def invalidate_mask(self, mask_name: str) -> None:
+        keys = [x for x in self._masks if x[0] == mask_name]
+        for key in keys:
+            self._drop(key)
+        if len(keys) > 0:
+            _log.output(f'CompositingMaskCache invalidated: {mask_name} '
+                        f'{len(keys)} frames')
+
+    def clear(self) -> None:
+        self._masks = OrderedDict()
+        self._memory = 0
+
+    def stats(self) -> Tuple[int, int, int, int]:
+        ''' :return: frames, memory, hits, misses '''
+        return len(self._masks), self._memory, self._hits, self._misses
+
+
+_cache: CompositingMaskCache = CompositingMaskCache(
+    Config.comp_mask_cache_memory_limit)
+_render_pool: ImageBufferPool = ImageBufferPool(depth=1, max_shapes=1)
+
+
+def get_compositing_mask_cache() -> CompositingMaskCache:
+    return _cache
+
+
+def render_compositing_mask(geotracker: Any, frame: int) -> Optional[Any]:
+    ''' Cached thresholded compositing mask of the tracker item
+        :return: uint8 image with 0 and 255 values or None '''
+    mask_name = geotracker.compositing_mask
+    threshold = geotracker.compositing_mask_threshold
+    grayscale = _cache.get(mask_name, frame, threshold)
+    if grayscale is not None:
+        return grayscale
+
+    mask_image = geotracker.update_compositing_mask(frame=frame)
+    np_img = np_array_from_bpy_image(mask_image, pool=_render_pool)
+    if np_img is None:
+        return None
+    grayscale = np_threshold_image(np_img, threshold)
+    _cache.put(mask_name, frame, threshold, grayscale)
+    return grayscale
+
+
+def prerender_compositing_masks(geotracker: Any, frames: Iterable[int]) -> int:
+    ''' Render masks of the frames that are not cached yet
+        :return: number of rendered frames '''
+    if geotracker.compositing_mask == '':
+        return 0
+    mask_name = geotracker.compositing_mask
+    threshold = geotracker.compositing_mask_threshold
+    missing: List[int] = [x for x in frames
+                          if not _cache.has(mask_name, x, threshold)]
+    if len(missing) == 0:
+        return 0
+    _log.output(f'prerender_compositing_masks: {len(missing)} frames')
+    bpy_progress_begin(0, len(missing))
+    try:
+        for i, frame in enumerate(missing):
+            render_compositing_mask(geotracker, frame)
+            bpy_progress_update(i + 1)
+    finally:
+        bpy_progress_end()
+    return len(missing)
+
+
+@persistent
+def compositing_mask_depsgraph_handler(scene: Any, depsgraph: Any) -> None:
+    if not depsgraph.id_type_updated('MASK'):
+        return
+    for update in depsgraph.updates:
+        if isinstance(update.id, Mask):
+            _cache.invalidate_mask(update.id.name)
+
+
+@persistent
+def compositing_mask_reset_handler(*args) -> None:
+    _cache.clear()
@@ -263,7 +263,6 @@ class MovePin(bpy.types.Operator):
 
         self.dragged = True
         loader = settings.loader()
-        vp = loader.viewport()
 
         loader.place_object_or_camera()
         if GTConfig.auto_increase_far_clip_distance and geotracker.camobj and \
@@ -278,18 +277,8 @@ class MovePin(bpy.types.Operator):
                 clipping_changed_screen_message(near, far, product=product)
 
         self.update_wireframe()
-
-        gt = loader.kt_geotracker()
-        vp.update_surface_points(gt, geotracker.geomobj, frame)
-
-        wf = vp.wireframer()
-        wf.set_object_world_matrix(geotracker.geomobj.matrix_world)
-        wf.set_camera_pos(geotracker.geomobj.matrix_world,
-                          geotracker.camobj.matrix_world)
-
-        vp.create_batch_2d(area)
-        vp.update_residuals(gt, area, frame)
-        vp.tag_redraw()
+        loader.schedule_viewport_update(area, geomobj_matrix=True,
+                                        pins_and_residuals=True)
         return self.on_default_modal()
 
     def on_default_modal(self) -> Set:
@@ -22,7 +22,8 @@ from contextlib import contextmanager
 
 from bpy.types import (Object, CameraBackgroundImage, Area, Image, Mask,
                        PropertyGroup, MovieClip)
-from bpy.props import IntProperty
+from bpy.props import IntProperty, StringProperty
+from bpy.app.handlers import persistent
 
 from ..utils.kt_logging import KTLogger
 from ..addon_config import Config, get_addon_preferences, ProductType
@@ -31,22 +32,22 @@ from ..utils.images import (get_background_image_object,
                             get_background_image_strict,
                             set_background_image_by_movieclip)
 from ..geotracker.utils.tracking import reload_precalc
-from ..utils.coords import (xz_to_xy_rotation_matrix_4x4,
-                            get_scale_vec_4_from_matrix_world,
+from ..utils.coords import (calc_model_mat_from_matrices,
                             get_image_space_coord,
                             get_camera_border,
-                            get_polygons_in_vertex_group,
-                            LocRotScale)
+                            get_polygons_in_vertex_group)
 from ..utils.bpy_common import (bpy_render_frame,
                                 bpy_current_frame,
                                 bpy_render_single_frame,
                                 get_scene_camera_shift,
-                                bpy_object_is_in_scene)
+                                bpy_object_is_in_scene,
+                                bpy_data)
 from ..utils.compositing import (get_compositing_shadow_scene,
                                  create_mask_compositing_node_tree,
                                  viewer_node_to_image,
                                  get_rendered_mask_bpy_image)
 from ..geotracker.ui_strings import PrecalcStatusMessage
+from ..utils.serial_chunks import prepare_chunks, join_chunks, serial_digest
 from ..blender_independent_packages.pykeentools_loader import module as pkt_module
 
 
@@ -57,6 +58,11 @@ class FrameListItem(PropertyGroup):
     num: IntProperty(name='Frame number', default=-1)
 
 
+class SerialChunkItem(PropertyGroup):
+    digest: StringProperty(name='Chunk digest')
+    data: StringProperty(name='Compressed chunk data')
+
+
 class TrackerItem(PropertyGroup):
     def precalc_message_error(self) -> bool:
         return self.precalc_message in [
@@ -105,11 +111,68 @@ class TrackerItem(PropertyGroup):
         return mask_image
 
     def get_serial_str(self) -> str:
-        return self.serial_str
+        ''' Serial from chunk storage or from serial_str.
+            serial_str not matching its digest was changed
+            by an older addon version that knows nothing about chunks
+        '''
+        if self.serial_chunk_order == '':
+            return self.serial_str
+        if self.serial_str != '' and \
+                self.serial_str_digest != serial_digest(self.serial_str):
+            return self.serial_str
+        pool = {item.digest: item.data for item in self.serial_chunks}
+        try:
+            return join_chunks(self.serial_chunk_order.split(), pool)
+        except Exception as err:
+            _log.error(f'get_serial_str broken chunk storage:\n{str(err)}')
+            return self.serial_str
+
+    def _clear_serial_chunks(self) -> None:
+        self.serial_chunks.clear()
+        self.serial_chunk_order = ''
+        self.serial_str_digest = ''
 
     def save_serial_str(self, serial: str) -> None:
+        ''' Serials shorter than GTConfig.serial_chunk_min_size
+            go to serial_str as is. In bigger ones only chunks
+            that are not stored yet are written, serial_str is
+            refreshed for older addon versions on file save
+        '''
         _log.blue('save_serial_str')
+        if len(serial) < GTConfig.serial_chunk_min_size:
+            self.serial_str = serial
+            if self.serial_chunk_order != '':
+                self._clear_serial_chunks()
+            return
+        chunks = self.serial_chunks
+        order, new_chunks = prepare_chunks(
+            serial, {item.digest for item in chunks})
+        used = set(order)
+        removed = 0
+        for i in reversed(range(len(chunks))):
+            if chunks[i].digest not in used:
+                chunks.remove(i)
+                removed += 1
+        for digest, data in new_chunks.items():
+            item = chunks.add()
+            item.digest = digest
+            item.data = data
+        self.serial_chunk_order = ' '.join(order)
+        self.serial_str_digest = serial_digest(self.serial_str)
+        _log.output(f'save_serial_str chunks: {len(order)} '
+                    f'written: {len(new_chunks)} removed: {removed}')
+
+    def store_compatible_serial_str(self) -> None:
+        ''' Full serial in serial_str for addon versions without chunks '''
+        if self.serial_chunk_order == '':
+            return
+        serial = self.get_serial_str()
+        digest = serial_digest(serial)
+        if self.serial_str_digest == digest and \
+                serial_digest(self.serial_str) == digest:
+            return
         self.serial_str = serial
+        self.serial_str_digest = digest
 
     def camera_mode(self) -> None:
         return self.solve_for_camera
@@ -165,21 +228,8 @@ class TrackerItem(PropertyGroup):
         if not self.camobj or not self.geomobj:
             return np.eye(4)
 
-        rot_mat = xz_to_xy_rotation_matrix_4x4()
-
-        t, r, s = self.camobj.matrix_world.decompose()
-        cam_mat = LocRotScale(t, r, (1, 1, 1))
-
-        geom_mw = self.geomobj.matrix_world
-        geom_scale_vec = get_scale_vec_4_from_matrix_world(geom_mw)
-        if not geom_scale_vec.all():
-            return np.eye(4)
-        geom_scale_inv = np.diag(1.0 / geom_scale_vec)
-        geom_mat = np.array(geom_mw, dtype=np.float32) @ geom_scale_inv
-
-        nm = np.array(cam_mat.inverted_safe(),
-                      dtype=np.float32) @ geom_mat @ rot_mat
-        return nm
+        return calc_model_mat_from_matrices(self.camobj.matrix_world,
+                                            self.geomobj.matrix_world)
 
     def check_pins_on_geometry(self, gt: Any, deep_analyze: bool=False) -> bool:
         def _polygon_exists(vertices: List, poly_sets: List) -> bool:
@@ -475,3 +525,15 @@ class TRSceneSetting(PropertyGroup):
 
     def preferences(self) -> Any:
         return get_addon_preferences()
+
+
+@persistent
+def serial_str_save_handler(*args) -> None:
+    ''' Chunked serials are written to serial_str once per file save '''
+    for scene in bpy_data().scenes:
+        for name in (Config.gt_global_var_name, Config.ft_global_var_name):
+            settings = getattr(scene, name, None)
+            if settings is None:
+                continue
+            for tracker in settings.trackers():
+                tracker.store_compatible_serial_str()
@@ -17,24 +17,38 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import numpy as np
+import os
 import re
-from typing import Any, Set, Tuple, List, Optional
+import shutil
+from uuid import uuid4
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Set, Tuple, List, Optional
 
 from bpy.types import Area, Object
+from bpy.app.handlers import persistent
 
 from ..utils.kt_logging import KTLogger
 from ..utils.version import BVersion
-from ..addon_config import ft_settings
+from ..addon_config import Config, ft_settings
 from ..facetracker_config import FTConfig
+from ..geotracker_config import GTConfig
 from ..utils.bpy_common import (bpy_new_action_with_slot,
                                 bpy_shape_key_move_top,
                                 bpy_shape_key_move_up,
-                                bpy_shape_key_move_bottom)
+                                bpy_shape_key_move_down,
+                                bpy_shape_key_move_bottom,
+                                bpy_abspath,
+                                bpy_data,
+                                bpy_current_frame)
 from ..utils.coords import xy_to_xz_rotation_matrix_3x3, InvScaleFromMatrix
 from ..utils.blendshapes import get_blendshape
 from ..utils.fcurve_operations import (get_safe_action_fcurve,
                                        get_action_fcurve,
+                                       put_anim_data_in_fcurve,
                                        clear_fcurve)
+from .deformation_cache import (DeformationCache,
+                                get_deformation_cache,
+                                close_deformation_cache)
 
 
 _log = KTLogger(__name__)
@@ -48,32 +62,6 @@ def get_all_tracking_frame_shapes(key_blocks: Any) -> List:
             if tracking_frame_name_pattern.match(kb.name)]
 
 
-def get_prev_frame_shape(key_blocks: Any, shape_index: int) -> Tuple[int, int]:
-    '''
-    :return: shape_index, frame_number
-    '''
-    if shape_index == -1:
-        return -1, -1
-    for i in range(shape_index - 1, 0, -1):
-        res = tracking_frame_name_pattern.match(key_blocks[i].name)
-        if res:
-            return i, int(res[1])
-    return -1, -1
-
-
-def get_next_frame_shape(key_blocks: Any, shape_index: int) -> Tuple[int, int]:
-    '''
-    :return: shape_index, frame_number
-    '''
-    if shape_index == -1:
-        return -1, -1
-    for i in range(shape_index + 1, len(key_blocks)):
-        res = tracking_frame_name_pattern.match(key_blocks[i].name)
-        if res:
-            return i, int(res[1])
-    return -1, -1
-
-
 def check_tracking_frames(key_blocks: Any) -> Tuple[bool, Any]:
     count = len(key_blocks)
     check_status = True
@@ -111,23 +99,142 @@ def reorder_tracking_frames(obj: Object) -> None:
         _log.output(f'reorder_tracking_frames [no need]')
         return
     pairs = arr[arr[:, 1] >= 0]
-    res = pairs[pairs[:, 1].argsort()]
+    res = pairs[pairs[:, 1].argsort(kind='stable')]
     indices = res[:, 0]
-    for i, index in enumerate(indices):
+
+    # The first sorted shapes stay in place when they already go
+    # in order after all non-tracking shapes
+    non_tracking = arr[arr[:, 1] < 0][:, 0]
+    start = 0
+    if len(indices) > 0 and (len(non_tracking) == 0 or
+                             non_tracking.max() < indices[0]):
+        start = 1
+        while start < len(indices) and indices[start] > indices[start - 1]:
+            start += 1
+
+    for i in range(start, len(indices)):
+        index = indices[i]
         m = indices[:i]
-        offset = (m < index).sum()
+        offset = (m < index).sum() - (m[:start] < index).sum()
         obj.active_shape_key_index = index - offset
         bpy_shape_key_move_bottom(obj)
+    FrameShapeIndex.invalidate(obj)
+    _log.output(f'reorder_tracking_frames: {len(indices) - start} moves')
 
 
-def check_nearest_frame_sequence(frames: List, key_blocks_count: int) -> bool:
-    actual_frames = reversed([x for x in frames if x != -1])
-    last_index = key_blocks_count - 1
-    for frame in actual_frames:
-        if frame != last_index:
-            return False
-        last_index -= 1
-    return True
+class FrameShapeIndex:
+    ''' Sorted frame numbers of the tracking frame shapes with their
+        key block indices. It is built by one pass over key block names,
+        then kept in sync on insertion and removal made through it and
+        checked on every use, so changes made by the user lead
+        to a lazy rebuild.
+    '''
+    _items: Dict[int, 'FrameShapeIndex'] = {}
+
+    def __init__(self):
+        self.key_block_count: int = -1
+        self.frames: List[int] = []
+        self.indices: List[int] = []
+
+    @classmethod
+    def get(cls, obj: Object) -> 'FrameShapeIndex':
+        shape_keys = obj.data.shape_keys
+        pointer = shape_keys.as_pointer()
+        item = cls._items.get(pointer)
+        if item is None:
+            item = FrameShapeIndex()
+            cls._items[pointer] = item
+        if not item.is_valid(shape_keys.key_blocks):
+            item.rebuild(shape_keys.key_blocks)
+        return item
+
+    @classmethod
+    def invalidate(cls, obj: Optional[Object] = None) -> None:
+        if obj is None:
+            cls._items = {}
+            return
+        if obj.data.shape_keys:
+            cls._items.pop(obj.data.shape_keys.as_pointer(), None)
+
+    def rebuild(self, key_blocks: Any) -> None:
+        pairs = []
+        for i, kb in enumerate(key_blocks):
+            res = tracking_frame_name_pattern.match(kb.name)
+            if res:
+                pairs.append((int(res[1]), i))
+        pairs.sort()
+        self.frames = [x[0] for x in pairs]
+        self.indices = [x[1] for x in pairs]
+        self.key_block_count = len(key_blocks)
+        _log.output(f'FrameShapeIndex rebuilt: {len(pairs)} frames')
+
+    def _check_position(self, key_blocks: Any, pos: int) -> bool:
+        if not (0 <= pos < len(self.frames)):
+            return True
+        return key_blocks[self.indices[pos]].name == \
+            get_frame_shape_name(self.frames[pos])
+
+    def is_valid(self, key_blocks: Any) -> bool:
+        ''' Checks the count and the shapes at both ends of the index '''
+        return self.key_block_count == len(key_blocks) and \
+            self._check_position(key_blocks, 0) and \
+            self._check_position(key_blocks, len(self.frames) - 1)
+
+    def is_ordered(self) -> bool:
+        ''' All tracking shapes are at the end in frame order '''
+        count = len(self.indices)
+        return count == 0 or (self.indices[0] == self.key_block_count - count
+                              and self.indices[-1] == self.key_block_count - 1)
+
+    def find(self, frame: int) -> int:
+        pos = bisect_left(self.frames, frame)
+        if pos < len(self.frames) and self.frames[pos] == frame:
+            return self.indices[pos]
+        return -1
+
+    def prev_frame(self, frame: int) -> int:
+        pos = bisect_left(self.frames, frame)
+        return self.frames[pos - 1] if pos > 0 else -1
+
+    def next_frame(self, frame: int) -> int:
+        pos = bisect_right(self.frames, frame)
+        return self.frames[pos] if pos < len(self.frames) else -1
+
+    def frames_in_range(self, frame_from: int, frame_to: int) -> List[int]:
+        return self.frames[bisect_left(self.frames, frame_from):
+                           bisect_right(self.frames, frame_to)]
+
+    def target_index(self, frame: int) -> int:
+        ''' Key block index keeping frame order for a new frame shape '''
+        pos = bisect_left(self.frames, frame)
+        if pos < len(self.indices):
+            return self.indices[pos]
+        return self.key_block_count
+
+    def on_insert(self, frame: int, shape_index: int) -> None:
+        self.indices = [x + 1 if x >= shape_index else x
+                        for x in self.indices]
+        pos = bisect_left(self.frames, frame)
+        self.frames.insert(pos, frame)
+        self.indices.insert(pos, shape_index)
+        self.key_block_count += 1
+
+    def on_remove(self, frame: int) -> None:
+        pos = bisect_left(self.frames, frame)
+        if pos >= len(self.frames) or self.frames[pos] != frame:
+            return
+        shape_index = self.indices[pos]
+        del self.frames[pos]
+        del self.indices[pos]
+        self.indices = [x - 1 if x > shape_index else x
+                        for x in self.indices]
+        self.key_block_count -= 1
+
+
+@persistent
+def frame_shape_index_reset_handler(*args) -> None:
+    ''' Shape key pointers are not valid after undo or file load '''
+    FrameShapeIndex.invalidate()
 
 
 def make_fcurve_pile_animation(fcurve: Any, frames: List,
@@ -137,37 +244,312 @@ def make_fcurve_pile_animation(fcurve: Any, frames: List,
     clear_fcurve(fcurve)
     pile = [0.0, 1.0, 0.0]
     anim_data_list = [x for x in zip(frames, pile) if x[0] != -1]
-    fcurve.keyframe_points.add(len(anim_data_list))
-    for i, point in enumerate(anim_data_list):
-        kp = fcurve.keyframe_points[i]
-        kp.co = point
-        kp.interpolation = 'LINEAR'
-        if keyframe_set is None:
-            continue
+    put_anim_data_in_fcurve(fcurve, anim_data_list, 'LINEAR')
+    if keyframe_set is None:
+        return
+    for kp, point in zip(fcurve.keyframe_points, anim_data_list):
         kp.type = 'KEYFRAME' if point[0] in keyframe_set else 'JITTER'
-    fcurve.update()
 
 
 def get_frame_shape_name(frame: int) -> str:
     return f'frame_{str(frame).zfill(4)}'
 
 
-def bubble_frame_shape(obj: Object, shape_index: int, frame: int) -> int:
+def _get_shape_action(shape_keys: Any, action_name: str) -> Any:
+    anim_data = shape_keys.animation_data
+    if not anim_data:
+        anim_data = shape_keys.animation_data_create()
+    action = anim_data.action
+    if not action:
+        action = bpy_new_action_with_slot(anim_data, action_name)
+    return action
+
+
+def _update_pile_animations(action: Any, index: FrameShapeIndex,
+                            frames: Set[int], keyframe_set: Set) -> None:
+    for frame in sorted(frames):
+        fcurve = get_safe_action_fcurve(
+            action, f'key_blocks["{get_frame_shape_name(frame)}"].value')
+        make_fcurve_pile_animation(
+            fcurve, [index.prev_frame(frame), frame, index.next_frame(frame)],
+            keyframe_set)
+
+
+def _get_frame_shape(obj: Object, index: FrameShapeIndex,
+                     frame: int) -> Tuple[Any, bool]:
+    ''' A new shape is moved right to its place when the tracking shapes
+        are in order, otherwise it is left at the end of the list.
+        :return: shape, created_flag
+    '''
     key_blocks = obj.data.shape_keys.key_blocks
-    current_index = shape_index
-    for i in range(shape_index - 1, 0, -1):
-        prev_index, prev_frame = get_prev_frame_shape(key_blocks, current_index)
-        if prev_index == -1 or prev_frame < frame:
-            break
-        for _ in range(prev_index, current_index):
-            bpy_shape_key_move_up(obj)
-        current_index = prev_index
-    return current_index
+    shape_name = get_frame_shape_name(frame)
+    shape_index = index.find(frame)
+    if shape_index >= 0 and key_blocks[shape_index].name != shape_name:
+        index.rebuild(key_blocks)
+        shape_index = index.find(frame)
+    if shape_index >= 0:
+        return key_blocks[shape_index], False
+
+    ordered = index.is_ordered()
+    target_index = index.target_index(frame)
+    shape = obj.shape_key_add(name=shape_name, from_mix=False)
+    shape_index = len(key_blocks) - 1
+    obj.active_shape_key_index = shape_index
+    if ordered:
+        # TOP places a relative shape right after Basis
+        if 1 <= target_index < shape_index - target_index:
+            bpy_shape_key_move_top(obj)
+            for _ in range(target_index - 1):
+                bpy_shape_key_move_down(obj)
+        else:
+            for _ in range(shape_index - target_index):
+                bpy_shape_key_move_up(obj)
+        shape_index = target_index
+    index.on_insert(frame, shape_index)
+    return shape, True
 
 
-def create_relative_shape_keyframe(frame: int, *,
-                                   action_name: str = FTConfig.ft_action_name) -> None:
-    _log.yellow(f'create_shape_keyframe: {frame}')
+def _tracked_frame_verts(geomobj: Object, gt: Any, frame: int) -> Any:
+    scale_inv = np.array(InvScaleFromMatrix(geomobj.matrix_world),
+                         dtype=np.float32)
+    verts = gt.applied_args_model_vertices_at(frame)
+    return verts @ xy_to_xz_rotation_matrix_3x3() @ scale_inv
+
+
+def _basis_verts(geomobj: Object) -> Any:
+    _, basis_shape, _ = get_blendshape(geomobj, name='Basis',
+                                       create_basis=True)
+    verts = np.empty((len(geomobj.data.vertices), 3), dtype=np.float32)
+    basis_shape.data.foreach_get('co', verts.ravel())
+    return verts
+
+
+def default_deformation_cache_path(geomobj: Object,
+                                   blend_path: Optional[str] = None) -> str:
+    ''' Next to the .blend file with its name in the file name.
+        Unsaved files get a unique name in the temp folder,
+        the file is moved next to the .blend file on save
+    '''
+    if blend_path is None:
+        blend_path = bpy_data().filepath
+    if blend_path:
+        blend_name = os.path.splitext(os.path.basename(blend_path))[0]
+        return f'//{blend_name}_{geomobj.name}' \
+               f'{FTConfig.ft_deformation_cache_ext}'
+    return f'{GTConfig.gt_precalc_folder}untitled_{uuid4().hex[:8]}_' \
+           f'{geomobj.name}{FTConfig.ft_deformation_cache_ext}'
+
+
+def _is_temp_deformation_cache_path(filepath: str) -> bool:
+    if filepath == '' or filepath.startswith('//'):
+        return False
+    folder = os.path.normpath(GTConfig.gt_precalc_folder)
+    return os.path.dirname(os.path.normpath(filepath)) == folder
+
+
+def _deformation_cache_source_path(filepath: str,
+                                   blend_path: str) -> str:
+    if filepath.startswith('//'):
+        return os.path.join(os.path.dirname(blend_path), filepath[2:])
+    return filepath
+
+
+@persistent
+def deformation_cache_save_handler(*args) -> None:
+    ''' Caches of unsaved files are moved from the temp folder
+        next to the .blend file and get relative paths.
+        Save As gives the new file its own copy of the cache,
+        the previous file keeps using the old one
+    '''
+    old_blend_path = bpy_data().filepath
+    blend_path = next((x for x in args if isinstance(x, str) and x != ''),
+                      old_blend_path)
+    if not blend_path:
+        return
+    blend_changed = old_blend_path != '' and \
+        os.path.normpath(old_blend_path) != os.path.normpath(blend_path)
+    for scene in bpy_data().scenes:
+        settings = getattr(scene, Config.ft_global_var_name, None)
+        if settings is None:
+            continue
+        for geotracker in settings.trackers():
+            filepath = geotracker.deformation_cache_path
+            if not geotracker.geomobj or filepath == '':
+                continue
+            is_temp = _is_temp_deformation_cache_path(filepath)
+            if not is_temp and not (blend_changed and
+                                    filepath.startswith('//')):
+                continue
+            source = filepath if is_temp else \
+                _deformation_cache_source_path(filepath, old_blend_path)
+            new_path = default_deformation_cache_path(geotracker.geomobj,
+                                                      blend_path)
+            target = os.path.join(os.path.dirname(blend_path), new_path[2:])
+            if os.path.normpath(source) == os.path.normpath(target):
+                continue
+            close_deformation_cache(source)
+            try:
+                if os.path.exists(source):
+                    if is_temp:
+                        shutil.move(source, target)
+                    else:
+                        shutil.copyfile(source, target)
+            except OSError as err:
+                _log.error(f'deformation_cache_save_handler:\n{str(err)}')
+                continue
+            geotracker.deformation_cache_path = new_path
+            _log.output(f'deformation cache {"moved" if is_temp else "copied"}'
+                        f': {source} -> {target}')
+
+
+def geotracker_deformation_cache(geotracker: Any, *,
+                                 create: bool = False
+                                 ) -> Optional[DeformationCache]:
+    geomobj = geotracker.geomobj
+    if not geomobj:
+        return None
+    if geotracker.deformation_cache_path == '':
+        if not create:
+            return None
+        geotracker.deformation_cache_path = \
+            default_deformation_cache_path(geomobj)
+    basis = _basis_verts(geomobj) if create else None
+    return get_deformation_cache(
+        bpy_abspath(geotracker.deformation_cache_path), basis=basis,
+        dtype=FTConfig.ft_deformation_cache_dtype)
+
+
+def apply_deformation_cache(geomobj: Object, cache: DeformationCache,
+                            frame: float) -> bool:
+    ''' The cached deformation is shown through a single shape key '''
+    if cache.vertex_count() != len(geomobj.data.vertices):
+        return False
+    verts = cache.evaluate(frame)
+    if verts is None:
+        return False
+    _, shape, created = get_blendshape(
+        geomobj, name=FTConfig.ft_deformation_shape_name,
+        create_basis=True, create=True)
+    if created:
+        shape.value = 1.0
+    shape.data.foreach_set('co', verts.ravel())
+    geomobj.data.update()
+    return True
+
+
+@persistent
+def deformation_cache_frame_handler(scene: Any) -> None:
+    settings = getattr(scene, Config.ft_global_var_name, None)
+    if settings is None:
+        return
+    frame = scene.frame_current + scene.frame_subframe
+    for geotracker in settings.trackers():
+        if geotracker.deformation_storage != 'CACHE_FILE' \
+                or not geotracker.geomobj:
+            continue
+        cache = geotracker_deformation_cache(geotracker)
+        if cache is not None:
+            apply_deformation_cache(geotracker.geomobj, cache, frame)
+
+
+def _store_frame_in_deformation_cache(geotracker: Any, gt: Any,
+                                      frame: int) -> None:
+    ''' The frame is written straight to the cache file,
+        so Undo does not revert it: the cache keeps the last tracked
+        result until the frame is tracked again or removed '''
+    geomobj = geotracker.geomobj
+    cache = geotracker_deformation_cache(geotracker, create=True)
+    cache.set_frame(frame, _tracked_frame_verts(geomobj, gt, frame))
+    if cache.garbage_rows() > max(cache.frame_count(),
+                                  FTConfig.ft_deformation_cache_min_garbage):
+        cache.compact()
+    apply_deformation_cache(geomobj, cache, frame)
+
+
+def shape_keys_to_deformation_cache(geotracker: Any) -> int:
+    ''' Tracking frame shape keys are moved into the cache file.
+        :return: number of converted frames
+    '''
+    geomobj = geotracker.geomobj
+    if not geomobj or not geomobj.data.shape_keys:
+        return 0
+    key_blocks = geomobj.data.shape_keys.key_blocks
+    frame_shapes = get_all_tracking_frame_shapes(key_blocks)
+
+    if geotracker.deformation_cache_path == '':
+        geotracker.deformation_cache_path = \
+            default_deformation_cache_path(geomobj)
+    basis = _basis_verts(geomobj)
+    cache = DeformationCache.create(
+        bpy_abspath(geotracker.deformation_cache_path), basis,
+        FTConfig.ft_deformation_cache_dtype)
+
+    frames = [int(tracking_frame_name_pattern.match(kb.name)[1])
+              for kb in frame_shapes]
+    verts = np.empty((len(frame_shapes), len(basis), 3), dtype=np.float32)
+    for i, kb in enumerate(frame_shapes):
+        kb.data.foreach_get('co', verts[i].ravel())
+    if len(frames) > 0:
+        cache.set_frames(frames, verts)
+    cache = geotracker_deformation_cache(geotracker)
+
+    anim_data = geomobj.data.shape_keys.animation_data
+    action = anim_data.action if anim_data else None
+    for kb in frame_shapes:
+        if action:
+            fcurve = get_action_fcurve(action, f'key_blocks["{kb.name}"].value')
+            if fcurve:
+                action.fcurves.remove(fcurve)
+        geomobj.shape_key_remove(kb)
+
+    if cache is not None:
+        apply_deformation_cache(geomobj, cache, bpy_current_frame())
+    _log.output(f'shape_keys_to_deformation_cache: {len(frames)} frames')
+    return len(frames)
+
+
+def deformation_cache_to_shape_keys(
+        geotracker: Any, *,
+        action_name: str = FTConfig.ft_action_name) -> int:
+    ''' Frame shape keys with pile animation are created from the cache.
+        :return: number of converted frames
+    '''
+    geomobj = geotracker.geomobj
+    if not geomobj:
+        return 0
+    cache = geotracker_deformation_cache(geotracker)
+    if cache is None or cache.vertex_count() != len(geomobj.data.vertices):
+        return 0
+
+    get_blendshape(geomobj, name='Basis', create_basis=True)
+    _, deformation_shape, _ = get_blendshape(
+        geomobj, name=FTConfig.ft_deformation_shape_name)
+    if deformation_shape:
+        geomobj.shape_key_remove(deformation_shape)
+
+    action = _get_shape_action(geomobj.data.shape_keys, action_name)
+
+    gt = ft_settings().loader().kt_geotracker()
+    keyframe_set = set(gt.keyframes())
+    frames = cache.frames().tolist()
+    index = FrameShapeIndex.get(geomobj)
+    for frame in frames:
+        shape, _ = _get_frame_shape(geomobj, index, frame)
+        shape.data.foreach_set('co', cache.frame_verts(frame).ravel())
+    if not index.is_ordered():
+        reorder_tracking_frames(geomobj)
+        index = FrameShapeIndex.get(geomobj)
+    _update_pile_animations(action, index, set(frames), keyframe_set)
+    _log.output(f'deformation_cache_to_shape_keys: {len(frames)} frames')
+    return len(frames)
+
+
+def create_relative_shape_keyframes(
+        frames: List[int], *,
+        action_name: str = FTConfig.ft_action_name) -> None:
+    ''' Frame shapes are created or updated at once,
+        pile animation is rebuilt only for them and their neighbours '''
+    _log.yellow(f'create_relative_shape_keyframes: {frames}')
     settings = ft_settings()
     loader = settings.loader()
     geotracker = settings.get_current_geotracker_item()
@@ -175,7 +557,15 @@ def create_relative_shape_keyframe(frame: int, *,
         return
 
     geomobj = geotracker.geomobj
-    if not geomobj:
+    if not geomobj or len(frames) == 0:
+        return
+
+    gt = loader.kt_geotracker()
+    frames = sorted(set(frames))
+    if geotracker.deformation_storage == 'CACHE_FILE':
+        for frame in frames:
+            _store_frame_in_deformation_cache(geotracker, gt, frame)
+        _log.output(f'create_relative_shape_keyframes end [cache] >>>')
         return
 
     mesh = geomobj.data
@@ -187,70 +577,41 @@ def create_relative_shape_keyframe(frame: int, *,
         geomobj.active_shape_key_index = basis_index
         bpy_shape_key_move_top(geomobj)
 
-    shape_name = get_frame_shape_name(frame)
-    shape_index, shape, new_shape_created = get_blendshape(geomobj,
-                                                           name=shape_name,
-                                                           create=True)
-    scale_inv = np.array(InvScaleFromMatrix(geomobj.matrix_world),
-                         dtype=np.float32)
-    gt = loader.kt_geotracker()
-    verts = gt.applied_args_model_vertices_at(frame)
-    shape.data.foreach_set('co', (verts @ xy_to_xz_rotation_matrix_3x3()
-                                  @ scale_inv).ravel())
+    index = FrameShapeIndex.get(geomobj)
+    created_count = 0
+    for frame in frames:
+        shape, created = _get_frame_shape(geomobj, index, frame)
+        shape.data.foreach_set('co', _tracked_frame_verts(geomobj, gt,
+                                                          frame).ravel())
+        created_count += int(created)
 
-    geomobj.active_shape_key_index = shape_index
-    key_blocks = mesh.shape_keys.key_blocks
-
-    if new_shape_created:
-        shape_index = bubble_frame_shape(geomobj, shape_index, frame)
-        _log.red(f'bubble_shape: {shape_index}')
-
-    prev_index1, prev_frame1 = get_prev_frame_shape(key_blocks, shape_index)
-    next_index1, next_frame1 = get_next_frame_shape(key_blocks, shape_index)
-    prev_index2, prev_frame2 = get_prev_frame_shape(key_blocks, prev_index1)
-    next_index2, next_frame2 = get_next_frame_shape(key_blocks, next_index1)
-
-    if not check_nearest_frame_sequence([prev_frame2, prev_frame1, frame,
-                                         next_frame1, next_frame2],
-                                        len(key_blocks)):
-        _log.red('check_nearest_frame_sequence is not passed!')
+    if not index.is_ordered():
+        _log.red('tracking frame shapes are not in order')
         reorder_tracking_frames(geomobj)
-        shape_index, _, _ = get_blendshape(geomobj, name=shape_name)
-        prev_index1, prev_frame1 = get_prev_frame_shape(key_blocks, shape_index)
-        next_index1, next_frame1 = get_next_frame_shape(key_blocks, shape_index)
-        prev_index2, prev_frame2 = get_prev_frame_shape(key_blocks, prev_index1)
-        next_index2, next_frame2 = get_next_frame_shape(key_blocks, next_index1)
+        index = FrameShapeIndex.get(geomobj)
 
-    anim_data = mesh.shape_keys.animation_data
-    if not anim_data:
-        anim_data = mesh.shape_keys.animation_data_create()
+    affected_frames = set(frames)
+    for frame in frames:
+        affected_frames.add(index.prev_frame(frame))
+        affected_frames.add(index.next_frame(frame))
+    affected_frames.discard(-1)
 
-    action = anim_data.action
-    if not action:
-        action = bpy_new_action_with_slot(anim_data, action_name)
+    action = _get_shape_action(mesh.shape_keys, action_name)
+    _update_pile_animations(action, index, affected_frames,
+                            set(gt.keyframes()))
+    geomobj.active_shape_key_index = index.find(frames[-1])
+    _log.output(f'create_relative_shape_keyframes end: '
+                f'{created_count} new shapes >>>')
 
-    keyframe_set = set(gt.keyframes())
-    main_fcurve = get_safe_action_fcurve(action,
-                                         f'key_blocks["{shape_name}"].value')
-    make_fcurve_pile_animation(main_fcurve, [prev_frame1, frame, next_frame1],
-                               keyframe_set)
-    if prev_index1 != -1:
-        prev_fcurve = get_safe_action_fcurve(
-            action, f'key_blocks["{key_blocks[prev_index1].name}"].value')
-        make_fcurve_pile_animation(prev_fcurve,
-                                   [prev_frame2, prev_frame1, frame],
-                                   keyframe_set)
-    if next_frame1 != -1:
-        next_fcurve = get_safe_action_fcurve(
-            action, f'key_blocks["{key_blocks[next_index1].name}"].value')
-        make_fcurve_pile_animation(next_fcurve,
-                                   [frame, next_frame1, next_frame2],
-                                   keyframe_set)
-    _log.output(f'create_shape_keyframe end >>>')
 
+def create_relative_shape_keyframe(frame: int, *,
+                                   action_name: str = FTConfig.ft_action_name) -> None:
+    create_relative_shape_keyframes([frame], action_name=action_name)
 
-def remove_relative_shape_keyframe(frame: int) -> None:
-    _log.yellow(f'remove_relative_shape_keyframe: {frame}')
+
+def remove_relative_shape_keyframes(frame_from: int, frame_to: int) -> None:
+    ''' Batched removal of the frame shapes in [frame_from, frame_to] '''
+    _log.yellow(f'remove_relative_shape_keyframes: {frame_from} {frame_to}')
     settings = ft_settings()
     geotracker = settings.get_current_geotracker_item()
     if not geotracker:
@@ -260,72 +621,60 @@ def remove_relative_shape_keyframe(frame: int) -> None:
     if not geomobj:
         return
 
+    if geotracker.deformation_storage == 'CACHE_FILE':
+        cache = geotracker_deformation_cache(geotracker)
+        if cache is not None:
+            cache.remove_frames(frame_from, frame_to)
+        return
+
     mesh = geomobj.data
+    if not mesh.shape_keys:
+        return
     mesh.shape_keys.use_relative = True
 
     basis_index, basis_shape, _ = get_blendshape(geomobj, name='Basis')
     if basis_index < 0:
-        _log.red('remove_relative_shape_keyframe: no Basis')
+        _log.red('remove_relative_shape_keyframes: no Basis')
         return
 
     if basis_index != 0:
         geomobj.active_shape_key_index = basis_index
         bpy_shape_key_move_top(geomobj)
 
-    shape_name = get_frame_shape_name(frame)
-    shape_index, shape, new_shape_created = get_blendshape(geomobj,
-                                                           name=shape_name)
-    if not shape:
-        _log.red(f'remove_relative_shape_keyframe: no shape {shape_name}')
+    index = FrameShapeIndex.get(geomobj)
+    frames = index.frames_in_range(frame_from, frame_to)
+    if len(frames) == 0:
+        _log.output('remove_relative_shape_keyframes: no shapes in range')
         return
-
-    key_blocks = mesh.shape_keys.key_blocks
-
-    prev_index1, prev_frame1 = get_prev_frame_shape(key_blocks, shape_index)
-    next_index1, next_frame1 = get_next_frame_shape(key_blocks, shape_index)
-    prev_index2, prev_frame2 = get_prev_frame_shape(key_blocks, prev_index1)
-    next_index2, next_frame2 = get_next_frame_shape(key_blocks, next_index1)
-
-    if not check_nearest_frame_sequence([prev_frame2, prev_frame1, frame,
-                                         next_frame1, next_frame2],
-                                        len(key_blocks)):
-        _log.red('check_nearest_frame_sequence is not passed!')
-        reorder_tracking_frames(geomobj)
-        shape_index, _, _ = get_blendshape(geomobj, name=shape_name)
-        prev_index1, prev_frame1 = get_prev_frame_shape(key_blocks, shape_index)
-        next_index1, next_frame1 = get_next_frame_shape(key_blocks, shape_index)
-        prev_index2, prev_frame2 = get_prev_frame_shape(key_blocks, prev_index1)
-        next_index2, next_frame2 = get_next_frame_shape(key_blocks, next_index1)
+    prev_frame = index.prev_frame(frames[0])
+    next_frame = index.next_frame(frames[-1])
 
     anim_data = mesh.shape_keys.animation_data
-    if not anim_data:
-        return
-    action = anim_data.action
-    if not action:
-        return
+    action = anim_data.action if anim_data else None
+    key_blocks = mesh.shape_keys.key_blocks
+    for frame in reversed(frames):
+        shape_name = get_frame_shape_name(frame)
+        shape_index = index.find(frame)
+        if key_blocks[shape_index].name != shape_name:
+            index.rebuild(key_blocks)
+            shape_index = index.find(frame)
+        if action:
+            fcurve = get_action_fcurve(action,
+                                       f'key_blocks["{shape_name}"].value')
+            if fcurve:
+                action.fcurves.remove(fcurve)
+        geomobj.shape_key_remove(key_blocks[shape_index])
+        index.on_remove(frame)
+
+    if action:
+        gt = settings.loader().kt_geotracker()
+        neighbours = {prev_frame, next_frame}
+        neighbours.discard(-1)
+        _update_pile_animations(action, index, neighbours,
+                                set(gt.keyframes()))
+    _log.output(f'remove_relative_shape_keyframes end: '
+                f'{len(frames)} shapes >>>')
 
-    main_fcurve = get_action_fcurve(action, f'key_blocks["{shape_name}"].value')
-    if not main_fcurve:
-        _log.red('no main_fcurve')
-        return
 
-    gt = settings.loader().kt_geotracker()
-    keyframe_set = set(gt.keyframes())
-    if prev_index1 != -1:
-        prev_fcurve = get_action_fcurve(
-            action, f'key_blocks["{key_blocks[prev_index1].name}"].value')
-        if prev_fcurve:
-            make_fcurve_pile_animation(prev_fcurve,
-                                       [prev_frame2, prev_frame1, next_frame1],
-                                       keyframe_set)
-    if next_frame1 != -1:
-        next_fcurve = get_action_fcurve(
-            action, f'key_blocks["{key_blocks[next_index1].name}"].value')
-        if next_fcurve:
-            make_fcurve_pile_animation(next_fcurve,
-                                       [prev_frame1, next_frame1, next_frame2],
-                                       keyframe_set)
-
-    action.fcurves.remove(main_fcurve)
-    geomobj.shape_key_remove(shape)
-    _log.output(f'remove_relative_shape_keyframe end >>>')
+def remove_relative_shape_keyframe(frame: int) -> None:
+    remove_relative_shape_keyframes(frame, frame)
@@ -0,0 +1,158 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+from typing import Any, Dict, List, Tuple
+
+from bpy.types import Object
+from mathutils import Matrix, Euler, Quaternion
+
+from .kt_logging import KTLogger
+from .coords import LocRotScale
+
+
+_log = KTLogger(__name__)
+
+
+_transform_paths: Tuple = ('location', 'rotation_euler', 'rotation_quaternion',
+                           'rotation_axis_angle', 'scale')
+
+
+def _rotation_path(obj: Object) -> Tuple[str, int]:
+    if obj.rotation_mode == 'QUATERNION':
+        return 'rotation_quaternion', 4
+    if obj.rotation_mode == 'AXIS_ANGLE':
+        return 'rotation_axis_angle', 4
+    return 'rotation_euler', 3
+
+
+def _has_delta_transform(obj: Object) -> bool:
+    return any(obj.delta_location) or any(obj.delta_rotation_euler) or \
+        tuple(obj.delta_rotation_quaternion) != (1.0, 0.0, 0.0, 0.0) or \
+        tuple(obj.delta_scale) != (1.0, 1.0, 1.0)
+
+
+def _anim_data_is_plain(obj: Object) -> bool:
+    anim_data = obj.animation_data
+    if not anim_data:
+        return True
+    if any(not track.mute for track in anim_data.nla_tracks):
+        return False
+    if getattr(anim_data, 'action_influence', 1.0) != 1.0 or \
+            getattr(anim_data, 'action_blend_type', 'REPLACE') != 'REPLACE':
+        return False
+    if any(d.data_path in _transform_paths for d in anim_data.drivers):
+        return False
+    action = anim_data.action
+    return not action or \
+        not any(fc.data_path.startswith('delta_') for fc in action.fcurves)
+
+
+def object_matrix_is_evaluable(obj: Object) -> bool:
+    ''' Object world matrix can be found from fcurves only:
+        no active constraints, drivers, NLA or delta transforms
+        in the object and its parents '''
+    while obj is not None:
+        if any(not c.mute for c in obj.constraints):
+            return False
+        if _has_delta_transform(obj) or not _anim_data_is_plain(obj):
+            return False
+        if obj.parent is not None and obj.parent_type != 'OBJECT':
+            return False
+        obj = obj.parent
+    return True
+
+
+class WorldMatrixEvaluator:
+    ''' Object world matrices at arbitrary frames without scene frame
+        change. Matrices are computed from loc/rot/scale fcurves of the
+        object and its parent chain and cached by frame,
+        clear() must be called after the animation is changed.
+    '''
+    def __init__(self):
+        self._evaluable: Dict[int, bool] = {}
+        self._fcurves: Dict[Tuple[int, str, int], Any] = {}
+        self._matrices: Dict[Tuple[int, int], Matrix] = {}
+        self._hits: int = 0
+        self._misses: int = 0
+
+    def clear(self) -> None:
+        self._evaluable = {}
+        self._fcurves = {}
+        self._matrices = {}
+
+    def is_evaluable(self, obj: Object) -> bool:
+        pointer = obj.as_pointer()
+        if pointer not in self._evaluable:
+            self._evaluable[pointer] = object_matrix_is_evaluable(obj)
+            if not self._evaluable[pointer]:
+                _log.output(f'WorldMatrixEvaluator fallback: {obj.name}')
+        return self._evaluable[pointer]
+
+    def _fcurve(self, obj: Object, data_path: str, index: int) -> Any:
+        key = (obj.as_pointer(), data_path, index)
+        if key not in self._fcurves:
+            anim_data = obj.animation_data
+            action = anim_data.action if anim_data else None
+            fcurve = action.fcurves.find(data_path, index=index) \
+                if action else None
+            self._fcurves[key] = fcurve \
+                if fcurve and not fcurve.mute and not fcurve.is_empty \
+                else None
+        return self._fcurves[key]
+
+    def _channel_values(self, obj: Object, data_path: str,
+                        count: int, frame: float) -> List[float]:
+        values = list(getattr(obj, data_path))
+        for i in range(count):
+            fcurve = self._fcurve(obj, data_path, i)
+            if fcurve is not None:
+                values[i] = fcurve.evaluate(frame)
+        return values
+
+    def basis_matrix(self, obj: Object, frame: float) -> Matrix:
+        loc = self._channel_values(obj, 'location', 3, frame)
+        scale = self._channel_values(obj, 'scale', 3, frame)
+        data_path, count = _rotation_path(obj)
+        rot = self._channel_values(obj, data_path, count, frame)
+        if data_path == 'rotation_quaternion':
+            quat = Quaternion(rot).normalized()
+        elif data_path == 'rotation_axis_angle':
+            quat = Quaternion(rot[1:], rot[0])
+        else:
+            quat = Euler(rot, obj.rotation_mode).to_quaternion()
+        return LocRotScale(loc, quat, scale)
+
+    def parent_matrix(self, obj: Object, frame: float) -> Matrix:
+        ''' World matrix part coming from the parent chain '''
+        if obj.parent is None:
+            return Matrix.Identity(4)
+        return self.world_matrix(obj.parent, frame) @ obj.matrix_parent_inverse
+
+    def world_matrix(self, obj: Object, frame: float) -> Matrix:
+        key = (obj.as_pointer(), frame)
+        mat = self._matrices.get(key)
+        if mat is not None:
+            self._hits += 1
+            return mat
+        self._misses += 1
+        mat = self.parent_matrix(obj, frame) @ self.basis_matrix(obj, frame)
+        self._matrices[key] = mat
+        return mat
+
+    def stats(self) -> Tuple[int, int]:
+        return self._hits, self._misses
@@ -16,8 +16,9 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # ##### END GPL LICENSE BLOCK #####
 
-from typing import Optional, List, Set, Dict, Any
+from typing import Optional, List, Dict, Any
 
+import numpy as np
 from bpy.types import Object, Action, FCurve, Keyframe
 from mathutils import Vector, Matrix
 
@@ -36,11 +37,18 @@ from .bpy_common import (bpy_current_frame,
                          bpy_progress_end,
                          bpy_progress_update)
 from .fcurve_operations import *
+from .keyframe_index import (get_keyframe_index,
+                             get_locrot_fcurves,
+                             invalidate_keyframe_indices)
 
 
 _log = KTLogger(__name__)
 
 
+# Larger ranges are removed by rewriting the fcurve points at once
+_max_single_point_removals: int = 16
+
+
 def count_fcurve_points(obj: Object, data_path: str, index: int = 0) -> int:
     action = get_object_action(obj)
     if action is None:
@@ -148,6 +156,50 @@ def insert_point_in_fcurve(fcurve: FCurve, frame: int, value: float,
     return k
 
 
+def insert_points_in_fcurve(fcurve: FCurve, frames: List[int], values: List[float],
+                            keyframe_types: Optional[List[str]] = None) -> None:
+    ''' Batched insert_point_in_fcurve: points at existing frames are
+        updated, the others are added at once, then the fcurve is sorted
+        and its handles are recalculated by one update() call '''
+    if len(frames) == 0:
+        return
+    points = fcurve.keyframe_points
+    count = len(points)
+    co = np.empty((count, 2), dtype=np.float32)
+    points.foreach_get('co', co.ravel())
+    positions = {frame: i for i, frame in enumerate(co[:, 0].tolist())}
+
+    new_co = []
+    for frame, value in zip(frames, values):
+        i = positions.get(frame)
+        if i is None:
+            new_co.append((frame, value))
+        else:
+            co[i, 1] = value
+
+    if len(new_co) > 0:
+        handles_left = np.empty_like(co)
+        handles_right = np.empty_like(co)
+        points.foreach_get('handle_left', handles_left.ravel())
+        points.foreach_get('handle_right', handles_right.ravel())
+        new_co = np.array(new_co, dtype=np.float32)
+        co = np.concatenate((co, new_co))
+        points.add(len(new_co))
+        points.foreach_set('handle_left',
+                           np.concatenate((handles_left, new_co)).ravel())
+        points.foreach_set('handle_right',
+                           np.concatenate((handles_right, new_co)).ravel())
+    points.foreach_set('co', co.ravel())
+    fcurve.update()
+
+    if keyframe_types is None:
+        return
+    points.foreach_get('co', co.ravel())
+    positions = {frame: i for i, frame in enumerate(co[:, 0].tolist())}
+    for frame, keyframe_type in zip(frames, keyframe_types):
+        points[positions[frame]].type = keyframe_type
+
+
 def mark_all_points_in_fcurve(fcurve: FCurve,
                               keyframe_type: str = 'KEYFRAME') -> None:
     for keyframe in fcurve.keyframe_points:
@@ -288,6 +340,24 @@ def create_locrot_keyframe(obj: Object, keyframe_type: str = 'KEYFRAME') -> None
         insert_point_in_fcurve(fcurve, current_frame, value, keyframe_type)
 
 
+def create_locrot_keyframes(obj: Object, frames: List[int], locrots: List,
+                            keyframe_types: List[str]) -> None:
+    ''' Batched create_locrot_keyframe for several frames
+        :param locrots: location and euler rotation for every frame
+    '''
+    action = _get_safe_object_action(obj, 'GTAct')
+    if action is None:
+        return
+    locrot_dict = get_locrot_dict()
+    values = np.array(locrots, dtype=np.float32).reshape((-1, 6))
+    for i, name in enumerate(locrot_dict.keys()):
+        fcurve = get_safe_action_fcurve(action, locrot_dict[name]['data_path'],
+                                        index=locrot_dict[name]['index'])
+        insert_points_in_fcurve(fcurve, frames, values[:, i].tolist(),
+                                keyframe_types)
+    _log.output(f'create_locrot_keyframes: {len(frames)} frames')
+
+
 def delete_locrot_keyframe(obj: Object) -> None:
     operator_with_context(bpy_ops().anim.keyframe_delete_by_name,
                           {'selected_objects': [obj]},
@@ -295,50 +365,30 @@ def delete_locrot_keyframe(obj: Object) -> None:
 
 
 def delete_animation_between_frames(obj: Object, from_frame: int, to_frame: int) -> None:
-    action = get_object_action(obj)
-    if action is None:
+    if len(get_keyframe_index(obj).frames_in_range(from_frame,
+                                                   to_frame)) == 0:
         return
-
-    locrot_dict = get_locrot_dict()
-    for name in locrot_dict.keys():
-        fcurve = get_action_fcurve(action, locrot_dict[name]['data_path'],
-                                    index=locrot_dict[name]['index'])
-        if fcurve is None:
+    for fcurve in get_locrot_fcurves(get_object_action(obj)):
+        frames = get_fcurve_co(fcurve)[:, 0]
+        if not np.all(frames[1:] >= frames[:-1]):
+            cleanup_keys_in_interval(fcurve, from_frame, to_frame)
+            continue
+        start = int(np.searchsorted(frames, from_frame))
+        end = int(np.searchsorted(frames, to_frame, side='right'))
+        if end - start > _max_single_point_removals:
+            cleanup_keys_in_interval(fcurve, from_frame, to_frame)
             continue
-        points = [p for p in fcurve.keyframe_points
-                  if from_frame <= p.co[0] <= to_frame]
-        for p in reversed(points):
-            fcurve.keyframe_points.remove(p)
+        points = fcurve.keyframe_points
+        for i in reversed(range(start, end)):
+            points.remove(points[i], fast=True)
+        if end > start:
+            fcurve.update()
+    invalidate_keyframe_indices()
 
 
 def get_object_keyframe_numbers(obj: Object, *, loc: bool = True,
                                 rot: bool = True) -> List[int]:
-    if not obj:
-        return []
-    action: Action = get_object_action(obj)
-    if action is None:
-        return []
-
-    if loc and rot:
-        fcurve_dict = get_locrot_dict()
-    elif loc:
-        fcurve_dict = get_loc_dict()
-    elif rot:
-        fcurve_dict = get_rot_dict()
-    else:
-        assert False, 'Improper flag usage'
-
-    fcurves: Dict = {name: get_safe_action_fcurve(action,
-                                                  fcurve_dict[name]['data_path'],
-                                                  index=fcurve_dict[name]['index'])
-                     for name in fcurve_dict.keys()}
-
-    keys_set: Set = set()
-    for name in fcurves.keys():
-        points: Set = {int(p.co[0]) for p in fcurves[name].keyframe_points}
-        keys_set = keys_set.union(points)
-
-    return sorted(keys_set)
+    return get_keyframe_index(obj, loc=loc, rot=rot).frame_list()
 
 
 def get_world_matrices_in_frames(obj: Object,
@@ -19,6 +19,8 @@
 import os
 from typing import Any, List, Optional, Tuple, Dict
 
+import numpy as np
+
 from bpy.types import Object, Action, FCurve
 
 from .kt_logging import KTLogger
@@ -37,6 +39,7 @@ from ..utils.coords import (xy_to_xz_rotation_matrix_3x3,
 from ..utils.manipulate import deselect_all
 from ..blender_independent_packages.pykeentools_loader import module as pkt_module
 from .fcurve_operations import (cleanup_keys_in_interval,
+                                replace_keys_in_interval,
                                 snap_keys_in_interval,
                                 put_anim_data_in_fcurve,
                                 add_zero_keys_at_start_and_end,
@@ -265,14 +268,15 @@ def load_csv_animation_to_blendshapes(obj: Object, filepath: str) -> Dict:
     for name in facs_names:
         blendshape_fcurve = get_safe_action_fcurve(
             blendshape_action, 'key_blocks["{}"].value'.format(name), index=0)
-        cleanup_keys_in_interval(blendshape_fcurve,
-                                 start_keyframe, end_keyframe)
         if name in read_facs:
-            anim_data_list = [x for x in zip(keyframes, fan.at_name(name))]
-            put_anim_data_in_fcurve(blendshape_fcurve, anim_data_list)
+            replace_keys_in_interval(
+                blendshape_fcurve, start_keyframe, end_keyframe,
+                np.column_stack((keyframes, fan.at_name(name))))
             snap_keys_in_interval(blendshape_fcurve,
                                   start_keyframe, end_keyframe)
         else:
+            cleanup_keys_in_interval(blendshape_fcurve,
+                                     start_keyframe, end_keyframe)
             add_zero_keys_at_start_and_end(blendshape_fcurve,
                                            start_keyframe, end_keyframe)
     obj.data.update()
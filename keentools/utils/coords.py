@@ -224,6 +224,65 @@ def region_to_image_space(x: float, y: float, x1: float, y1: float,
            (y - (y1 + y2) * 0.5) / sc - 2 * asp * shift_y
 
 
+def frame_to_image_space_arr(points: Any, frame_w: float, frame_h: float,
+                             shift_x: float = 0.0,
+                             shift_y: float = 0.0) -> Any:
+    """ Array version of frame_to_image_space for (N, 2+) points """
+    pts = np.asarray(points, dtype=np.float32)
+    res = np.empty((len(pts), 2), dtype=np.float32)
+    if len(pts) == 0:
+        return res
+    res[:, 0], res[:, 1] = frame_to_image_space(pts[:, 0], pts[:, 1],
+                                                frame_w, frame_h,
+                                                shift_x, shift_y)
+    return res
+
+
+def image_space_to_region_arr(points: Any, x1: float, y1: float,
+                              x2: float, y2: float, shift_x: float = 0.0,
+                              shift_y: float = 0.0) -> Any:
+    """ Array version of image_space_to_region for (N, 2+) points """
+    pts = np.asarray(points, dtype=np.float32)
+    res = np.empty((len(pts), 2), dtype=np.float32)
+    if len(pts) == 0:
+        return res
+    res[:, 0], res[:, 1] = image_space_to_region(pts[:, 0], pts[:, 1],
+                                                 x1, y1, x2, y2,
+                                                 shift_x, shift_y)
+    return res
+
+
+def pins_barycentric_arrays(gt: Any, keyframe: int) -> Tuple[Any, Any]:
+    """ Surface points of all pins as index and weight arrays (N, 3).
+        Pins without a proper surface point get index -1 """
+    pins_count = gt.pins_count()
+    indices = np.full((pins_count, 3), -1, dtype=np.int32)
+    weights = np.zeros((pins_count, 3), dtype=np.float32)
+    for i in range(pins_count):
+        pin = gt.pin(keyframe, i)
+        if pin is None:
+            continue
+        sp = pin.surface_point
+        gp = sp.geo_point_idxs
+        if len(gp) < 3:
+            continue
+        indices[i] = gp[:3]
+        weights[i] = sp.barycentric_coordinates[:3]
+    return indices, weights
+
+
+def barycentric_points(verts: Any, indices: Any, weights: Any) -> Any:
+    """ Batched barycentric evaluation: sum(verts[indices] * weights).
+        Rows with out of range indices give zero points """
+    res = np.zeros((len(indices), 3), dtype=np.float32)
+    if len(indices) == 0 or len(verts) == 0:
+        return res
+    valid = np.all((indices >= 0) & (indices < len(verts)), axis=1)
+    res[valid] = np.einsum('ij,ijk->ik', weights[valid],
+                           verts[indices[valid]])
+    return res
+
+
 def pin_to_xyz_from_mesh(
         pin: Any, obj: Object) -> Optional[Tuple[float, float, float]]:
     """ Surface point from barycentric to XYZ using passed mesh"""
@@ -534,6 +593,22 @@ def calc_bpy_model_mat_relative_to_camera(geom_matrix_world: Matrix,
     return Matrix(np_mw)
 
 
+def calc_model_mat_from_matrices(camera_matrix_world: Matrix,
+                                 geom_matrix_world: Matrix) -> Any:
+    rot_mat = xz_to_xy_rotation_matrix_4x4()
+    t, r, _ = camera_matrix_world.decompose()
+    cam_mat = LocRotScale(t, r, (1, 1, 1))
+
+    geom_scale_vec = get_scale_vec_4_from_matrix_world(geom_matrix_world)
+    if not geom_scale_vec.all():
+        return np.eye(4)
+    geom_scale_inv = np.diag(1.0 / geom_scale_vec)
+    geom_mat = np.array(geom_matrix_world, dtype=np.float32) @ geom_scale_inv
+
+    return np.array(cam_mat.inverted_safe(),
+                    dtype=np.float32) @ geom_mat @ rot_mat
+
+
 def camera_projection(camobj: Object, frame: Optional[int]=None,
                       image_width: Optional[int]=None,
                       image_height: Optional[int]=None) -> Any:
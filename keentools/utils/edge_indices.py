@@ -0,0 +1,35 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+import numpy as np
+from typing import Any, Tuple
+
+
+def edge_indices_and_uvs_from_corners(face_sizes: Any, corner_points: Any,
+                                      corner_uvs: Any) -> Tuple[Any, Any]:
+    ''' Edges from every face corner to the next one, the last corner
+        of a face is connected to its first corner
+        :return: (edges, 2) point indices and (edges * 2, 2) UVs
+    '''
+    face_starts = np.cumsum(face_sizes) - face_sizes
+    next_corners = np.arange(1, len(corner_points) + 1, dtype=np.int32)
+    next_corners[face_starts + face_sizes - 1] = face_starts
+    indices = np.stack((corner_points, corner_points[next_corners]), axis=1)
+    tex_uvs = np.stack((corner_uvs, corner_uvs[next_corners]), axis=1)
+    return (indices.astype(np.int32, copy=False),
+            tex_uvs.reshape((-1, 2)).astype(np.float32, copy=False))
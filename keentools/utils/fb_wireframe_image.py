@@ -16,12 +16,17 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # ##### END GPL LICENSE BLOCK #####
 
+import os
+import tempfile
+from collections import OrderedDict
 from typing import Any, Tuple, List, Dict, Optional, Set
+
 import numpy as np
 
 from .kt_logging import KTLogger
 from ..facebuilder_config import FBConfig
 from .bpy_common import bpy_new_image
+from .edge_indices import edge_indices_and_uvs_from_corners
 from .images import (check_bpy_image_has_same_size,
                      find_bpy_image_by_name,
                      remove_bpy_image,
@@ -32,7 +37,6 @@ from ..facebuilder.utils.manipulate import check_facs_available
 
 _log = KTLogger(__name__)
 _shadow_fb: Optional[Any] = None
-_cached_edge_indices_dict: Dict = dict()
 
 
 def _FBCameraInput_class() -> Any:
@@ -208,15 +212,111 @@ def empty_edge_indices_and_uvs() -> Tuple[Any, Any]:
             np.zeros(shape=(max_vert_count, 2), dtype=np.float32))
 
 
-def get_cache_key(vert_count: int, poly_count: int, masks: List) -> int:
-    mask_value = masks_to_number(masks)
-    cache_key = mask_value * 10000000000 + vert_count * 100000 + poly_count
+def get_cache_key(lod: int, vert_count: int, poly_count: int,
+                  masks: List) -> Tuple[int, int, int, int]:
+    cache_key = (lod, masks_to_number(masks), vert_count, poly_count)
     _log.green(f'get_cache_key: {cache_key}')
     return cache_key
 
 
+class _EdgeIndicesCache:
+    ''' LRU cache of edge indices and UVs stored on disk, so they are not
+        calculated again in the next Blender session. Mask configs
+        found for FaceTracker meshes are kept in the same file.
+    '''
+    def __init__(self, max_items: int):
+        self.max_items: int = max_items
+        self._items: OrderedDict = OrderedDict()
+        self._configs: Dict[Tuple[int, int], Tuple[int, Tuple]] = dict()
+        self._loaded: bool = False
+
+    @staticmethod
+    def filepath() -> str:
+        ver = pkt_module().version
+        return os.path.join(tempfile.gettempdir(),
+                            FBConfig.edge_cache_folder_name,
+                            f'fb_edges_{ver.major}_{ver.minor}_{ver.patch}.npz')
+
+    def _load(self) -> None:
+        self._loaded = True
+        filepath = self.filepath()
+        if not os.path.exists(filepath):
+            return
+        try:
+            with np.load(filepath, allow_pickle=False) as data:
+                for name in data.files:
+                    kind, *values = name.split('_')
+                    values = tuple(int(x) for x in values)
+                    if kind == 'indices':
+                        self._items[values] = (data[name],
+                                               data[f'uvs_{name[8:]}'])
+                    elif kind == 'config':
+                        config = data[name].tolist()
+                        self._configs[values] = (config[0],
+                                                 tuple(bool(x) for x in config[1:]))
+        except Exception as err:
+            _log.error(f'_EdgeIndicesCache._load Exception:\n{str(err)}')
+            self._items = OrderedDict()
+            self._configs = dict()
+            return
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        _log.output(f'_EdgeIndicesCache loaded: {len(self._items)} items '
+                    f'from {filepath}')
+
+    def _save(self) -> None:
+        arrays = dict()
+        for key, (indices, tex_uvs) in self._items.items():
+            name = '_'.join(str(x) for x in key)
+            arrays[f'indices_{name}'] = indices
+            arrays[f'uvs_{name}'] = tex_uvs
+        for counts, (lod, masks) in self._configs.items():
+            arrays[f'config_{counts[0]}_{counts[1]}'] = \
+                np.array((lod, *masks), dtype=np.int32)
+        filepath = self.filepath()
+        temp_path = filepath + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            with open(temp_path, 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(temp_path, filepath)
+        except Exception as err:
+            _log.error(f'_EdgeIndicesCache._save Exception:\n{str(err)}')
+
+    def get(self, key: Tuple) -> Optional[Tuple[Any, Any]]:
+        if not self._loaded:
+            self._load()
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: Tuple, value: Tuple[Any, Any]) -> None:
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        self._save()
+
+    def get_config(self, vert_count: int,
+                   poly_count: int) -> Optional[Tuple[int, Tuple]]:
+        if not self._loaded:
+            self._load()
+        return self._configs.get((vert_count, poly_count))
+
+    def put_config(self, vert_count: int, poly_count: int,
+                   lod: int, masks: List) -> None:
+        config = (lod, tuple(bool(x) for x in masks))
+        if self._configs.get((vert_count, poly_count)) != config:
+            self._configs[(vert_count, poly_count)] = config
+            self._save()
+
+
+_edge_indices_cache: _EdgeIndicesCache = \
+    _EdgeIndicesCache(FBConfig.edge_cache_size)
+
+
 def get_fb_edge_indices_and_uvs(*, fb: Any) -> Tuple[Any, Any]:
-    global _cached_edge_indices_dict
     _log.blue('get_fb_edge_indices_and_uvs start >>>')
 
     if not fb.face_texture_available():
@@ -228,12 +328,14 @@ def get_fb_edge_indices_and_uvs(*, fb: Any) -> Tuple[Any, Any]:
     vert_count = me.points_count()
     poly_count = me.faces_count()
 
-    cache_key = get_cache_key(vert_count, poly_count, fb.masks())
+    cache_key = get_cache_key(fb.selected_model(), vert_count, poly_count,
+                              fb.masks())
 
-    if cache_key in _cached_edge_indices_dict:
+    cached = _edge_indices_cache.get(cache_key)
+    if cached is not None:
         _log.green(f'get_fb_edge_indices_and_uvs: '
-                   f'cached data is used [{cache_key}] >>>')
-        return _cached_edge_indices_dict[cache_key]
+                   f'cached data is used {cache_key} >>>')
+        return cached
 
     if not check_facs_available(vert_count):
         _log.error(f'get_fb_edge_indices_and_uvs: '
@@ -243,15 +345,29 @@ def get_fb_edge_indices_and_uvs(*, fb: Any) -> Tuple[Any, Any]:
     _log.magenta('get_fb_edge_indices_and_uvs: calculate new indices')
     indices, tex_uvs = calc_fb_edge_indices_and_uvs(fb)
 
-    _log.output(f'get_fb_edge_indices_and_uvs: put in cache [{cache_key}] >>>'
+    _log.output(f'get_fb_edge_indices_and_uvs: put in cache {cache_key} >>>'
                 f'\nedge_indices: {indices.shape}'
                 f'\nedge_uvs: {tex_uvs.shape}')
-    _cached_edge_indices_dict[cache_key] = (indices, tex_uvs)
+    _edge_indices_cache.put(cache_key, (indices, tex_uvs))
     return indices, tex_uvs
 
 
+def _apply_cached_mask_config(fb: Any, vert_count: int,
+                              poly_count: int) -> bool:
+    config = _edge_indices_cache.get_config(vert_count, poly_count)
+    if config is None:
+        return False
+    lod, masks = config
+    if lod >= len(fb.models_list()) or len(masks) != len(fb.masks()):
+        return False
+    fb.select_model(lod)
+    for i, m in enumerate(masks):
+        fb.set_mask(i, m)
+    _log.output(f'_apply_cached_mask_config: {lod} {masks}')
+    return True
+
+
 def get_ft_edge_indices_and_uvs(*, geo_mesh: Any) -> Tuple[Any, Any]:
-    global _cached_edge_indices_dict
     _log.blue('get_ft_edge_indices_and_uvs start >>>')
     fb = get_shadow_fb()
 
@@ -265,6 +381,11 @@ def get_ft_edge_indices_and_uvs(*, geo_mesh: Any) -> Tuple[Any, Any]:
     _log.green(f'mesh points: {geo_vertex_count} polygons: {geo_poly_count}')
 
     me = get_fb_mesh_for_texturing(fb)
+    if (geo_vertex_count != me.points_count() or
+            geo_poly_count != me.faces_count()) and \
+            _apply_cached_mask_config(fb, geo_vertex_count, geo_poly_count):
+        me = get_fb_mesh_for_texturing(fb)
+
     if geo_vertex_count != me.points_count():
         if not change_fb_lod(fb, geo_vertex_count):
             _log.error('get_ft_edge_indices_and_uvs: '
@@ -281,12 +402,16 @@ def get_ft_edge_indices_and_uvs(*, geo_mesh: Any) -> Tuple[Any, Any]:
                        'cannot find proper mask config >>>')
             return empty_edge_indices_and_uvs()
 
-    cache_key = get_cache_key(geo_vertex_count, geo_poly_count, fb.masks())
+    _edge_indices_cache.put_config(geo_vertex_count, geo_poly_count,
+                                   fb.selected_model(), fb.masks())
+    cache_key = get_cache_key(fb.selected_model(), geo_vertex_count,
+                              geo_poly_count, fb.masks())
 
-    if cache_key in _cached_edge_indices_dict:
+    cached = _edge_indices_cache.get(cache_key)
+    if cached is not None:
         _log.green(f'get_ft_edge_indices_and_uvs: '
-                   f'cached data is used [{cache_key}] >>>')
-        return _cached_edge_indices_dict[cache_key]
+                   f'cached data is used {cache_key} >>>')
+        return cached
 
     if not check_facs_available(geo_vertex_count):
         _log.error(f'get_ft_edge_indices_and_uvs: '
@@ -296,10 +421,10 @@ def get_ft_edge_indices_and_uvs(*, geo_mesh: Any) -> Tuple[Any, Any]:
     _log.magenta('get_ft_edge_indices_and_uvs: calculate new indices')
     indices, tex_uvs = calc_fb_edge_indices_and_uvs(fb)
 
-    _log.output(f'get_ft_edge_indices_and_uvs: put in cache [{cache_key}] >>>'
+    _log.output(f'get_ft_edge_indices_and_uvs: put in cache {cache_key} >>>'
                 f'\nedge_indices: {indices.shape}'
                 f'\nedge_uvs: {tex_uvs.shape}')
-    _cached_edge_indices_dict[cache_key] = (indices, tex_uvs)
+    _edge_indices_cache.put(cache_key, (indices, tex_uvs))
     return indices, tex_uvs
 
 
@@ -308,25 +433,20 @@ def calc_fb_edge_indices_and_uvs(fb: Any) -> Tuple[Any, Any]:
     geo = fb.applied_args_replaced_uvs_model()
     me = geo.mesh(0)
 
-    face_counts = [me.face_size(x) for x in range(me.faces_count())]
-    sum_face_counts = sum(face_counts)
-    indices = np.empty((sum_face_counts, 2), dtype=np.int32)
-    tex_uvs = np.empty((sum_face_counts * 2, 2), dtype=np.float32)
-
-    i = 0
-    for face, count in enumerate(face_counts):
-        for k in range(0, count - 1):
-            tex_uvs[i * 2] = me.uv(face, k)
-            tex_uvs[i * 2 + 1] = me.uv(face, k + 1)
-            indices[i] = (me.face_point(face, k),
-                          me.face_point(face, k + 1))
-            i += 1
-
-        tex_uvs[i * 2] = me.uv(face, count - 1)
-        tex_uvs[i * 2 + 1] = me.uv(face, 0)
-        indices[i] = (me.face_point(face, count - 1),
-                      me.face_point(face, 0))
-        i += 1
-
+    faces_count = me.faces_count()
+    face_sizes = np.fromiter((me.face_size(x) for x in range(faces_count)),
+                             dtype=np.int32, count=faces_count)
+    corners = [(face, k) for face, size in enumerate(face_sizes.tolist())
+               for k in range(size)]
+    face_point = me.face_point
+    corner_points = np.fromiter((face_point(face, k) for face, k in corners),
+                                dtype=np.int32, count=len(corners))
+    uv = me.uv
+    corner_uvs = np.fromiter((x for face, k in corners for x in uv(face, k)),
+                             dtype=np.float32,
+                             count=len(corners) * 2).reshape((-1, 2))
+
+    indices, tex_uvs = edge_indices_and_uvs_from_corners(
+        face_sizes, corner_points, corner_uvs)
     _log.output('calc_fb_edge_indices_and_uvs end >>>')
     return indices, tex_uvs
@@ -17,14 +17,33 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import math
-from typing import Optional, List, Tuple
+from typing import Optional, Tuple, Any, Dict
 
+import numpy as np
 from bpy.types import Action, FCurve
-from mathutils import Vector, Matrix
 
 from ..utils.version import BVersion
 
 
+# Values of the Keyframe.interpolation enum items used by foreach_set
+_interpolation_codes: Dict[str, int] = {'CONSTANT': 0, 'LINEAR': 1,
+                                        'BEZIER': 2}
+# Keyframe properties kept when points are rewritten: (name, size, dtype)
+_keyframe_properties: Tuple = (
+    ('co', 2, np.float32),
+    ('handle_left', 2, np.float32),
+    ('handle_right', 2, np.float32),
+    ('handle_left_type', 1, np.int32),
+    ('handle_right_type', 1, np.int32),
+    ('interpolation', 1, np.int32),
+    ('easing', 1, np.int32),
+    ('type', 1, np.int32),
+    ('amplitude', 1, np.float32),
+    ('back', 1, np.float32),
+    ('period', 1, np.float32),
+)
+
+
 def get_action_fcurve(action: Action, data_path: str, index: int = 0) -> Optional[FCurve]:
     return action.fcurves.find(data_path, index=index)
 
@@ -36,10 +55,48 @@ def get_safe_action_fcurve(action: Action, data_path: str, index: int = 0) -> FC
     return fcurve
 
 
-def get_fcurve_data(fcurve: Optional[FCurve]) -> List[Vector]:
+def get_fcurve_co(fcurve: FCurve) -> Any:
+    ''' :return: float32 array of keyframe point coordinates, shape (N, 2) '''
+    points = fcurve.keyframe_points
+    co = np.empty((len(points), 2), dtype=np.float32)
+    points.foreach_get('co', co.ravel())
+    return co
+
+
+def get_fcurve_data(fcurve: Optional[FCurve]) -> Any:
     if not fcurve:
-        return []
-    return [p.co for p in fcurve.keyframe_points]
+        return np.empty((0, 2), dtype=np.float32)
+    return get_fcurve_co(fcurve)
+
+
+def _anim_data_array(anim_data: Any) -> Any:
+    return np.asarray(anim_data, dtype=np.float32).reshape((-1, 2))
+
+
+def _read_keyframe_points(fcurve: FCurve) -> Dict[str, Any]:
+    points = fcurve.keyframe_points
+    count = len(points)
+    data = {}
+    for name, size, dtype in _keyframe_properties:
+        arr = np.empty((count, size) if size > 1 else (count,), dtype=dtype)
+        points.foreach_get(name, arr.ravel())
+        data[name] = arr
+    return data
+
+
+def _write_keyframe_points(fcurve: FCurve, data: Dict[str, Any]) -> None:
+    ''' Replace all fcurve points with the point data arrays '''
+    clear_fcurve(fcurve)
+    points = fcurve.keyframe_points
+    count = len(data['co'])
+    if count == 0:
+        fcurve.update()
+        return
+    points.add(count)
+    for name, _, _ in _keyframe_properties:
+        if name in data:
+            points.foreach_set(name, data[name].ravel())
+    fcurve.update()
 
 
 def clear_fcurve_new(fcurve: FCurve) -> None:
@@ -55,35 +112,76 @@ def clear_fcurve_old(fcurve: FCurve) -> None:
 clear_fcurve = clear_fcurve_new if BVersion.fcurve_has_clear else clear_fcurve_old
 
 
-def put_anim_data_in_fcurve(fcurve: Optional[FCurve],
-                            anim_data: List[Vector]) -> None:
+def put_anim_data_in_fcurve(fcurve: Optional[FCurve], anim_data: Any,
+                            interpolation: Optional[str] = None) -> None:
+    ''' Add points to fcurve at once
+        :param anim_data: (frame, value) pairs or array of shape (N, 2)
+        :param interpolation: interpolation of the added points,
+                              Blender default when None
+    '''
     if not fcurve:
         return
-    start_index = len(fcurve.keyframe_points)
-    fcurve.keyframe_points.add(len(anim_data))
-    for i, point in enumerate(anim_data):
-        fcurve.keyframe_points[start_index + i].co = point
+    new_co = _anim_data_array(anim_data)
+    if len(new_co) == 0:
+        return
+    points = fcurve.keyframe_points
+    co = np.concatenate((get_fcurve_co(fcurve), new_co))
+    start_index = len(points)
+    points.add(len(new_co))
+    points.foreach_set('co', co.ravel())
+    if interpolation is not None:
+        codes = np.empty((len(co),), dtype=np.int32)
+        points.foreach_get('interpolation', codes)
+        codes[start_index:] = _interpolation_codes[interpolation]
+        points.foreach_set('interpolation', codes)
     fcurve.update()
 
 
+def _interval_mask(frames: Any, start_keyframe: float,
+                   end_keyframe: float) -> Any:
+    return (frames >= start_keyframe) & (frames <= end_keyframe)
+
+
+def replace_keys_in_interval(fcurve: FCurve, start_keyframe: float,
+                             end_keyframe: float, anim_data: Any,
+                             interpolation: Optional[str] = None) -> None:
+    ''' Points in [start_keyframe, end_keyframe] are replaced by anim_data,
+        the other points keep all their properties '''
+    new_co = _anim_data_array(anim_data)
+    data = _read_keyframe_points(fcurve)
+    keep = ~_interval_mask(data['co'][:, 0], start_keyframe, end_keyframe)
+    if keep.all():
+        put_anim_data_in_fcurve(fcurve, new_co, interpolation)
+        return
+    kept = {name: arr[keep] for name, arr in data.items()}
+    _write_keyframe_points(fcurve, kept)
+    put_anim_data_in_fcurve(fcurve, new_co, interpolation)
+
+
 def cleanup_keys_in_interval(fcurve: FCurve, start_keyframe: float,
                              end_keyframe: float) -> None:
-    for p in reversed(fcurve.keyframe_points):
-        if start_keyframe <= p.co[0] <= end_keyframe:
-            fcurve.keyframe_points.remove(p)
-    fcurve.update()
+    replace_keys_in_interval(fcurve, start_keyframe, end_keyframe, [])
 
 
 def snap_keys_in_interval(fcurve: FCurve, start_keyframe: float,
                           end_keyframe: float) -> None:
     left = min(start_keyframe, round(start_keyframe))
     right = max(end_keyframe, round(end_keyframe))
-    points = list(set([round(p.co[0]) for p in fcurve.keyframe_points
-                       if start_keyframe <= p.co[0] <= end_keyframe]))
-    points.sort()
-    anim_data_list = [(x, fcurve.evaluate(x)) for x in points]
-    cleanup_keys_in_interval(fcurve, left, right)
-    put_anim_data_in_fcurve(fcurve, anim_data_list)
+    co = get_fcurve_co(fcurve)
+    in_interval = co[_interval_mask(co[:, 0], start_keyframe, end_keyframe)]
+    frames = np.round(in_interval[:, 0])
+    points = np.unique(frames)
+    if len(points) == len(frames) and np.array_equal(frames, in_interval[:, 0]):
+        if _interval_mask(co[:, 0], left, right).sum() == len(frames):
+            return  # All the points are on whole frames already
+
+    # fcurve is evaluated only where a point is not on a whole frame
+    values = np.empty_like(points)
+    exact = {x: y for x, y in in_interval.tolist() if x == round(x)}
+    for i, x in enumerate(points.tolist()):
+        values[i] = exact[x] if x in exact else fcurve.evaluate(x)
+    replace_keys_in_interval(fcurve, left, right,
+                             np.stack((points, values), axis=1))
 
 
 def add_zero_keys_at_start_and_end(fcurve: FCurve, start_keyframe: float,
@@ -0,0 +1,643 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .kt_logging import KTLogger
+
+
+_log = KTLogger(__name__)
+
+
+try:
+    import OpenImageIO as _oiio  # Bundled with recent Blender versions
+except ImportError:
+    _oiio = None
+
+
+# Only 8-bit files in this color space have the same pixel values
+# as Blender gives, other files are linearized by Blender on loading
+_default_colorspace: str = 'sRGB'
+
+
+def threaded_decoding_available() -> bool:
+    return _oiio is not None
+
+
+def _open_image_input(path: str) -> Any:
+    ''' Alpha is kept unassociated as Blender has it for byte images '''
+    config = _oiio.ImageSpec()
+    config.attribute('oiio:UnassociatedAlpha', 1)
+    return _oiio.ImageInput.open(path, config)
+
+
+def decode_byte_image(filepath: str, width: int,
+                      height: int) -> Optional[Any]:
+    ''' Thread-safe reading of an 8-bit image file without alpha.
+        The pixels are the same as Blender gives for it.
+        :return: float32 RGBA array (h, w, 4) with Blender's
+                 bottom-up row order or None for other files
+    '''
+    if _oiio is None or not os.path.exists(filepath):
+        return None
+    inp = _open_image_input(filepath)
+    if not inp:
+        _log.error(f'decode_byte_image cannot open: {filepath}\n'
+                   f'{_oiio.geterror()}')
+        return None
+    try:
+        spec = inp.spec()
+        file_channels = spec.nchannels
+        if spec.format.basetype != _oiio.UINT8 or file_channels not in (1, 3) \
+                or (spec.width, spec.height) != (width, height):
+            return None
+        np_img = inp.read_image(0, 0, 0, file_channels, 'float')
+    except Exception as err:
+        _log.error(f'decode_byte_image Exception:\n{str(err)}')
+        return None
+    finally:
+        inp.close()
+
+    if np_img is None:
+        return None
+    np_img = np_img.reshape((height, width, file_channels))
+    res = np.ones((height, width, 4), dtype=np.float32)
+    res[:, :, :3] = np_img[::-1]
+    return res
+
+
+def _sequence_file_number(filepath: str) -> Tuple[int, int]:
+    ''' :return: first file number and its zero-padded width '''
+    name, _ = os.path.splitext(os.path.basename(filepath))
+    res = re.search(r'(\d+)$', name)
+    if not res:
+        return -1, 0
+    return int(res[1]), len(res[1])
+
+
+_movie_extensions: Tuple = ('.avi', '.mov', '.mp4', '.m4v', '.mkv',
+                            '.mpg', '.mpeg', '.webm', '.mxf', '.ogv',
+                            '.flv', '.dv', '.wmv')
+
+
+def _count_subimages(inp: Any) -> int:
+    count = inp.spec().get_int_attribute('oiio:subimages', 0)
+    if count > 0:
+        return count
+    count = 1
+    while inp.seek_subimage(count, 0):
+        count += 1
+    return count
+
+
+def _count_sequence_files(filepath: str) -> int:
+    first_number, digits = _sequence_file_number(filepath)
+    if first_number < 0:
+        return 1
+    dirname, filename = os.path.split(filepath)
+    name, ext = os.path.splitext(filename)
+    count = 0
+    while True:
+        number = str(first_number + count).zfill(digits)
+        if not os.path.exists(os.path.join(
+                dirname, re.sub(r'\d+$', number, name) + ext)):
+            return count
+        count += 1
+
+
+class FrameSource:
+    ''' Movie clip frames addressed by scene frame number.
+        All Blender data is read in the constructor so decode()
+        can be safely called from any thread.
+    '''
+    def __init__(self, movie_clip: Any):
+        from .bpy_common import bpy_abspath
+
+        width, height = movie_clip.size[:]
+        self._setup(movie_clip.source, bpy_abspath(movie_clip.filepath),
+                    movie_clip.frame_start, movie_clip.frame_duration,
+                    width, height, movie_clip.colorspace_settings.name)
+
+    def _setup(self, source: str, filepath: str, frame_start: int,
+               frame_duration: int, width: int, height: int,
+               colorspace: str = _default_colorspace) -> None:
+        self.source: str = source
+        self.colorspace: str = colorspace
+        self.filepath: str = filepath
+        self.frame_start: int = frame_start
+        self.frame_duration: int = frame_duration
+        self.width: int = width
+        self.height: int = height
+        self._first_number, self._digits = \
+            _sequence_file_number(self.filepath) \
+            if self.source == 'SEQUENCE' else (-1, 0)
+        if self._first_number < 0:
+            self._first_number = 1
+        self._read_pool: Optional[Any] = None
+        # Movie files stay open between frames, one input per thread
+        self._inputs_lock = threading.Lock()
+        self._inputs: Dict[int, Any] = {}
+
+    @classmethod
+    def from_file(cls, filepath: str,
+                  frame_start: int = 1) -> Optional['FrameSource']:
+        ''' Clip without a Blender MovieClip datablock, it is used
+            in worker processes. Movie files are recognized by extension,
+            other files are treated as the first image of a sequence
+            of consecutive numbers like Blender does.
+            :return: None when the file cannot be read
+        '''
+        if _oiio is None or not os.path.exists(filepath):
+            return None
+        inp = _oiio.ImageInput.open(filepath)
+        if not inp:
+            _log.error(f'FrameSource.from_file cannot open: {filepath}\n'
+                       f'{_oiio.geterror()}')
+            return None
+        try:
+            spec = inp.spec()
+            width, height = spec.width, spec.height
+            is_movie = os.path.splitext(filepath)[1].lower() in _movie_extensions
+            duration = _count_subimages(inp) if is_movie else 0
+        finally:
+            inp.close()
+
+        source = 'MOVIE' if is_movie else 'SEQUENCE'
+        if not is_movie:
+            duration = _count_sequence_files(filepath)
+        if duration <= 0 or width <= 0 or height <= 0:
+            return None
+        frame_source = cls.__new__(cls)
+        frame_source._setup(source, os.path.abspath(filepath), frame_start,
+                            duration, width, height)
+        return frame_source
+
+    def frame_bytes(self, channels: int = 3) -> int:
+        return self.width * self.height * channels * 4  # float32
+
+    def has_frame(self, frame: int) -> bool:
+        return self.frame_start <= frame < self.frame_start + self.frame_duration
+
+    def frame_path(self, frame: int) -> Optional[str]:
+        if not self.has_frame(frame):
+            return None
+        if self.source != 'SEQUENCE':
+            return self.filepath
+        dirname, filename = os.path.split(self.filepath)
+        name, ext = os.path.splitext(filename)
+        number = self._first_number + frame - self.frame_start
+        name = re.sub(r'\d+$', str(number).zfill(self._digits), name)
+        return os.path.join(dirname, name + ext)
+
+    def _first_frame_mtime(self) -> int:
+        path = self.frame_path(self.frame_start)
+        try:
+            return os.stat(path).st_mtime_ns if path is not None else 0
+        except OSError:
+            return 0
+
+    def signature(self) -> Tuple:
+        ''' Replaced files of the clip give another signature '''
+        return (self.source, self.filepath, self.frame_start,
+                self.frame_duration, self.width, self.height,
+                self._first_frame_mtime())
+
+    def decodable(self) -> bool:
+        return _oiio is not None and self.colorspace == _default_colorspace
+
+    def decode(self, frame: int, channels: int = 3) -> Optional[Any]:
+        ''' Thread-safe frame reading of 8-bit files in the default
+            color space, other files must be loaded by Blender.
+            :param channels: 3 for RGB or 4 for RGBA,
+                             alpha is 1.0 when the file has no alpha
+            :return: float32 array (h, w, channels) with Blender's
+                     bottom-up row order or None
+        '''
+        if not self.decodable():
+            return None
+        path = self.frame_path(frame)
+        if path is None or not os.path.exists(path):
+            return None
+
+        is_movie = self.source != 'SEQUENCE'
+        inp = self._thread_input(path) if is_movie \
+            else _open_image_input(path)
+        if not inp:
+            _log.error(f'FrameSource.decode cannot open: {path}\n'
+                       f'{_oiio.geterror()}')
+            return None
+        try:
+            subimage = frame - self.frame_start if is_movie else 0
+            if inp.current_subimage() != subimage and \
+                    not inp.seek_subimage(subimage, 0):
+                return None
+            spec = inp.spec()
+            if spec.format.basetype != _oiio.UINT8:
+                return None
+            file_channels = spec.nchannels
+            np_img = inp.read_image(subimage, 0, 0,
+                                    min(file_channels, channels), 'float')
+        except Exception as err:
+            _log.error(f'FrameSource.decode Exception:\n{str(err)}')
+            if is_movie:
+                self.close_thread_input()
+            return None
+        finally:
+            if not is_movie:
+                inp.close()
+
+        if np_img is None or np_img.shape[:2] != (self.height, self.width):
+            return None
+        np_img = np_img.reshape((self.height, self.width, -1))
+        if np_img.shape[2] == channels:
+            return np.ascontiguousarray(np_img[::-1], dtype=np.float32)
+
+        res = np.ones((self.height, self.width, channels), dtype=np.float32)
+        if file_channels < 3:
+            res[:, :, :3] = np_img[::-1, :, :1]
+            if file_channels == 2 and channels == 4:
+                res[:, :, 3] = np_img[::-1, :, 1]
+        else:
+            res[:, :, :3] = np_img[::-1, :, :3]
+        return res
+
+    def _thread_input(self, path: str) -> Any:
+        ''' Movie input of the calling thread, frames following
+            the previous one are read without seeking from a keyframe '''
+        thread_id = threading.get_ident()
+        inp = self._inputs.get(thread_id)
+        if inp is None:
+            inp = _open_image_input(path)
+            if inp:
+                with self._inputs_lock:
+                    self._inputs[thread_id] = inp
+        return inp
+
+    def close_thread_input(self) -> None:
+        ''' Must be called by every thread that decoded movie frames
+            when it is done with them '''
+        with self._inputs_lock:
+            inp = self._inputs.pop(threading.get_ident(), None)
+        if inp:
+            inp.close()
+
+    def close_inputs(self) -> None:
+        ''' Inputs of the calling thread and of finished threads '''
+        alive = {x.ident for x in threading.enumerate()}
+        alive.discard(threading.get_ident())
+        with self._inputs_lock:
+            closing = [inp for thread_id, inp in self._inputs.items()
+                       if thread_id not in alive]
+            self._inputs = {k: v for k, v in self._inputs.items()
+                            if k in alive}
+        for inp in closing:
+            inp.close()
+
+    def load_in_main_thread(self, frame: int) -> Optional[Any]:
+        ''' Image sequence reading without a scene frame change
+            through a temporary Blender image. Main thread only.
+        '''
+        from .bpy_common import bpy_images
+        from .images import (check_bpy_image_size,
+                             np_array_from_bpy_image,
+                             ImageBufferPool)
+
+        if self.source != 'SEQUENCE':
+            return None
+        path = self.frame_path(frame)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            img = bpy_images().load(path, check_existing=False)
+        except Exception as err:
+            _log.error(f'load_in_main_thread Exception:\n{str(err)}')
+            return None
+        np_img = None
+        if self._read_pool is None:
+            self._read_pool = ImageBufferPool(depth=1, max_shapes=1)
+        if check_bpy_image_size(img) and \
+                img.size[0] == self.width and img.size[1] == self.height:
+            np_img = np_array_from_bpy_image(img, pool=self._read_pool,
+                                             channels=3)
+        bpy_images().remove(img)
+        if np_img is None:
+            return None
+        return np.ascontiguousarray(np_img)
+
+
+class FramePrefetcher:
+    ''' Bounded read-ahead queue of decoded frames.
+        Frames are decoded in a worker thread in the given order,
+        no more than depth frames (and memory_limit bytes) are kept
+        ready at the same time.
+    '''
+    def __init__(self, frame_source: FrameSource, frames: List[int], *,
+                 depth: int = 8, memory_limit: int = 1024 * 1024 * 1024):
+        self._source: FrameSource = frame_source
+        self._frames: List[int] = list(frames)
+        frame_bytes = max(1, frame_source.frame_bytes())
+        self._depth: int = max(1, min(depth, memory_limit // frame_bytes))
+
+        self._cond = threading.Condition()
+        self._ready: Dict[int, Any] = {}
+        self._failed: set = set()
+        self._position: int = 0
+        self._generation: int = 0
+        self._decoding: Optional[int] = None
+        self._stopped: bool = False
+        self._thread: Optional[threading.Thread] = None
+
+    def depth(self) -> int:
+        return self._depth
+
+    def start(self) -> bool:
+        if not threaded_decoding_available() or len(self._frames) == 0:
+            return False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        _log.output(f'FramePrefetcher started: depth={self._depth} '
+                    f'frames={len(self._frames)}')
+        return True
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._ready.clear()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self._source.close_inputs()
+
+    def is_working(self) -> bool:
+        return self._thread is not None and not self._stopped
+
+    def _reposition(self, frame: int) -> bool:
+        if frame not in self._frames:
+            return False
+        self._position = self._frames.index(frame)
+        self._generation += 1
+        self._ready = {k: v for k, v in self._ready.items()
+                       if k in self._frames[self._position:]}
+        self._cond.notify_all()
+        return True
+
+    def take(self, frame: int,
+             timeout: float = 0.0) -> Tuple[bool, Optional[Any]]:
+        ''' Request for the frame.
+            :param timeout: seconds to wait while the frame is decoding,
+                            0 returns at once
+            :return: (pending, np_img). pending is True while the frame
+                     is still decoding. np_img None and pending False
+                     mean the frame cannot be prefetched.
+        '''
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                pending, np_img = self._take_locked(frame)
+                remaining = deadline - time.monotonic()
+                if not pending or remaining <= 0:
+                    return pending, np_img
+                self._cond.wait(remaining)
+
+    def _take_locked(self, frame: int) -> Tuple[bool, Optional[Any]]:
+        if not self.is_working() or frame in self._failed:
+            return False, None
+        if frame in self._ready:
+            np_img = self._ready.pop(frame)
+            self._cond.notify_all()
+            return False, np_img
+        if frame == self._decoding:
+            return True, None
+        free = self._depth - len(self._ready)
+        if free > 0 and \
+                frame in self._frames[self._position:self._position + free]:
+            return True, None
+        return self._reposition(frame), None
+
+    def _next_frame(self) -> Tuple[Optional[int], int]:
+        with self._cond:
+            while not self._stopped:
+                if self._position < len(self._frames) and \
+                        len(self._ready) < self._depth:
+                    frame = self._frames[self._position]
+                    self._position += 1
+                    self._decoding = frame
+                    return frame, self._generation
+                self._cond.wait(timeout=0.5)
+            return None, self._generation
+
+    def _run(self) -> None:
+        while True:
+            frame, generation = self._next_frame()
+            if frame is None:
+                break
+            np_img = self._source.decode(frame)
+            with self._cond:
+                self._decoding = None
+                if self._stopped:
+                    break
+                if generation != self._generation:
+                    continue
+                if np_img is None:
+                    _log.red(f'FramePrefetcher cannot decode frame: {frame}')
+                    self._failed.add(frame)
+                else:
+                    self._ready[frame] = np_img
+                self._cond.notify_all()
+        self._source.close_thread_input()
+        _log.output('FramePrefetcher worker is over')
+
+
+class FrameCache:
+    ''' LRU cache of decoded frames with look-ahead decoding.
+        Frames following the requested one in the direction of
+        the previous requests (tracking forward or backward) are decoded
+        in a worker thread, so the next request usually finds its frame
+        ready. Only FrameSource.decode is used, so get() can be called
+        from any thread.
+    '''
+    def __init__(self, frame_source: FrameSource, *, channels: int = 3,
+                 memory_limit: int = 1024 * 1024 * 1024, look_ahead: int = 8):
+        self._source: FrameSource = frame_source
+        self._channels: int = channels
+        frame_bytes = max(1, frame_source.frame_bytes(channels))
+        self._capacity: int = max(1, memory_limit // frame_bytes)
+        self._look_ahead: int = max(0, min(look_ahead, self._capacity - 1))
+
+        self._cond = threading.Condition()
+        self._frames: OrderedDict = OrderedDict()
+        self._failed: set = set()
+        self._queue: List[int] = []
+        self._decoding: Optional[int] = None
+        self._last_frame: Optional[int] = None
+        self._direction: int = 1
+        self._stopped: bool = False
+        self._thread: Optional[threading.Thread] = None
+        self._hits: int = 0
+        self._misses: int = 0
+
+    def frame_source(self) -> FrameSource:
+        return self._source
+
+    def channels(self) -> int:
+        return self._channels
+
+    def _store(self, frame: int, np_img: Any) -> None:
+        self._frames[frame] = np_img
+        self._frames.move_to_end(frame)
+        while len(self._frames) > self._capacity:
+            self._frames.popitem(last=False)
+
+    def _update_direction(self, frame: int) -> None:
+        if self._last_frame is not None and frame != self._last_frame:
+            self._direction = 1 if frame > self._last_frame else -1
+        self._last_frame = frame
+
+    def _schedule(self, frames: List[int]) -> None:
+        self._queue = [x for x in frames if self._source.has_frame(x)
+                       and x not in self._frames and x not in self._failed
+                       and x != self._decoding]
+        if len(self._queue) == 0:
+            return
+        if self._thread is None and not self._stopped:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._cond.notify_all()
+
+    def prefetch(self, frames: List[int]) -> None:
+        ''' Replaces the look-ahead queue by the given frames '''
+        if not threaded_decoding_available():
+            return
+        with self._cond:
+            self._schedule(frames[:self._capacity - 1])
+
+    def get(self, frame: int) -> Optional[Any]:
+        ''' :return: cached array, the caller must not change it '''
+        if not threaded_decoding_available():
+            return None
+        with self._cond:
+            self._update_direction(frame)
+            if self._look_ahead > 0:
+                self._schedule([frame + self._direction * i
+                                for i in range(1, self._look_ahead + 1)])
+            while self._decoding == frame:
+                self._cond.wait(timeout=0.5)
+            if frame in self._failed:
+                return None
+            if frame in self._frames:
+                self._frames.move_to_end(frame)
+                self._hits += 1
+                return self._frames[frame]
+            self._misses += 1
+
+        np_img = self._source.decode(frame, self._channels)
+        with self._cond:
+            if np_img is None:
+                self._failed.add(frame)
+                _log.red(f'FrameCache cannot decode frame: {frame}')
+            else:
+                self._store(frame, np_img)
+        return np_img
+
+    def stats(self) -> Tuple[int, int]:
+        ''' :return: hits and misses of get() '''
+        return self._hits, self._misses
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._queue = []
+            self._frames.clear()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self._source.close_inputs()
+
+    def _next_frame(self) -> Optional[int]:
+        with self._cond:
+            while not self._stopped:
+                if len(self._queue) > 0:
+                    frame = self._queue.pop(0)
+                    self._decoding = frame
+                    return frame
+                self._cond.wait(timeout=0.5)
+            return None
+
+    def _run(self) -> None:
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                break
+            np_img = self._source.decode(frame, self._channels)
+            with self._cond:
+                self._decoding = None
+                if self._stopped:
+                    break
+                if np_img is None:
+                    self._failed.add(frame)
+                elif frame not in self._frames:
+                    self._store(frame, np_img)
+                self._cond.notify_all()
+        self._source.close_thread_input()
+        _log.output('FrameCache worker is over')
+
+
+_frame_caches: Dict[int, FrameCache] = {}
+
+
+def get_frame_cache(movie_clip: Any, channels: int = 3) -> Optional[FrameCache]:
+    ''' Shared cache for the clip. One cache per channel count is kept,
+        it is replaced when another clip (or changed clip) is requested.
+        :return: None when frames cannot be decoded in this environment
+    '''
+    from ..addon_config import Config
+
+    if not movie_clip or not threaded_decoding_available():
+        return None
+    frame_source = FrameSource(movie_clip)
+    if not frame_source.decodable():
+        return None
+    cache = _frame_caches.get(channels)
+    if cache is not None and \
+            cache.frame_source().signature() == frame_source.signature():
+        return cache
+    if cache is not None:
+        cache.stop()
+    cache = FrameCache(frame_source, channels=channels,
+                       memory_limit=Config.frame_cache_memory_limit,
+                       look_ahead=Config.frame_cache_look_ahead)
+    _frame_caches[channels] = cache
+    _log.output(f'new FrameCache: {movie_clip.name} channels={channels}')
+    return cache
+
+
+def clear_frame_caches() -> None:
+    ''' Decoded frames are freed, it is called when tracking is over,
+        on file load and on addon unregister '''
+    for cache in _frame_caches.values():
+        cache.stop()
+    _frame_caches.clear()
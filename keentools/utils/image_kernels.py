@@ -0,0 +1,136 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' Per-pixel image kernels for (H, W, C) float images.
+    Kernels write into the given out arrays and use one float32 scratch
+    plane per thread, so no full-size temporaries are created per call.
+'''
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+_grayscale_weights: Any = np.array([255 * 0.2989, 255 * 0.5870,
+                                    255 * 0.1140, 0.0], dtype=np.float32)
+
+_planes_lock: threading.Lock = threading.Lock()
+_planes: Dict[int, Any] = {}
+
+
+def _scratch_plane(shape: Tuple[int, int]) -> Any:
+    ''' float32 buffer kept for the next calls of the same thread '''
+    thread_id = threading.get_ident()
+    buffer = _planes.get(thread_id)
+    if buffer is None or buffer.shape != shape:
+        buffer = np.empty(shape, dtype=np.float32)
+        with _planes_lock:
+            _planes[thread_id] = buffer
+    return buffer
+
+
+def release_scratch_buffers() -> None:
+    ''' Scratch planes of all threads are freed '''
+    with _planes_lock:
+        _planes.clear()
+
+
+def _uint8_plane(np_img: Any, out: Optional[Any]) -> Any:
+    if out is None:
+        return np.empty(np_img.shape[:2], dtype=np.uint8)
+    assert out.shape == np_img.shape[:2] and out.dtype == np.uint8, \
+        'Wrong out buffer'
+    return out
+
+
+def _greater_to_uint8(values: Any, limit: float, out: Any) -> Any:
+    np.greater(values, limit, out=out.view(np.bool_))
+    out *= np.uint8(255)
+    return out
+
+
+def threshold_channels(np_img: Any, channels: List[bool], threshold: float,
+                       out: Optional[Any] = None) -> Optional[Any]:
+    ''' 255 where the average of the selected channels > threshold, else 0
+        :return: uint8 (H, W) or None when no channels are selected
+    '''
+    selected = [i for i, used in enumerate(channels[:np_img.shape[2]])
+                if used]
+    denom = sum(bool(x) for x in channels)
+    if denom == 0:
+        return None
+    out = _uint8_plane(np_img, out)
+    limit = threshold * denom
+    if len(selected) == 0:
+        out.fill(255 if 0.0 > limit else 0)
+        return out
+    if len(selected) == 1:
+        return _greater_to_uint8(np_img[:, :, selected[0]], limit, out)
+
+    acc = _scratch_plane(np_img.shape[:2])
+    np.add(np_img[:, :, selected[0]], np_img[:, :, selected[1]], out=acc)
+    for i in selected[2:]:
+        np.add(acc, np_img[:, :, i], out=acc)
+    return _greater_to_uint8(acc, limit, out)
+
+
+def threshold_single_channel(np_img: Any, threshold: float,
+                             out: Optional[Any] = None) -> Any:
+    if out is None:
+        out = np.empty(np_img.shape, dtype=np.uint8)
+    return _greater_to_uint8(np_img, threshold, out)
+
+
+def weighted_grayscale(np_img: Any, out: Optional[Any] = None) -> Any:
+    ''' 255 * (0.2989 R + 0.5870 G + 0.1140 B) truncated to uint8 '''
+    out = _uint8_plane(np_img, out)
+    height, width, channels = np_img.shape
+    acc = _scratch_plane((height, width))
+    pixels = np_img.reshape((-1, channels))
+    if pixels.dtype == np.float32 and channels <= 4:
+        np.dot(pixels, _grayscale_weights[:channels], out=acc.reshape(-1))
+    else:
+        np.multiply(np_img[:, :, 0], _grayscale_weights[0], out=acc)
+        for i in (1, 2):
+            acc += np_img[:, :, i] * _grayscale_weights[i]
+    np.copyto(out, acc, casting='unsafe')
+    return out
+
+
+def average_grayscale(np_img: Any, out: Optional[Any] = None) -> Any:
+    ''' 255 * (R + G + B) / 3 truncated to uint8 '''
+    out = _uint8_plane(np_img, out)
+    acc = _scratch_plane(np_img.shape[:2])
+    np.add(np_img[:, :, 0], np_img[:, :, 1], out=acc)
+    np.add(acc, np_img[:, :, 2], out=acc)
+    acc *= np.float32(255.0 / 3.0)
+    np.copyto(out, acc, casting='unsafe')
+    return out
+
+
+def gamma_rgb(np_img: Any, gamma: float, out: Optional[Any] = None) -> Any:
+    ''' RGB channels raised to the gamma power, other channels are copied.
+        out may be np_img itself for the in-place operation.
+    '''
+    if out is None:
+        out = np.empty_like(np_img)
+    if out is not np_img:
+        out[:, :, 3:] = np_img[:, :, 3:]
+    np.power(np_img[:, :, :3], np.float32(gamma), out=out[:, :, :3])
+    return out
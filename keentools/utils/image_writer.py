@@ -0,0 +1,203 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+import os
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .kt_logging import KTLogger
+
+
+_log = KTLogger(__name__)
+
+
+try:
+    import OpenImageIO as _oiio  # Bundled with recent Blender versions
+except ImportError:
+    _oiio = None
+
+
+def threaded_writing_available() -> bool:
+    return _oiio is not None
+
+
+def _srgb_to_linear(np_img: Any) -> Any:
+    ''' Byte Blender images are converted this way when saved as EXR '''
+    res = np_img.copy()
+    rgb = res[:, :, :3]
+    rgb[:] = np.where(rgb <= 0.04045, rgb / 12.92,
+                      np.power((np.clip(rgb, 0.04045, None) + 0.055) / 1.055,
+                               2.4))
+    return res
+
+
+_compression_attributes: Dict[str, Dict[str, List[Tuple]]] = {
+    'NONE': {'PNG': [('png:compressionLevel', 0)],
+             'OPEN_EXR': [('compression', 'none')]},
+    'FAST': {'PNG': [('png:compressionLevel', 1)],
+             'OPEN_EXR': [('compression', 'rle')]},
+    'DEFAULT': {},
+}
+
+
+def write_image_file(filepath: str, np_img: Any, file_format: str = 'PNG',
+                     compression: str = 'DEFAULT',
+                     use_half_precision: bool = True) -> None:
+    ''' Thread-safe image saving.
+        :param np_img: RGBA array (h, w, 4) in Blender's bottom-up row
+                       order, float with 0..1 display values or uint8
+        :param compression: 'DEFAULT', 'FAST' or 'NONE'
+        :param use_half_precision: 16-bit float channels for OPEN_EXR
+        :raise: RuntimeError if the file cannot be written
+    '''
+    if _oiio is None:
+        raise RuntimeError('OpenImageIO is not available')
+
+    if file_format == 'JPEG':
+        np_img = np_img[:, :, :3]
+    h, w, channels = np_img.shape
+    if file_format == 'OPEN_EXR':
+        if np_img.dtype == np.uint8:
+            np_img = np_img.astype(np.float32) / 255
+        pixels = _srgb_to_linear(np_img)[::-1]
+        pixel_type = 'half' if use_half_precision else 'float'
+    elif np_img.dtype == np.uint8:
+        pixels = np_img[::-1]
+        pixel_type = 'uint8'
+    else:
+        pixels = (np.clip(np_img[::-1], 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+        pixel_type = 'uint8'
+
+    dirname = os.path.dirname(filepath)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+
+    out = _oiio.ImageOutput.create(filepath)
+    if not out:
+        raise RuntimeError(f'Cannot create image output: {filepath}\n'
+                           f'{_oiio.geterror()}')
+    try:
+        spec = _oiio.ImageSpec(w, h, channels, pixel_type)
+        for name, value in _compression_attributes.get(
+                compression, {}).get(file_format, []):
+            spec.attribute(name, value)
+        if not out.open(filepath, spec):
+            raise RuntimeError(f'Cannot open for writing: {filepath}\n'
+                               f'{out.geterror()}')
+        if not out.write_image(np.ascontiguousarray(pixels)):
+            raise RuntimeError(f'Cannot write image: {filepath}\n'
+                               f'{out.geterror()}')
+    finally:
+        out.close()
+
+
+def save_image_in_main_thread(filepath: str, np_img: Any,
+                              file_format: str = 'PNG',
+                              use_half_precision: bool = True) -> None:
+    from .images import (create_compatible_bpy_image,
+                         assign_pixels_data,
+                         remove_bpy_image)
+    tex = create_compatible_bpy_image(np_img)
+    try:
+        tex.filepath_raw = filepath
+        tex.file_format = file_format
+        if file_format == 'OPEN_EXR':
+            tex.use_half_precision = use_half_precision
+        if np_img.dtype == np.uint8:
+            np_img = np_img.astype(np.float32) / 255
+        assign_pixels_data(tex.pixels, np_img.ravel())
+        tex.save()
+    finally:
+        remove_bpy_image(tex)
+
+
+class ImageWriterPool:
+    ''' Bounded pool of threads saving images while the next ones
+        are being built. put() blocks when queue_size images are
+        already waiting (back-pressure), the first writing error
+        is raised from put() or finish() in the calling thread.
+        Without OpenImageIO images are saved synchronously.
+    '''
+    def __init__(self, *, max_workers: int = 2, queue_size: int = 4,
+                 compression: str = 'DEFAULT',
+                 use_half_precision: bool = True):
+        self._executor: Optional[ThreadPoolExecutor] = \
+            ThreadPoolExecutor(max_workers=max(1, max_workers),
+                               thread_name_prefix='kt_image_writer') \
+            if threaded_writing_available() else None
+        self._queue_size: int = max(1, queue_size)
+        self._compression: str = compression
+        self._use_half_precision: bool = use_half_precision
+        self._futures: Deque[Tuple[str, Future]] = deque()
+
+    def _pop_done(self) -> None:
+        while len(self._futures) > 0 and self._futures[0][1].done():
+            self._check_result(*self._futures.popleft())
+
+    def _check_result(self, filepath: str, future: Future) -> None:
+        future.result()
+        _log.info(f'IMAGE SAVED: {filepath}')
+
+    def _wait_oldest(self) -> None:
+        filepath, future = self._futures.popleft()
+        self._check_result(filepath, future)
+
+    def poll(self) -> None:
+        ''' Raises the error of an already finished writing if any '''
+        self._pop_done()
+
+    def pending(self) -> int:
+        self._pop_done()
+        return len(self._futures)
+
+    def is_full(self) -> bool:
+        self._pop_done()
+        return len(self._futures) >= self._queue_size
+
+    def put(self, filepath: str, np_img: Any, file_format: str = 'PNG') -> None:
+        ''' np_img must not be changed by the caller after that '''
+        if self._executor is None:
+            save_image_in_main_thread(filepath, np_img, file_format,
+                                      self._use_half_precision)
+            _log.info(f'IMAGE SAVED: {filepath}')
+            return
+        self._pop_done()
+        while len(self._futures) >= self._queue_size:
+            self._wait_oldest()
+        self._futures.append((filepath, self._executor.submit(
+            write_image_file, filepath, np_img, file_format,
+            self._compression, self._use_half_precision)))
+
+    def finish(self) -> None:
+        try:
+            while len(self._futures) > 0:
+                self._wait_oldest()
+        finally:
+            self.cancel()
+
+    def cancel(self) -> None:
+        ''' Queued writes are dropped, running ones finish in background '''
+        for _, future in self._futures:
+            future.cancel()  # cancel_futures of shutdown needs Python 3.9
+        self._futures.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
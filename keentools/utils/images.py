@@ -17,7 +17,7 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import numpy as np
-from typing import Any, Callable, Optional, Tuple, List
+from typing import Any, Callable, Dict, Optional, Tuple, List
 import re
 import os
 
@@ -25,6 +25,11 @@ from bpy.types import Image, Camera, Object, MovieClip
 
 from .version import BVersion
 from .kt_logging import KTLogger
+from .image_kernels import (threshold_channels,
+                            threshold_single_channel,
+                            weighted_grayscale,
+                            average_grayscale,
+                            gamma_rgb)
 from ..addon_config import Config
 from .bpy_common import (bpy_start_frame,
                          bpy_end_frame,
@@ -73,16 +78,85 @@ copy_pixels_data = _copy_pixels_data_new \
     if BVersion.pixels_foreach_methods_exist else _copy_pixels_data_old
 
 
-def np_array_from_bpy_image(bpy_image: Optional[Image]) -> Optional[Any]:
+class ImageBufferPool:
+    ''' Reusable pixel arrays. A buffer is given out again after
+        `depth` more requests of the same shape and dtype, so the caller
+        must not keep it longer (the data is copied by the consumer
+        or replaced by the next frame). '''
+    def __init__(self, depth: int = 2, max_shapes: int = 2):
+        self.depth: int = depth
+        self.max_shapes: int = max_shapes
+        self._buffers: Dict[Tuple, List[Any]] = {}
+        self._positions: Dict[Tuple, int] = {}
+
+    def get(self, shape: Tuple, dtype: Any = np.float32) -> Any:
+        key = (tuple(shape), np.dtype(dtype).str)
+        buffers = self._buffers.pop(key, None)
+        if buffers is None:
+            while len(self._buffers) >= self.max_shapes:
+                old_key = next(iter(self._buffers))
+                del self._buffers[old_key]
+                self._positions.pop(old_key, None)
+            buffers = []
+        self._buffers[key] = buffers  # the last used shape goes to the end
+        pos = self._positions.get(key, 0)
+        if pos >= len(buffers):
+            buffers.append(np.empty(shape, dtype=dtype))
+        self._positions[key] = (pos + 1) % self.depth
+        return buffers[pos]
+
+    def clear(self) -> None:
+        self._buffers = {}
+        self._positions = {}
+
+
+_conversion_pool: ImageBufferPool = ImageBufferPool(depth=1, max_shapes=1)
+
+
+def _convert_pixels(src: Any, dst: Any) -> None:
+    ''' src float32 buffer is used as scratch '''
+    if dst.dtype == np.uint8:
+        np.multiply(src, np.float32(255), out=src)
+        np.clip(src, 0, 255, out=src)
+        np.rint(src, out=src)
+    np.copyto(dst, src, casting='unsafe')
+
+
+def np_array_from_bpy_image(bpy_image: Optional[Image], *,
+                            out: Optional[Any] = None,
+                            pool: Optional[ImageBufferPool] = None,
+                            channels: Optional[int] = None,
+                            dtype: Any = np.float32) -> Optional[Any]:
+    ''' Image pixels as (H, W, C) array
+        :param out: C-contiguous array of shape (H, W, image channels)
+                    to read into, a pool buffer or a new array is used
+                    when it is None
+        :param channels: only the first channels are returned,
+                         as a view without copying
+        :param dtype: float32 pixels are read directly, uint8 (0-255) and
+                      float16 are converted from a pooled float32 buffer
+    '''
     if not bpy_image or not bpy_image.size or not bpy_image.channels:
         return None
     w, h = bpy_image.size[:2]
-    if w > 0 and h > 0:
-        np_img = np.empty((h, w, bpy_image.channels), dtype=np.float32)
-        get_pixels_data(bpy_image.pixels, np_img.ravel())
-    else:
+    if w <= 0 or h <= 0:
         return None
-    return np_img
+    shape = (h, w, bpy_image.channels)
+    if out is None:
+        out = pool.get(shape, dtype) if pool is not None \
+            else np.empty(shape, dtype=dtype)
+    assert out.shape == shape and out.flags.c_contiguous, 'Wrong out buffer'
+
+    if out.dtype == np.float32:
+        get_pixels_data(bpy_image.pixels, out.ravel())
+    else:
+        src = _conversion_pool.get(shape, np.float32)
+        get_pixels_data(bpy_image.pixels, src.ravel())
+        _convert_pixels(src, out)
+
+    if channels is not None and channels < shape[2]:
+        return out[:, :, :channels]
+    return out
 
 
 def load_rgba(camera: Optional[Camera]) -> Optional[Any]:
@@ -95,10 +169,9 @@ def load_rgba(camera: Optional[Camera]) -> Optional[Any]:
     return np.rot90(img, camera.orientation)
 
 
-def gamma_np_image(np_img: Any, gamma: float=1.0) -> Any:
-    res_img = np_img.copy()
-    res_img[:, :, :3] = np.power(np_img[:, :, :3], gamma)
-    return res_img
+def gamma_np_image(np_img: Any, gamma: float=1.0,
+                   out: Optional[Any] = None) -> Any:
+    return gamma_rgb(np_img, gamma, out=out)
 
 
 def get_background_image_object(camobj: Camera, index: int = 0) -> Any:
@@ -285,42 +358,36 @@ def check_bpy_image_has_same_size(image: Optional[Image],
     return w == size[0] and h == size[1]
 
 
-def np_image_to_grayscale(np_img: Any) -> Any:
-    return (255 * 0.2989 * np_img[:, :, 0] +
-            255 * 0.5870 * np_img[:, :, 1] +
-            255 * 0.1140 * np_img[:, :, 2]).astype(np.uint8)
+def np_image_to_grayscale(np_img: Any, out: Optional[Any] = None) -> Any:
+    return weighted_grayscale(np_img, out=out)
 
 
-def np_image_to_average_grayscale(np_img: Any) -> Any:
-    return (255.0 * (np_img[:, :, 0] +
-                     np_img[:, :, 1] +
-                     np_img[:, :, 2]) / 3.0).astype(np.uint8)
+def np_image_to_average_grayscale(np_img: Any,
+                                  out: Optional[Any] = None) -> Any:
+    return average_grayscale(np_img, out=out)
 
 
-def np_threshold_image(np_img: Any, threshold: float=0.0) -> Any:
-    return (255 * ((np_img[:, :, 0] +
-                    np_img[:, :, 1] +
-                    np_img[:, :, 2]) / 3.0 > threshold)).astype(np.uint8)
+def np_threshold_image(np_img: Any, threshold: float=0.0,
+                       out: Optional[Any] = None) -> Any:
+    return threshold_channels(np_img, [True, True, True], threshold, out=out)
 
 
 def np_threshold_image_with_channels(np_img: Any, channels: List[bool],
-                                     threshold: float=0.0) -> Optional[Any]:
-    denom = sum(channels)
-    if denom == 0:
-        return None
-    return (255 * ((channels[0] * np_img[:, :, 0] +
-                    channels[1] * np_img[:, :, 1] +
-                    channels[2] * np_img[:, :, 2] +
-                    channels[3] * np_img[:, :, 3]) / denom > threshold)).astype(np.uint8)
+                                     threshold: float=0.0,
+                                     out: Optional[Any] = None) -> Optional[Any]:
+    return threshold_channels(np_img, channels, threshold, out=out)
 
 
-def np_threshold_single_channel_image(np_img: Any, threshold: float=0.0) -> Any:
-    return (255 * (np_img > threshold)).astype(np.uint8)
+def np_threshold_single_channel_image(np_img: Any, threshold: float=0.0,
+                                      out: Optional[Any] = None) -> Any:
+    return threshold_single_channel(np_img, threshold, out=out)
 
 
-def np_array_from_background_image(camobj: Camera, index: int = 0) -> Optional[Any]:
+def np_array_from_background_image(camobj: Camera, index: int = 0,
+                                   **kwargs) -> Optional[Any]:
+    ''' :param kwargs: np_array_from_bpy_image arguments '''
     img = get_background_image_strict(camobj, index)
-    return np_array_from_bpy_image(img)
+    return np_array_from_bpy_image(img, **kwargs)
 
 
 def reset_tone_mapping(cam_image: Optional[Image]) -> None:
@@ -0,0 +1,113 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' Sorted keyframe numbers of object location/rotation fcurves.
+    An index is kept between calls and rebuilt when the object action,
+    its fcurves or their point counts change, or after
+    invalidate_keyframe_indices() which is called on Action updates
+    in the depsgraph, undo/redo and file loading.
+'''
+
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from bpy.types import Object, Action
+from bpy.app.handlers import persistent
+
+from .kt_logging import KTLogger
+from .fcurve_operations import get_action_fcurve, get_fcurve_co
+from .sorted_frames import KeyframeIndex
+
+
+_log = KTLogger(__name__)
+
+
+_loc_paths: Tuple = (('location', 0), ('location', 1), ('location', 2))
+_rot_paths: Tuple = (('rotation_euler', 0), ('rotation_euler', 1),
+                     ('rotation_euler', 2))
+
+
+_generation: int = 0
+_indices: Dict[Tuple[int, bool, bool], Tuple[Tuple, KeyframeIndex]] = {}
+
+
+def invalidate_keyframe_indices() -> None:
+    global _generation
+    _generation += 1
+
+
+def clear_keyframe_indices() -> None:
+    invalidate_keyframe_indices()
+    _indices.clear()
+
+
+def _get_object_action(obj: Object) -> Optional[Action]:
+    anim_data = obj.animation_data
+    return anim_data.action if anim_data else None
+
+
+def get_locrot_fcurves(action: Action, *, loc: bool = True,
+                       rot: bool = True) -> List[Any]:
+    ''' :return: existing location/rotation fcurves of the action '''
+    paths = (_loc_paths if loc else ()) + (_rot_paths if rot else ())
+    fcurves = [get_action_fcurve(action, data_path, index=index)
+               for data_path, index in paths]
+    return [x for x in fcurves if x]
+
+
+def _build_frames(fcurves: List[Any]) -> Any:
+    if len(fcurves) == 0:
+        return np.empty((0,), dtype=np.int32)
+    frames = np.concatenate([get_fcurve_co(x)[:, 0] for x in fcurves])
+    return np.unique(frames.astype(np.int32))
+
+
+def get_keyframe_index(obj: Optional[Object], *, loc: bool = True,
+                       rot: bool = True) -> KeyframeIndex:
+    assert loc or rot, 'Improper flag usage'
+    if not obj:
+        return KeyframeIndex()
+    action = _get_object_action(obj)
+    if action is None:
+        return KeyframeIndex()
+
+    fcurves = get_locrot_fcurves(action, loc=loc, rot=rot)
+    signature = (_generation, action.as_pointer(),
+                 tuple((x.as_pointer(), len(x.keyframe_points))
+                       for x in fcurves))
+    key = (obj.as_pointer(), loc, rot)
+    cached = _indices.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    index = KeyframeIndex(_build_frames(fcurves))
+    _indices[key] = (signature, index)
+    _log.output(lambda: f'get_keyframe_index rebuilt: {obj.name} '
+                        f'{len(index)} frames')
+    return index
+
+
+@persistent
+def keyframe_index_depsgraph_handler(scene: Any, depsgraph: Any) -> None:
+    if depsgraph.id_type_updated('ACTION'):
+        invalidate_keyframe_indices()
+
+
+@persistent
+def keyframe_index_reset_handler(*args) -> None:
+    clear_keyframe_indices()
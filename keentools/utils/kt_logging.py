@@ -17,7 +17,7 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import logging
-from typing import Optional, List
+from typing import Optional, List, Union, Callable, Any
 
 
 _log_colors = {
@@ -32,6 +32,10 @@ _log_colors = {
 
 
 _module_names: List[str] = []
+_release_mode: bool = False
+
+
+Message = Union[str, Callable[[], str]]
 
 
 def _add_module_name(name: str) -> None:
@@ -39,7 +43,25 @@ def _add_module_name(name: str) -> None:
     _module_names.append(name)
 
 
+def set_release_mode(state: bool) -> None:
+    ''' In release mode color helpers (gray, red, green...) do nothing
+        and color codes are not added to messages
+    '''
+    global _release_mode
+    _release_mode = state
+
+
+def is_release_mode() -> bool:
+    return _release_mode
+
+
 class KTLogger():
+    ''' Messages can be passed as strings, as callables returning
+        a string or as %-format strings with args. Callables and format
+        args are evaluated only when the level is enabled, so large
+        messages on hot paths should be passed lazily:
+        _log.output(lambda: f'SERIAL:\n{serial}')
+    '''
     def __init__(self, name, *, output: str = 'debug',
                  info_color: Optional[str] = None,
                  debug_color: Optional[str] = None,
@@ -52,69 +74,80 @@ class KTLogger():
         self._warning_color = warning_color
         if output == 'info':
             self.output = self.info
+            self._output_level = logging.INFO
         elif output == 'warning':
             self.output = self.warning
+            self._output_level = logging.WARNING
         elif output == 'error':
             self.output = self.error
+            self._output_level = logging.ERROR
         else:
             self.output = self.debug
+            self._output_level = logging.DEBUG
 
         _add_module_name(name)
         self.green(f'\nimport: {name}')
 
-    def info(self, message: str) -> None:
-        if self._info_color is None:
-            self._logger.info(message)
-        else:
-            self._logger.info(self.color(self._info_color, message))
+    def is_enabled(self, level: Optional[int] = None) -> bool:
+        ''' :param level: logging level, output level by default '''
+        return self._logger.isEnabledFor(
+            self._output_level if level is None else level)
 
-    def warning(self, message: str) -> None:
-        if self._warning_color is None:
-            self._logger.warning(message)
-        else:
-            self._logger.warning(self.color(self._warning_color, message))
+    def _write(self, level: int, color: Optional[str],
+               message: Message, args: Any) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        txt = message() if callable(message) else message
+        if color is not None:
+            txt = self.color(color, txt)
+        self._logger.log(level, txt, *args)
 
-    def debug(self, message: str) -> None:
-        if self._debug_color is None:
-            self._logger.debug(message)
-        else:
-            self._logger.debug(self.color(self._debug_color, message))
+    def info(self, message: Message, *args: Any) -> None:
+        self._write(logging.INFO, self._info_color, message, args)
 
-    def error(self, message: str) -> None:
-        if self._error_color is None:
-            self._logger.error(message)
-        else:
-            self._logger.error(self.color(self._error_color, message))
+    def warning(self, message: Message, *args: Any) -> None:
+        self._write(logging.WARNING, self._warning_color, message, args)
+
+    def debug(self, message: Message, *args: Any) -> None:
+        self._write(logging.DEBUG, self._debug_color, message, args)
+
+    def error(self, message: Message, *args: Any) -> None:
+        self._write(logging.ERROR, self._error_color, message, args)
 
     def color(self, color: str, txt: str) -> str:
         ''' Add an ASCII color code at the beginning
             and a reset code at the end of the text
         '''
         global _log_colors
-        if color not in _log_colors:
+        if _release_mode or color not in _log_colors:
             return txt
         return f"{_log_colors[color]}{txt}{_log_colors['reset']}"
 
-    def gray(self, txt: str) -> None:
-        self.output(self.color('gray', txt))
+    def _output_color(self, color: str, txt: Message, args: Any) -> None:
+        if _release_mode:
+            return
+        self._write(self._output_level, color, txt, args)
+
+    def gray(self, txt: Message, *args: Any) -> None:
+        self._output_color('gray', txt, args)
 
-    def red(self, txt: str) -> None:
-        self.output(self.color('red', txt))
+    def red(self, txt: Message, *args: Any) -> None:
+        self._output_color('red', txt, args)
 
-    def green(self, txt: str) -> None:
-        self.output(self.color('green', txt))
+    def green(self, txt: Message, *args: Any) -> None:
+        self._output_color('green', txt, args)
 
-    def yellow(self, txt: str) -> None:
-        self.output(self.color('yellow', txt))
+    def yellow(self, txt: Message, *args: Any) -> None:
+        self._output_color('yellow', txt, args)
 
-    def blue(self, txt: str) -> None:
-        self.output(self.color('blue', txt))
+    def blue(self, txt: Message, *args: Any) -> None:
+        self._output_color('blue', txt, args)
 
-    def magenta(self, txt: str) -> None:
-        self.output(self.color('magenta', txt))
+    def magenta(self, txt: Message, *args: Any) -> None:
+        self._output_color('magenta', txt, args)
 
-    def cyan(self, txt: str) -> None:
-        self.output(self.color('cyan', txt))
+    def cyan(self, txt: Message, *args: Any) -> None:
+        self._output_color('cyan', txt, args)
 
     def module_names(self) -> List[str]:
         return (_module_names)
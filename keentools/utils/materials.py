@@ -17,7 +17,6 @@
 # ##### END GPL LICENSE BLOCK #####
 
 from typing import Any, Tuple, List
-import numpy as np
 
 import bpy
 from bpy.types import Object, Material
@@ -27,7 +26,8 @@ from .version import BVersion
 from ..addon_config import fb_settings, ActionStatus
 from ..facebuilder_config import FBConfig
 from ..facebuilder.fbloader import FBLoader
-from ..utils.images import load_rgba, find_bpy_image_by_name, assign_pixels_data
+from ..utils.images import find_bpy_image_by_name, assign_pixels_data
+from ..facebuilder.utils.texture_frames import BakeFrameLoader
 from ..blender_independent_packages.pykeentools_loader import module as pkt_module
 from .bpy_common import bpy_progress_begin, bpy_progress_end, bpy_progress_update
 
@@ -180,25 +180,6 @@ def _sRGB_to_linear(img: Any) -> Any:
     return img
 
 
-def _create_frame_data_loader(head: Any, camnums: List, fb: Any) -> Any:
-    def frame_data_loader(kf_idx):
-        cam = head.cameras[camnums[kf_idx]]
-        cam.reset_tone_mapping()
-
-        img = load_rgba(cam)
-
-        frame_data = pkt_module().texture_builder.FrameData()
-        frame_data.geo = fb.applied_args_model_at(cam.get_keyframe())
-        frame_data.image = img
-        frame_data.model = fb.model_mat(cam.get_keyframe())
-        frame_data.view = np.eye(4)
-        frame_data.projection = cam.get_projection_matrix()
-
-        return frame_data
-
-    return frame_data_loader
-
-
 def bake_tex(headnum: int, tex_name: str) -> ActionStatus:
     settings = fb_settings()
     head = settings.get_head(headnum)
@@ -220,7 +201,8 @@ def bake_tex(headnum: int, tex_name: str) -> ActionStatus:
         return ActionStatus(False, msg)
     
     fb = _get_fb_for_bake_tex(headnum, head)
-    frame_data_loader = _create_frame_data_loader(head, camnums, fb)
+    frame_data_loader = BakeFrameLoader(
+        head, camnums, fb, settings.tex_width, settings.tex_height)
 
     bpy_progress_begin(0, 1)
 
@@ -230,12 +212,15 @@ def bake_tex(headnum: int, tex_name: str) -> ActionStatus:
             return False
 
     progress_callBack = ProgressCallBack()
-    built_texture = pkt_module().texture_builder.build_texture(
-        frames_count, frame_data_loader, progress_callBack,
-        settings.tex_height, settings.tex_width, settings.tex_face_angles_affection,
-        settings.tex_uv_expand_percents, settings.tex_back_face_culling,
-        settings.tex_equalize_brightness, settings.tex_equalize_colour, settings.tex_fill_gaps)
-    bpy_progress_end()
+    try:
+        built_texture = pkt_module().texture_builder.build_texture(
+            frames_count, frame_data_loader, progress_callBack,
+            settings.tex_height, settings.tex_width, settings.tex_face_angles_affection,
+            settings.tex_uv_expand_percents, settings.tex_back_face_culling,
+            settings.tex_equalize_brightness, settings.tex_equalize_colour, settings.tex_fill_gaps)
+    finally:
+        frame_data_loader.stop()
+        bpy_progress_end()
 
     _create_bpy_texture_from_img(built_texture, tex_name)
     return ActionStatus(True, 'ok')
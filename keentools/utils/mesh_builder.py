@@ -17,71 +17,185 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import numpy as np
-from typing import Any, Tuple, Optional
+import zlib
+from typing import Any, List, Optional, Tuple
 
-from bpy.types import Object
+from bpy.types import Object, Mesh
+from bpy.app.handlers import persistent
 
 from .kt_logging import KTLogger
+from ..addon_config import Config
 from ..blender_independent_packages.pykeentools_loader import module as pkt_module
 from .coords import (get_scale_matrix_3x3_from_matrix_world,
                      get_mesh_verts,
                      xz_to_xy_rotation_matrix_3x3)
 from .bpy_common import evaluated_mesh
 from .blendshapes import get_blendshape
+from .lru_cache import LRUCache
 
 
 _log = KTLogger(__name__)
 
 
-def build_geo(obj: Object, get_uv=False) -> Any:
-    _log.magenta('build_geo start')
-    mb = pkt_module().MeshBuilder()
-    _geo = pkt_module().Geo()
+_topology_cache: LRUCache = LRUCache(Config.topology_cache_size)
 
-    if obj:
-        mesh = evaluated_mesh(obj)
-        scale = get_scale_matrix_3x3_from_matrix_world(obj.matrix_world)
-        verts = get_mesh_verts(mesh) @ scale
 
-        mb.add_points(verts @ xz_to_xy_rotation_matrix_3x3())
+def clear_topology_cache() -> None:
+    _topology_cache.clear()
+
+
+@persistent
+def mesh_cache_reset_handler(*args) -> None:
+    ''' Mesh data pointers are not valid in another file '''
+    clear_topology_cache()
+    GeoCache.invalidate()
+
+
+def get_mesh_topology(mesh: Mesh) -> Tuple[Any, Any, Any]:
+    ''' Face data read in bulk
+        :return: face sizes, flat face vertex indices and
+                 loop indices, all in polygon order
+    '''
+    poly_count = len(mesh.polygons)
+    loop_totals = np.empty((poly_count,), dtype=np.int32)
+    loop_starts = np.empty((poly_count,), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loop_totals)
+    mesh.polygons.foreach_get('loop_start', loop_starts)
+
+    loop_verts = np.empty((len(mesh.loops),), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', loop_verts)
 
-        for polygon in mesh.polygons:
-            mb.add_face(polygon.vertices[:])
+    offsets = np.cumsum(loop_totals) - loop_totals
+    loop_indices = np.repeat(loop_starts - offsets, loop_totals) + \
+        np.arange(loop_totals.sum(), dtype=np.int32)
+    return loop_totals, loop_verts[loop_indices], loop_indices
+
+
+def get_mesh_uvs(mesh: Mesh, loop_indices: Any) -> Optional[Any]:
+    if not mesh.uv_layers.active:
+        return None
+    uvs = np.empty((len(mesh.loops), 2), dtype=np.float32)
+    mesh.uv_layers.active.data.foreach_get('uv', uvs.ravel())
+    return uvs[loop_indices]
+
+
+def _cached_faces(obj: Object, face_sizes: Any,
+                  face_verts: Any) -> List[List[int]]:
+    key = (len(face_sizes), len(face_verts),
+           hash((face_sizes.tobytes(), face_verts.tobytes())))
+    pointer = obj.data.as_pointer()
+    cached = _topology_cache.get(pointer)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    flat = face_verts.tolist()
+    ends = np.cumsum(face_sizes).tolist()
+    starts = [0] + ends[:-1]
+    faces = [flat[s:e] for s, e in zip(starts, ends)]
+    _topology_cache.put(pointer, (key, faces))
+    _log.output(f'topology cache updated: {obj.name}')
+    return faces
+
+
+def _read_face_data(mesh: Mesh, get_uv: bool) -> Tuple[Any, Any,
+                                                      Optional[Any]]:
+    ''' :return: face sizes, flat face vertex indices and face UVs '''
+    face_sizes, face_verts, loop_indices = get_mesh_topology(mesh)
+    uvs = get_mesh_uvs(mesh, loop_indices) if get_uv else None
+    return face_sizes, face_verts, uvs
+
+
+def _new_geo(obj: Object, verts: Optional[Any] = None,
+             face_sizes: Optional[Any] = None,
+             face_verts: Optional[Any] = None,
+             uvs: Optional[Any] = None) -> Any:
+    mb = pkt_module().MeshBuilder()
+    _geo = pkt_module().Geo()
 
-        if get_uv and mesh.uv_layers.active:
-            uvmap = mesh.uv_layers.active.data
-            uvs = [np.array(v.uv) for v in uvmap]
+    if verts is not None:
+        scale = get_scale_matrix_3x3_from_matrix_world(obj.matrix_world)
+        mb.add_points(verts @ scale @ xz_to_xy_rotation_matrix_3x3())
+        for face in _cached_faces(obj, face_sizes, face_verts):
+            mb.add_face(face)
+        if uvs is not None:
             mb.set_uvs_attribute('VERTEX_BASED', uvs)
 
     _geo.add_mesh(mb.mesh())
+    return _geo
+
+
+def build_geo(obj: Object, get_uv=False) -> Any:
+    _log.magenta('build_geo start')
+    if obj:
+        mesh = evaluated_mesh(obj)
+        _geo = _new_geo(obj, get_mesh_verts(mesh),
+                        *_read_face_data(mesh, get_uv))
+    else:
+        _geo = _new_geo(obj)
     _log.output('build_geo end >>>')
     return _geo
 
 
 def build_geo_from_basis(obj: Object, get_uv=False) -> Any:
     _log.magenta('build_geo_from_basis start')
-    mb = pkt_module().MeshBuilder()
-    _geo = pkt_module().Geo()
-
     if obj:
         shape_index, basis_shape, _ = get_blendshape(obj, 'Basis',
                                                      create_basis=True)
 
         mesh = evaluated_mesh(obj)
-        scale = get_scale_matrix_3x3_from_matrix_world(obj.matrix_world)
         verts = np.empty((len(mesh.vertices), 3), dtype=np.float32)
         basis_shape.data.foreach_get('co', verts.ravel())
-
-        mb.add_points(verts @ scale @ xz_to_xy_rotation_matrix_3x3())
-
-        for polygon in mesh.polygons:
-            mb.add_face(polygon.vertices[:])
-
-        if get_uv and mesh.uv_layers.active:
-            uvmap = mesh.uv_layers.active.data
-            uvs = [np.array(v.uv) for v in uvmap]
-            mb.set_uvs_attribute('VERTEX_BASED', uvs)
-
-    _geo.add_mesh(mb.mesh())
+        _geo = _new_geo(obj, verts, *_read_face_data(mesh, get_uv))
+    else:
+        _geo = _new_geo(obj)
     _log.output('build_geo_from_basis end >>>')
     return _geo
+
+
+class GeoCache:
+    ''' Built Geo objects reused while mesh data stays the same.
+        Rigid objects keep topology, coords and UVs between frames,
+        so the Geo can be built once for a whole baking sequence.
+    '''
+    _items: LRUCache = LRUCache(Config.geo_cache_size)
+    _hits: int = 0
+    _misses: int = 0
+
+    @staticmethod
+    def _calc_key(obj: Object, verts: Any, face_sizes: Any, face_verts: Any,
+                  uvs: Optional[Any]) -> Tuple:
+        checksum = zlib.crc32(verts.tobytes())
+        checksum = zlib.crc32(face_sizes.tobytes(), checksum)
+        checksum = zlib.crc32(face_verts.tobytes(), checksum)
+        if uvs is not None:
+            checksum = zlib.crc32(uvs.tobytes(), checksum)
+        scale = tuple(obj.matrix_world.to_scale())
+        return len(verts), len(face_sizes), len(face_verts), scale, checksum
+
+    @classmethod
+    def get_geo(cls, obj: Object, get_uv: bool = False) -> Any:
+        if not obj:
+            return build_geo(obj, get_uv=get_uv)
+        mesh = evaluated_mesh(obj)
+        verts = get_mesh_verts(mesh)
+        face_data = _read_face_data(mesh, get_uv)
+        item_id = (obj.data.as_pointer(), get_uv)
+        key = cls._calc_key(obj, verts, *face_data)
+        cached = cls._items.get(item_id)
+        if cached is not None and cached[0] == key:
+            cls._hits += 1
+            return cached[1]
+        cls._misses += 1
+        geo = _new_geo(obj, verts, *face_data)
+        cls._items.put(item_id, (key, geo))
+        _log.output(f'GeoCache: new geo for {obj.name} '
+                    f'[hits: {cls._hits} misses: {cls._misses}]')
+        return geo
+
+    @classmethod
+    def invalidate(cls, obj: Optional[Object] = None) -> None:
+        if obj is None:
+            cls._items.clear()
+            return
+        pointer = obj.data.as_pointer()
+        cls._items.remove_if(lambda item_id: item_id[0] == pointer)
@@ -0,0 +1,123 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' Segmented storage of tracker serialization strings.
+    The serial is cut into content-defined chunks, so an edit in one
+    place of the serial changes only the chunks around it. Every chunk
+    is stored compressed once, keyed by its digest; a short order
+    string lists the chunk digests.
+'''
+
+import base64
+import hashlib
+import zlib
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+
+_window: int = 16
+_boundary_bits: int = 16  # 64 KiB average chunk
+_min_chunk_size: int = 16 * 1024
+_max_chunk_size: int = 256 * 1024
+_compression_level: int = 6
+
+_gear: np.ndarray = np.random.RandomState(0x4b54).randint(
+    0, 2 ** 32, size=256, dtype=np.uint64).astype(np.uint32)
+
+
+def _candidate_boundaries(data: bytes) -> np.ndarray:
+    ''' Positions after which the rolling hash of the last
+        _window bytes has its top _boundary_bits bits zeroed '''
+    values = _gear[np.frombuffer(data, dtype=np.uint8)]
+    count = len(values)
+    hashes = np.zeros((count,), dtype=np.uint32)
+    for shift in range(min(_window, count)):
+        hashes[shift:] += values[:count - shift] << np.uint32(shift)
+    marks = (hashes >> np.uint32(32 - _boundary_bits)) == 0
+    return np.nonzero(marks)[0] + 1
+
+
+def split_serial(serial: str) -> List[bytes]:
+    data = serial.encode('utf-8')
+    size = len(data)
+    if size <= _min_chunk_size:
+        return [data] if size > 0 else []
+
+    cuts = []
+    start = 0
+    for pos in _candidate_boundaries(data).tolist():
+        if pos - start < _min_chunk_size:
+            continue
+        while pos - start > _max_chunk_size:
+            start += _max_chunk_size
+            cuts.append(start)
+        cuts.append(pos)
+        start = pos
+    while size - start > _max_chunk_size:
+        start += _max_chunk_size
+        cuts.append(start)
+    if len(cuts) == 0 or cuts[-1] != size:
+        cuts.append(size)
+
+    chunks = []
+    start = 0
+    for cut in cuts:
+        chunks.append(data[start:cut])
+        start = cut
+    return chunks
+
+
+def chunk_digest(chunk: bytes) -> str:
+    return hashlib.blake2b(chunk, digest_size=12).hexdigest()
+
+
+def serial_digest(serial: str) -> str:
+    return chunk_digest(serial.encode('utf-8'))
+
+
+def encode_chunk(chunk: bytes) -> str:
+    ''' zlib + base64: Blender string properties cannot keep raw bytes '''
+    return base64.b64encode(
+        zlib.compress(chunk, _compression_level)).decode('ascii')
+
+
+def decode_chunk(data: str) -> bytes:
+    return zlib.decompress(base64.b64decode(data.encode('ascii')))
+
+
+def prepare_chunks(serial: str, stored: Set[str]
+                   ) -> Tuple[List[str], Dict[str, str]]:
+    ''' :param stored: digests of already stored chunks
+        :return: ordered digests of the serial and encoded data
+                 of the chunks that are not stored yet
+    '''
+    order = []
+    new_chunks = {}
+    for chunk in split_serial(serial):
+        digest = chunk_digest(chunk)
+        order.append(digest)
+        if digest not in stored and digest not in new_chunks:
+            new_chunks[digest] = encode_chunk(chunk)
+    return order, new_chunks
+
+
+def join_chunks(order: List[str], pool: Dict[str, str]) -> str:
+    ''' :raise: KeyError if some chunk is missing in the pool '''
+    return b''.join(decode_chunk(pool[digest])
+                    for digest in order).decode('utf-8')
@@ -0,0 +1,58 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+# KeenTools for blender is a blender addon for using KeenTools in Blender.
+# Copyright (C) 2024 KeenTools
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ##### END GPL LICENSE BLOCK #####
+
+''' Sorted keyframe numbers with binary search lookups.
+    It has no Blender dependencies, get_keyframe_index builds it
+    from object fcurves.
+'''
+
+import numpy as np
+from typing import Any, List, Optional
+
+
+class KeyframeIndex:
+    def __init__(self, frames: Optional[Any] = None):
+        self._frames: Any = frames if frames is not None \
+            else np.empty((0,), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __contains__(self, frame: int) -> bool:
+        pos = int(np.searchsorted(self._frames, frame))
+        return pos < len(self._frames) and self._frames[pos] == frame
+
+    def frames(self) -> Any:
+        ''' :return: sorted int32 array, it must not be changed '''
+        return self._frames
+
+    def frame_list(self) -> List[int]:
+        return self._frames.tolist()
+
+    def frames_in_range(self, frame_from: int, frame_to: int) -> Any:
+        return self._frames[np.searchsorted(self._frames, frame_from):
+                            np.searchsorted(self._frames, frame_to,
+                                            side='right')]
+
+    def next_frame(self, frame: int) -> Optional[int]:
+        pos = int(np.searchsorted(self._frames, frame, side='right'))
+        return int(self._frames[pos]) if pos < len(self._frames) else None
+
+    def prev_frame(self, frame: int) -> Optional[int]:
+        pos = int(np.searchsorted(self._frames, frame))
+        return int(self._frames[pos - 1]) if pos > 0 else None
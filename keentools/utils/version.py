@@ -63,6 +63,7 @@ class BVersion:
     operator_with_context_exists: bool = ver >= (3, 2, 0)
     fcurve_has_clear: bool = ver >= (3, 3, 0)
     property_gpu_backend_exists: bool = ver >= (3, 5, 0)
+    polygon_loop_total_is_read_only: bool = ver >= (3, 6, 0)
     use_old_bgl_shaders: bool = ver < (3, 4, 0)
     blf_size_takes_3_arguments: bool = ver < (4, 0, 0)
     principled_shader_has_specular: bool = ver < (4, 0, 0)
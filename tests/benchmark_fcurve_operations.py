@@ -0,0 +1,93 @@
+""" FACS animation import into shape key fcurves.
+
+Runs inside Blender with the addon installed:
+blender -b --factory-startup -P tests/benchmark_fcurve_operations.py
+Repeats what load_csv_animation_to_blendshapes does with the fcurves
+of 51 ARKit channels: the interval of the imported animation is replaced
+twice, the second import goes over existing points.
+The old functions are copies of the per-point fcurve_operations code.
+"""
+import time
+
+import bpy
+import numpy as np
+
+from keentools.utils.fcurve_operations import (get_safe_action_fcurve,
+                                               replace_keys_in_interval,
+                                               snap_keys_in_interval,
+                                               get_fcurve_co)
+
+
+_channels = 51
+_frames = 10000
+
+
+def _old_put(fcurve, anim_data) -> None:
+    start_index = len(fcurve.keyframe_points)
+    fcurve.keyframe_points.add(len(anim_data))
+    for i, point in enumerate(anim_data):
+        fcurve.keyframe_points[start_index + i].co = point
+    fcurve.update()
+
+
+def _old_cleanup(fcurve, start_keyframe, end_keyframe) -> None:
+    for p in reversed(fcurve.keyframe_points):
+        if start_keyframe <= p.co[0] <= end_keyframe:
+            fcurve.keyframe_points.remove(p)
+    fcurve.update()
+
+
+def _old_snap(fcurve, start_keyframe, end_keyframe) -> None:
+    left = min(start_keyframe, round(start_keyframe))
+    right = max(end_keyframe, round(end_keyframe))
+    points = sorted(set([round(p.co[0]) for p in fcurve.keyframe_points
+                         if start_keyframe <= p.co[0] <= end_keyframe]))
+    anim_data_list = [(x, fcurve.evaluate(x)) for x in points]
+    _old_cleanup(fcurve, left, right)
+    _old_put(fcurve, anim_data_list)
+
+
+def _old_import(action, keyframes, values) -> None:
+    start, end = keyframes[0], keyframes[-1]
+    for i in range(_channels):
+        fcurve = get_safe_action_fcurve(action, f'key_blocks["k{i}"].value')
+        _old_cleanup(fcurve, start, end)
+        _old_put(fcurve, list(zip(keyframes, values[i].tolist())))
+        _old_snap(fcurve, start, end)
+
+
+def _new_import(action, keyframes, values) -> None:
+    start, end = keyframes[0], keyframes[-1]
+    for i in range(_channels):
+        fcurve = get_safe_action_fcurve(action, f'key_blocks["k{i}"].value')
+        replace_keys_in_interval(fcurve, start, end,
+                                 np.column_stack((keyframes, values[i])))
+        snap_keys_in_interval(fcurve, start, end)
+
+
+def main() -> None:
+    keyframes = list(range(1, _frames + 1))
+    values = np.random.RandomState(0).uniform(
+        0, 1, (_channels, _frames)).astype(np.float32)
+    results = {}
+    for name, func in (('old', _old_import), ('new', _new_import)):
+        action = bpy.data.actions.new(f'bench_{name}')
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            func(action, keyframes, values)
+            timings.append(time.perf_counter() - start)
+        results[name] = (timings, action)
+
+    old_co = [get_fcurve_co(fc) for fc in results['old'][1].fcurves]
+    new_co = [get_fcurve_co(fc) for fc in results['new'][1].fcurves]
+    same = all(np.array_equal(a, b) for a, b in zip(old_co, new_co))
+    print(f'{_channels} channels x {_frames} frames')
+    for name, (timings, _) in results.items():
+        print(f'{name}: import {timings[0]:.3f} s, '
+              f're-import {timings[1]:.3f} s')
+    print(f'same points: {same}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+""" Mask thresholding and grayscale kernels against the old expressions.
+
+Runs without Blender: python tests/benchmark_image_kernels.py
+Old functions are copies of the utils/images code before the kernels.
+Peak memory is the largest tracemalloc peak of one call, numpy reports
+its buffers there; the output buffer is preallocated for the kernels
+as a per-frame caller would do.
+"""
+import importlib.util
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def _load_image_kernels() -> object:
+    path = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'keentools', 'utils', 'image_kernels.py')
+    spec = importlib.util.spec_from_file_location('image_kernels', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+image_kernels = _load_image_kernels()
+
+
+def _old_threshold_with_channels(np_img, channels, threshold=0.0):
+    denom = sum(channels)
+    if denom == 0:
+        return None
+    return (255 * ((channels[0] * np_img[:, :, 0] +
+                    channels[1] * np_img[:, :, 1] +
+                    channels[2] * np_img[:, :, 2] +
+                    channels[3] * np_img[:, :, 3]) / denom > threshold)).astype(np.uint8)
+
+
+def _old_threshold(np_img, threshold=0.0):
+    return (255 * ((np_img[:, :, 0] +
+                    np_img[:, :, 1] +
+                    np_img[:, :, 2]) / 3.0 > threshold)).astype(np.uint8)
+
+
+def _old_grayscale(np_img):
+    return (255 * 0.2989 * np_img[:, :, 0] +
+            255 * 0.5870 * np_img[:, :, 1] +
+            255 * 0.1140 * np_img[:, :, 2]).astype(np.uint8)
+
+
+def _old_gamma(np_img, gamma=1.0):
+    res_img = np_img.copy()
+    res_img[:, :, :3] = np.power(np_img[:, :, :3], gamma)
+    return res_img
+
+
+def _measure(func, repeat: int):
+    func()  # warm up scratch buffers
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    return elapsed, peak, result
+
+
+def main() -> None:
+    sizes = {'HD': (1080, 1920), '4K': (2160, 3840), '8K': (4320, 7680)}
+    channels = [True, True, True, False]
+    print(f'{"size":>4} {"kernel":>20} {"old ms":>8} {"new ms":>8} '
+          f'{"old peak MB":>12} {"new peak MB":>12} {"same":>5}')
+    for size_name, (h, w) in sizes.items():
+        np_img = np.random.RandomState(0).uniform(
+            0, 1, (h, w, 4)).astype(np.float32)
+        out = np.empty((h, w), dtype=np.uint8)
+        gamma_out = np.empty_like(np_img)
+        repeat = 5 if size_name != '8K' else 2
+        cases = [
+            ('threshold_channels',
+             lambda: _old_threshold_with_channels(np_img, channels, 0.5),
+             lambda: image_kernels.threshold_channels(
+                 np_img, channels, 0.5, out=out)),
+            ('threshold_alpha',
+             lambda: _old_threshold_with_channels(
+                 np_img, [False, False, False, True], 0.5),
+             lambda: image_kernels.threshold_channels(
+                 np_img, [False, False, False, True], 0.5, out=out)),
+            ('threshold_rgb',
+             lambda: _old_threshold(np_img, 0.5),
+             lambda: image_kernels.threshold_channels(
+                 np_img, [True, True, True], 0.5, out=out)),
+            ('grayscale',
+             lambda: _old_grayscale(np_img),
+             lambda: image_kernels.weighted_grayscale(np_img, out=out)),
+            ('gamma',
+             lambda: _old_gamma(np_img, 2.2),
+             lambda: image_kernels.gamma_rgb(np_img, 2.2, out=gamma_out)),
+        ]
+        for name, old_func, new_func in cases:
+            old_time, old_peak, old_result = _measure(old_func, repeat)
+            new_time, new_peak, new_result = _measure(new_func, repeat)
+            if name == 'gamma':
+                same = np.allclose(old_result, new_result, atol=1e-6)
+            else:
+                mismatch = np.count_nonzero(old_result != new_result)
+                same = mismatch <= old_result.size * 1e-6
+            print(f'{size_name:>4} {name:>20} {old_time * 1000:>8.1f} '
+                  f'{new_time * 1000:>8.1f} {old_peak / 2 ** 20:>12.1f} '
+                  f'{new_peak / 2 ** 20:>12.1f} {str(same):>5}')
+        image_kernels.release_scratch_buffers()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+""" Logging overhead of the pin drag (mouse move) loop.
+
+Runs without Blender: python tests/benchmark_logging.py
+The calls repeat the messages written by one mouse move during pin drag
+in FaceTracker pinmode (movepin.on_mouse_move -> update_wireframe ->
+update_viewport_shaders -> update_surface_points -> create_batch_2d ->
+update_residuals) with the release logging level (INFO).
+Eager calls build f-strings as the old code did, lazy ones pass callables.
+"""
+import importlib.util
+import logging
+import os
+import sys
+import timeit
+
+
+def _load_kt_logging() -> object:
+    path = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'keentools', 'utils', 'kt_logging.py')
+    spec = importlib.util.spec_from_file_location('kt_logging', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+kt_logging = _load_kt_logging()
+logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+_log = kt_logging.KTLogger('benchmark')
+
+_flags = dict(hash=False, adaptive_opacity=False, geomobj_matrix=True,
+              wireframe=True, wireframe_data=True, pins_and_residuals=False,
+              timeline=False, mask=False)
+_pins = [(0.1 * i, 0.2 * i) for i in range(300)]
+
+
+def _eager_move() -> None:
+    f = _flags
+    _log.output(_log.color('blue', f'update_viewport_shaders'
+                f'\nhash: {f["hash"]}'
+                f' -- adaptive_opacity: {f["adaptive_opacity"]}'
+                f' -- geomobj_matrix: {f["geomobj_matrix"]}'
+                f' \nwireframe: {f["wireframe"]}'
+                f' -- wireframe_data: {f["wireframe_data"]}'
+                f'\npins_and_residuals: {f["pins_and_residuals"]}'
+                f' -- timeline: {f["timeline"]}'
+                f' -- mask: {f["mask"]}'))
+    _log.output(_log.color('red', 'init_geom_data_from_mesh'))
+    _log.yellow('update_surface_points start')
+    _log.yellow('surface_points_from_mesh start')
+    _log.output('surface_points_from_mesh end >>>')
+    _log.output('update_surface_points end >>>')
+    _log.output(f'set_pins: {len(_pins)}')
+    _log.output(_log.color('red', f'point: {_pins[-1]}'))
+
+
+def _lazy_move() -> None:
+    f = _flags
+    _log.blue(lambda: f'update_viewport_shaders'
+              f'\nhash: {f["hash"]}'
+              f' -- adaptive_opacity: {f["adaptive_opacity"]}'
+              f' -- geomobj_matrix: {f["geomobj_matrix"]}'
+              f' \nwireframe: {f["wireframe"]}'
+              f' -- wireframe_data: {f["wireframe_data"]}'
+              f'\npins_and_residuals: {f["pins_and_residuals"]}'
+              f' -- timeline: {f["timeline"]}'
+              f' -- mask: {f["mask"]}')
+    _log.red('init_geom_data_from_mesh')
+    _log.yellow('update_surface_points start')
+    _log.yellow('surface_points_from_mesh start')
+    _log.output('surface_points_from_mesh end >>>')
+    _log.output('update_surface_points end >>>')
+    _log.output('set_pins: %d', len(_pins))
+    _log.red(lambda: f'point: {_pins[-1]}')
+
+
+def _serial_load(serial: str, lazy: bool) -> None:
+    if lazy:
+        _log.cyan(lambda: f'SERIAL:\n{serial}')
+    else:
+        _log.output(_log.color('cyan', f'SERIAL:\n{serial}'))
+
+
+def main() -> None:
+    count = 100000
+    serial = 'x' * (4 * 1024 * 1024)
+    results = []
+    for release in (False, True):
+        kt_logging.set_release_mode(release)
+        eager = timeit.timeit(_eager_move, number=count)
+        lazy = timeit.timeit(_lazy_move, number=count)
+        results.append((release, eager, lazy))
+
+    kt_logging.set_release_mode(False)
+    serial_eager = timeit.timeit(lambda: _serial_load(serial, False),
+                                 number=100)
+    serial_lazy = timeit.timeit(lambda: _serial_load(serial, True),
+                                number=100)
+
+    print(f'Mouse move logging, {count} moves, INFO level:')
+    for release, eager, lazy in results:
+        print(f'  release mode {release}: '
+              f'eager {eager / count * 1e6:.2f} us/move, '
+              f'lazy {lazy / count * 1e6:.2f} us/move')
+    print(f'4 MiB serial log on load_geotracker: '
+          f'eager {serial_eager * 10:.2f} ms, lazy {serial_lazy * 10:.4f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+""" Model matrix reads and writes of GeoTrackerResultsStorage.
+
+Runs inside Blender with the addon installed:
+blender -b --factory-startup -P tests/benchmark_model_matrix.py
+The old path switches the scene frame for every matrix the tracker core
+reads or writes and inserts one keyframe per call. The new path evaluates
+loc/rot/scale fcurves with WorldMatrixEvaluator and inserts all keyframes
+of a computation step with create_locrot_keyframes.
+"""
+import math
+import time
+
+import bpy
+from mathutils import Matrix
+
+from keentools.utils.animation import (create_locrot_keyframe,
+                                       create_locrot_keyframes)
+from keentools.utils.animated_matrices import WorldMatrixEvaluator
+
+
+_frames = 2000
+
+
+def _new_scene() -> bpy.types.Object:
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    scene = bpy.context.scene
+    scene.frame_start = 1
+    scene.frame_end = _frames
+    bpy.ops.mesh.primitive_cube_add()
+    obj = bpy.context.object
+    for frame in range(1, _frames + 1, 10):
+        obj.location = (math.sin(frame * 0.01), frame * 0.001, 0.0)
+        obj.rotation_euler = (0.0, frame * 0.002, 0.0)
+        obj.keyframe_insert('location', frame=frame)
+        obj.keyframe_insert('rotation_euler', frame=frame)
+    return obj
+
+
+def _read_old(obj: bpy.types.Object) -> list:
+    scene = bpy.context.scene
+    result = []
+    for frame in range(1, _frames + 1):
+        scene.frame_set(frame)
+        result.append(obj.matrix_world.copy())
+    return result
+
+
+def _read_new(obj: bpy.types.Object) -> list:
+    evaluator = WorldMatrixEvaluator()
+    return [evaluator.world_matrix(obj, frame)
+            for frame in range(1, _frames + 1)]
+
+
+def _write_old(obj: bpy.types.Object, matrices: list) -> None:
+    scene = bpy.context.scene
+    for frame, mat in enumerate(matrices, start=1):
+        scene.frame_set(frame)
+        obj.matrix_world = mat
+        create_locrot_keyframe(obj, 'JITTER')
+
+
+def _write_new(obj: bpy.types.Object, matrices: list) -> None:
+    locrots = [[*mat.to_translation(), *mat.to_euler()] for mat in matrices]
+    create_locrot_keyframes(obj, list(range(1, len(matrices) + 1)), locrots,
+                            ['JITTER'] * len(matrices))
+
+
+def _max_difference(matrices1: list, matrices2: list) -> float:
+    return max(max(abs(a - b) for row1, row2 in zip(m1, m2)
+                   for a, b in zip(row1, row2))
+               for m1, m2 in zip(matrices1, matrices2))
+
+
+def main() -> None:
+    obj = _new_scene()
+    start = time.perf_counter()
+    old_matrices = _read_old(obj)
+    read_old = time.perf_counter() - start
+    start = time.perf_counter()
+    new_matrices = _read_new(obj)
+    read_new = time.perf_counter() - start
+    read_error = _max_difference(old_matrices, new_matrices)
+
+    targets = [Matrix.Translation((0.0, 0.0, frame * 0.01)) @ mat
+               for frame, mat in enumerate(old_matrices, start=1)]
+    obj = _new_scene()
+    start = time.perf_counter()
+    _write_old(obj, targets)
+    write_old = time.perf_counter() - start
+    written_old = _read_new(obj)
+
+    obj = _new_scene()
+    start = time.perf_counter()
+    _write_new(obj, targets)
+    write_new = time.perf_counter() - start
+    written_new = _read_new(obj)
+    write_error = _max_difference(written_old, written_new)
+
+    print(f'{_frames} frames')
+    print(f'read:  frame switch {read_old:.3f} s, '
+          f'fcurves {read_new:.3f} s, max difference {read_error:.2e}')
+    print(f'write: frame switch {write_old:.3f} s, '
+          f'batched {write_new:.3f} s, max difference {write_error:.2e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# -------
+# FaceTracker deformation cache tests
+# Run without Blender: python -m pytest tests/test_deformation_cache.py
+# -------
+import importlib.util
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+import numpy as np
+
+
+def _load_deformation_cache() -> object:
+    root = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'keentools')
+    for name, path in (('keentools', root),
+                       ('keentools.utils', os.path.join(root, 'utils')),
+                       ('keentools.tracker', os.path.join(root, 'tracker'))):
+        if name not in sys.modules:
+            package = types.ModuleType(name)
+            package.__path__ = [path]
+            sys.modules[name] = package
+    for name in ('utils.kt_logging', 'tracker.deformation_cache'):
+        full_name = f'keentools.{name}'
+        if full_name in sys.modules:
+            continue
+        spec = importlib.util.spec_from_file_location(
+            full_name, os.path.join(root, *name.split('.')) + '.py')
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[full_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules['keentools.tracker.deformation_cache']
+
+
+deformation_cache = _load_deformation_cache()
+DeformationCache = deformation_cache.DeformationCache
+
+
+class DeformationCacheTest(unittest.TestCase):
+    vertex_count = 50
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, 'test.ktdc')
+        rnd = np.random.RandomState(0)
+        self.basis = rnd.uniform(-1, 1, (self.vertex_count, 3)).astype(
+            np.float32)
+        self.frames = {frame: self.basis + rnd.normal(
+            0, 0.01, (self.vertex_count, 3)).astype(np.float32)
+                       for frame in range(1, 21)}
+
+    def tearDown(self):
+        deformation_cache.close_deformation_caches()
+        self._dir.cleanup()
+
+    def _create(self, dtype: str = 'float32') -> DeformationCache:
+        cache = DeformationCache.create(self.path, self.basis, dtype)
+        for frame, verts in self.frames.items():
+            cache.set_frame(frame, verts)
+        return cache
+
+    def _check_frames(self, cache: DeformationCache, frames: dict,
+                      atol: float = 1e-6) -> None:
+        self.assertEqual(cache.frames().tolist(), sorted(frames.keys()))
+        for frame, verts in frames.items():
+            np.testing.assert_allclose(cache.frame_verts(frame), verts,
+                                       atol=atol)
+
+    def test_set_and_reopen(self):
+        cache = self._create()
+        self._check_frames(cache, self.frames)
+        cache.close()
+
+        cache = DeformationCache.open(self.path)
+        self.assertIsNotNone(cache)
+        self.assertEqual(cache.vertex_count(), self.vertex_count)
+        np.testing.assert_array_equal(cache.basis, self.basis)
+        self._check_frames(cache, self.frames)
+
+    def test_float16_precision(self):
+        cache = self._create('float16')
+        cache.close()
+        cache = DeformationCache.open(self.path)
+        self.assertEqual(cache.dtype, 'float16')
+        self._check_frames(cache, self.frames, atol=1e-4)
+
+    def test_overwrite_frame(self):
+        cache = self._create()
+        verts = self.basis + 0.5
+        cache.set_frame(5, verts)
+        self.assertEqual(cache.frame_count(), len(self.frames))
+        self.assertEqual(cache.garbage_rows(), 1)
+        expected = {**self.frames, 5: verts}
+        self._check_frames(cache, expected)
+        self._check_frames(DeformationCache.open(self.path), expected)
+
+    def test_set_frames(self):
+        cache = DeformationCache.create(self.path, self.basis, 'float32')
+        frames = sorted(self.frames.keys())
+        cache.set_frames(frames, np.array([self.frames[x] for x in frames]))
+        self._check_frames(cache, self.frames)
+        self._check_frames(DeformationCache.open(self.path), self.frames)
+
+    def test_remove_frames(self):
+        cache = self._create()
+        self.assertEqual(cache.remove_frames(5, 9), 5)
+        self.assertEqual(cache.remove_frames(5, 9), 0)
+        expected = {k: v for k, v in self.frames.items()
+                    if not 5 <= k <= 9}
+        self._check_frames(cache, expected)
+        self._check_frames(DeformationCache.open(self.path), expected)
+
+        cache.set_frame(7, self.frames[7])
+        expected[7] = self.frames[7]
+        self._check_frames(DeformationCache.open(self.path), expected)
+
+    def test_compact(self):
+        cache = self._create()
+        cache.remove_frames(1, 10)
+        cache.set_frame(15, self.basis)
+        expected = {k: v for k, v in self.frames.items() if k > 10}
+        expected[15] = self.basis
+        size = cache.file_size()
+
+        cache.compact()
+        self.assertEqual(cache.garbage_rows(), 0)
+        self.assertEqual(cache.row_count(), len(expected))
+        self.assertLess(cache.file_size(), size)
+        self._check_frames(cache, expected)
+        self._check_frames(DeformationCache.open(self.path), expected)
+
+    def test_evaluate(self):
+        cache = DeformationCache.create(self.path, self.basis, 'float32')
+        cache.set_frame(10, self.frames[10])
+        cache.set_frame(20, self.frames[20])
+
+        np.testing.assert_allclose(cache.evaluate(10), self.frames[10],
+                                   atol=1e-6)
+        np.testing.assert_allclose(cache.evaluate(1), self.frames[10],
+                                   atol=1e-6)
+        np.testing.assert_allclose(cache.evaluate(30), self.frames[20],
+                                   atol=1e-6)
+        expected = self.frames[10] * 0.75 + self.frames[20] * 0.25
+        out = np.empty_like(self.basis)
+        result = cache.evaluate(12.5, out=out)
+        self.assertIs(result, out)
+        np.testing.assert_allclose(out, expected, atol=1e-6)
+
+    def test_evaluate_empty(self):
+        cache = DeformationCache.create(self.path, self.basis, 'float32')
+        self.assertIsNone(cache.evaluate(1))
+        self.assertIsNone(cache.frame_verts(1))
+
+    def test_open_wrong_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a cache file')
+        self.assertIsNone(DeformationCache.open(self.path))
+
+    def test_shared_cache_reopens_outdated(self):
+        cache = deformation_cache.get_deformation_cache(
+            self.path, basis=self.basis, dtype='float32')
+        self.assertIs(deformation_cache.get_deformation_cache(self.path),
+                      cache)
+        other = DeformationCache.open(self.path)
+        other.set_frame(3, self.frames[3])
+        shared = deformation_cache.get_deformation_cache(self.path)
+        self.assertIsNot(shared, cache)
+        self._check_frames(shared, {3: self.frames[3]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# -------
+# Wireframe edge indices against a per-face reference loop
+# Run without Blender: python -m pytest tests/test_edge_indices.py
+# -------
+import importlib.util
+import os
+import unittest
+
+import numpy as np
+
+
+def _load_edge_indices() -> object:
+    path = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'keentools', 'utils', 'edge_indices.py')
+    spec = importlib.util.spec_from_file_location('edge_indices', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+edge_indices = _load_edge_indices()
+
+
+def _reference(face_sizes, corner_points, corner_uvs) -> tuple:
+    ''' Face by face loop as the mesh is walked by the core API '''
+    indices = []
+    tex_uvs = []
+    start = 0
+    for size in face_sizes:
+        for i in range(size):
+            j = start + (i + 1) % size
+            indices.append((corner_points[start + i], corner_points[j]))
+            tex_uvs.append(corner_uvs[start + i])
+            tex_uvs.append(corner_uvs[j])
+        start += size
+    return (np.array(indices, dtype=np.int32).reshape((-1, 2)),
+            np.array(tex_uvs, dtype=np.float32).reshape((-1, 2)))
+
+
+class EdgeIndicesTest(unittest.TestCase):
+    def _check(self, face_sizes: list, seed: int = 0) -> None:
+        rnd = np.random.RandomState(seed)
+        corners = int(sum(face_sizes))
+        corner_points = rnd.randint(0, 1000, size=corners).astype(np.int32)
+        corner_uvs = rnd.uniform(0, 1, (corners, 2)).astype(np.float32)
+        indices, tex_uvs = edge_indices.edge_indices_and_uvs_from_corners(
+            np.array(face_sizes, dtype=np.int32), corner_points, corner_uvs)
+        ref_indices, ref_uvs = _reference(face_sizes, corner_points,
+                                          corner_uvs)
+        self.assertEqual(indices.dtype, np.int32)
+        self.assertEqual(tex_uvs.dtype, np.float32)
+        np.testing.assert_array_equal(indices, ref_indices)
+        np.testing.assert_array_equal(tex_uvs, ref_uvs)
+
+    def test_quad(self):
+        indices, tex_uvs = edge_indices.edge_indices_and_uvs_from_corners(
+            np.array([4], dtype=np.int32),
+            np.array([0, 1, 2, 3], dtype=np.int32),
+            np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float32))
+        self.assertEqual(indices.tolist(), [[0, 1], [1, 2], [2, 3], [3, 0]])
+        self.assertEqual(tex_uvs.tolist(), [[0, 0], [1, 0], [1, 0], [1, 1],
+                                            [1, 1], [0, 1], [0, 1], [0, 0]])
+
+    def test_mixed_faces(self):
+        self._check([3, 4, 4, 5, 3, 8])
+
+    def test_random_faces(self):
+        rnd = np.random.RandomState(1)
+        for seed in range(10):
+            self._check(rnd.randint(3, 9, size=200).tolist(), seed)
+
+    def test_empty(self):
+        self._check([])
+
+
+if __name__ == '__main__':
+    unittest.main()
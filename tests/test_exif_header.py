@@ -0,0 +1,151 @@
+# -------
+# FaceBuilder EXIF header reading against exifread
+# Run without Blender: python -m pytest tests/test_exif_header.py
+# -------
+import importlib
+import io
+import os
+import struct
+import sys
+import tempfile
+import types
+import unittest
+
+
+_wanted_tags = ('EXIF FocalLength', 'EXIF FocalLengthIn35mmFilm',
+                'EXIF FocalPlaneXResolution', 'EXIF FocalPlaneYResolution',
+                'EXIF FocalPlaneResolutionUnit', 'EXIF ExifImageWidth',
+                'EXIF ExifImageLength', 'Image ImageWidth',
+                'Image ImageLength', 'Image Orientation', 'Image Make',
+                'Image Model')
+
+
+def _load_modules() -> tuple:
+    ''' Addon subpackages without running the addon __init__ (needs bpy) '''
+    root = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'keentools')
+    for name in ('', '.facebuilder', '.facebuilder.utils',
+                 '.blender_independent_packages'):
+        if 'keentools' + name in sys.modules:
+            continue
+        module = types.ModuleType('keentools' + name)
+        module.__path__ = [os.path.join(root, *name.split('.')[1:])]
+        sys.modules['keentools' + name] = module
+    exifread = importlib.import_module(
+        'keentools.blender_independent_packages.exifread')
+    exif_header = importlib.import_module(
+        'keentools.facebuilder.utils.exif_header')
+    return exifread, exif_header
+
+
+exifread, exif_header = _load_modules()
+
+
+def _ifd(endian: str, entries: list, base: int) -> bytes:
+    head = struct.pack(endian + 'H', len(entries))
+    body = b''
+    data = b''
+    data_offset = base + 2 + 12 * len(entries) + 4
+    for tag, field_type, count, payload in entries:
+        if len(payload) <= 4:
+            body += struct.pack(endian + 'HHI', tag, field_type, count) + \
+                payload.ljust(4, b'\x00')
+        else:
+            body += struct.pack(endian + 'HHII', tag, field_type, count,
+                                data_offset + len(data))
+            data += payload + b'\x00' * (len(payload) % 2)
+    return head + body + struct.pack(endian + 'I', 0) + data
+
+
+def _jpeg(endian: str, focal: int) -> bytes:
+    def ifd0(exif_offset: int) -> bytes:
+        return _ifd(endian, [
+            (0x010F, 2, 6, b'Canon\x00'),
+            (0x0110, 2, 14, b'Canon EOS 5D\x00\x00'),
+            (0x0112, 3, 1, struct.pack(endian + 'H', 6)),
+            (0x0100, 4, 1, struct.pack(endian + 'I', 4000)),
+            (0x0101, 3, 1, struct.pack(endian + 'H', 3000)),
+            (0x8769, 4, 1, struct.pack(endian + 'I', exif_offset))], 8)
+
+    exif_offset = 8 + len(ifd0(0))
+    exif = _ifd(endian, [
+        (0x920A, 5, 1, struct.pack(endian + 'II', focal * 10, 10)),
+        (0xA405, 3, 1, struct.pack(endian + 'H', focal + 10)),
+        (0xA20E, 5, 1, struct.pack(endian + 'II', 4000000, 1419)),
+        (0xA20F, 5, 1, struct.pack(endian + 'II', 4000000, 1419)),
+        (0xA210, 3, 1, struct.pack(endian + 'H', 2)),
+        (0xA002, 4, 1, struct.pack(endian + 'I', 4000)),
+        (0xA003, 4, 1, struct.pack(endian + 'I', 3000)),
+        (0x927C, 7, 4000, bytes(range(256)) * 15 + b'\x00' * 160)],
+        exif_offset)
+    tiff = (b'II' if endian == '<' else b'MM') + \
+        struct.pack(endian + 'HI', 42, 8) + ifd0(exif_offset) + exif
+    app1 = b'Exif\x00\x00' + tiff
+    app0 = b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+    return b'\xFF\xD8' + \
+        b'\xFF\xE0' + struct.pack('>H', len(app0) + 2) + app0 + \
+        b'\xFF\xE1' + struct.pack('>H', len(app1) + 2) + app1 + \
+        b'\xFF\xDA\x00\x02' + bytes(range(256)) * 64 + b'\xFF\xD9'
+
+
+def _read_exifread(filepath: str) -> dict:
+    with open(filepath, 'rb') as img_file:
+        data = exifread.process_file(img_file, details=True, strict=False)
+    return {k: str(data[k]) for k in _wanted_tags if k in data}
+
+
+def _read_exif_header(filepath: str) -> dict:
+    with open(filepath, 'rb') as img_file:
+        data = exif_header.parse_exif_block(
+            exif_header.read_jpeg_exif_block(img_file))
+    return {k: data[k] for k in _wanted_tags if k in data}
+
+
+class ExifHeaderTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _write(self, name: str, data: bytes) -> str:
+        filepath = os.path.join(self._dir.name, name)
+        with open(filepath, 'wb') as img_file:
+            img_file.write(data)
+        return filepath
+
+    def test_same_values_as_exifread(self):
+        for i, endian in enumerate(('<', '>', '<', '>')):
+            filepath = self._write(f'photo_{i}.jpg', _jpeg(endian, 20 + i))
+            expected = _read_exifread(filepath)
+            self.assertEqual(len(expected), len(_wanted_tags))
+            self.assertEqual(_read_exif_header(filepath), expected)
+
+    def test_values(self):
+        data = _read_exif_header(self._write('photo.jpg', _jpeg('<', 35)))
+        self.assertEqual(data['EXIF FocalLength'], '35')
+        self.assertEqual(data['EXIF FocalLengthIn35mmFilm'], '45')
+        self.assertEqual(data['Image Make'], 'Canon')
+        self.assertEqual(data['Image Orientation'], 'Rotated 90 CW')
+
+    def test_no_exif(self):
+        app0 = b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+        jpeg = b'\xFF\xD8\xFF\xE0' + struct.pack('>H', len(app0) + 2) + \
+            app0 + b'\xFF\xDA\x00\x02' + b'\x00' * 100 + b'\xFF\xD9'
+        self.assertEqual(exif_header.read_jpeg_exif_block(io.BytesIO(jpeg)),
+                         b'')
+        self.assertIsNone(exif_header.read_jpeg_exif_block(
+            io.BytesIO(b'\x89PNG\r\n\x1a\n')))
+        self.assertEqual(exif_header.parse_exif_block(b''), {})
+
+    def test_truncated_block(self):
+        block = exif_header.read_jpeg_exif_block(io.BytesIO(_jpeg('<', 50)))
+        full = exif_header.parse_exif_block(block)
+        self.assertEqual(len(full), len(exif_header.parse_exif_block(
+            block + b'\x00' * 16)))
+        truncated = exif_header.parse_exif_block(block[:60])
+        self.assertTrue(set(truncated.keys()) <= set(full.keys()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# -------
+# Keyframe index lookup tests against a bisect reference
+# Run without Blender: python -m pytest tests/test_keyframe_index.py
+# -------
+import bisect
+import importlib.util
+import os
+import random
+import unittest
+
+import numpy as np
+
+
+def _load_sorted_frames() -> object:
+    path = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'keentools', 'utils', 'sorted_frames.py')
+    spec = importlib.util.spec_from_file_location('sorted_frames', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+KeyframeIndex = _load_sorted_frames().KeyframeIndex
+
+
+class KeyframeIndexTest(unittest.TestCase):
+    def _check(self, frames: list) -> None:
+        index = KeyframeIndex(np.array(frames, dtype=np.int32))
+        self.assertEqual(len(index), len(frames))
+        self.assertEqual(index.frame_list(), frames)
+        low = frames[0] - 3 if frames else -3
+        high = frames[-1] + 3 if frames else 3
+        for frame in range(low, high + 1):
+            self.assertEqual(frame in index, frame in frames)
+            pos = bisect.bisect_right(frames, frame)
+            self.assertEqual(index.next_frame(frame),
+                             frames[pos] if pos < len(frames) else None)
+            pos = bisect.bisect_left(frames, frame)
+            self.assertEqual(index.prev_frame(frame),
+                             frames[pos - 1] if pos > 0 else None)
+            for frame_to in (frame, frame + 2, frame + 10):
+                self.assertEqual(
+                    index.frames_in_range(frame, frame_to).tolist(),
+                    [x for x in frames if frame <= x <= frame_to])
+
+    def test_empty(self):
+        index = KeyframeIndex()
+        self.assertEqual(len(index), 0)
+        self.assertNotIn(1, index)
+        self.assertIsNone(index.next_frame(1))
+        self.assertIsNone(index.prev_frame(1))
+        self.assertEqual(index.frames_in_range(0, 10).tolist(), [])
+        self._check([])
+
+    def test_single(self):
+        self._check([5])
+
+    def test_negative_and_sparse(self):
+        self._check([-20, -3, 0, 1, 2, 17, 100])
+
+    def test_random(self):
+        rnd = random.Random(0)
+        for _ in range(20):
+            frames = sorted(rnd.sample(range(-50, 250), rnd.randint(1, 40)))
+            self._check(frames)
+
+
+if __name__ == '__main__':
+    unittest.main()
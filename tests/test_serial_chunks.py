@@ -0,0 +1,118 @@
+# -------
+# Tracker serial chunk storage tests
+# Run without Blender: python -m pytest tests/test_serial_chunks.py
+# -------
+import importlib.util
+import os
+import random
+import unittest
+
+
+def _load_serial_chunks() -> object:
+    path = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'keentools', 'utils', 'serial_chunks.py')
+    spec = importlib.util.spec_from_file_location('serial_chunks', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+serial_chunks = _load_serial_chunks()
+
+
+def _frame_record(frame: int, rnd: random.Random) -> str:
+    values = ' '.join(f'{rnd.uniform(-1, 1):.9f}' for _ in range(16))
+    return f'{{"frame":{frame},"model":[{values}],"keyframe":false}}\n'
+
+
+def _make_serial(frames: int, seed: int = 0,
+                 changed: range = range(0)) -> str:
+    return ''.join(_frame_record(f, random.Random(
+        (seed + int(f in changed)) * 1000003 + f)) for f in range(frames))
+
+
+def _save(serial: str, pool: dict) -> tuple:
+    ''' The same steps as TrackerItem.save_serial_str '''
+    order, new_chunks = serial_chunks.prepare_chunks(serial, set(pool.keys()))
+    used = set(order)
+    for digest in [d for d in pool if d not in used]:
+        del pool[digest]
+    pool.update(new_chunks)
+    return order, new_chunks
+
+
+class SerialChunksTest(unittest.TestCase):
+    def test_empty_and_short(self):
+        self.assertEqual(serial_chunks.split_serial(''), [])
+        order, pool = serial_chunks.prepare_chunks('', set())
+        self.assertEqual(order, [])
+        self.assertEqual(serial_chunks.join_chunks(order, pool), '')
+
+        serial = _make_serial(3)
+        self.assertEqual(serial_chunks.split_serial(serial),
+                         [serial.encode('utf-8')])
+
+    def test_split_is_deterministic(self):
+        serial = _make_serial(3000)
+        chunks = serial_chunks.split_serial(serial)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), serial.encode('utf-8'))
+        self.assertEqual(chunks, serial_chunks.split_serial(serial))
+        self.assertTrue(all(len(x) <= serial_chunks._max_chunk_size
+                            for x in chunks))
+        self.assertTrue(all(len(x) >= serial_chunks._min_chunk_size
+                            for x in chunks[:-1]))
+
+    def test_max_chunk_size(self):
+        serial = 'a' * (serial_chunks._max_chunk_size * 3 + 100)
+        chunks = serial_chunks.split_serial(serial)
+        self.assertTrue(all(len(x) <= serial_chunks._max_chunk_size
+                            for x in chunks))
+        self.assertEqual(b''.join(chunks), serial.encode('utf-8'))
+
+    def test_encode_round_trip(self):
+        chunk = _make_serial(10).encode('utf-8')
+        encoded = serial_chunks.encode_chunk(chunk)
+        self.assertIsInstance(encoded, str)
+        self.assertEqual(serial_chunks.decode_chunk(encoded), chunk)
+
+    def test_round_trip(self):
+        serial = _make_serial(3000) + 'non-ascii: é中\n'
+        pool = {}
+        order, _ = _save(serial, pool)
+        self.assertEqual(serial_chunks.join_chunks(order, pool), serial)
+
+    def test_resave_writes_changed_chunks_only(self):
+        frames = 5000
+        serial = _make_serial(frames)
+        retracked = _make_serial(frames, changed=range(2500, 2550))
+        pool = {}
+        order, _ = _save(serial, pool)
+
+        new_order, new_chunks = _save(retracked, pool)
+        self.assertEqual(serial_chunks.join_chunks(new_order, pool),
+                         retracked)
+        self.assertGreater(len(new_chunks), 0)
+        self.assertLess(len(new_chunks), len(new_order) // 2)
+        self.assertEqual(set(pool.keys()), set(new_order))
+        self.assertGreater(len(set(order) & set(new_order)),
+                           len(new_order) // 2)
+
+    def test_missing_chunk(self):
+        serial = _make_serial(3000)
+        pool = {}
+        order, _ = _save(serial, pool)
+        del pool[order[0]]
+        with self.assertRaises(KeyError):
+            serial_chunks.join_chunks(order, pool)
+
+    def test_digest(self):
+        serial = _make_serial(10)
+        self.assertEqual(serial_chunks.serial_digest(serial),
+                         serial_chunks.chunk_digest(serial.encode('utf-8')))
+        self.assertNotEqual(serial_chunks.serial_digest(serial),
+                            serial_chunks.serial_digest(serial + ' '))
+
+
+if __name__ == '__main__':
+    unittest.main()